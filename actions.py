@@ -20,8 +20,16 @@ Misha Schwartz, and Jaisie Sin
 === Module Description ===
 
 This file contains the different actions that can be made by a Player.
+
+The keys that choose each action in the pygame interface are in controls.py,
+so that this file can be used without pygame.
 """
-import pygame
+from __future__ import annotations
+from typing import Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import random
+    from block import Block
 
 # Actions that can be performed in the game
 ROTATE_CLOCKWISE = ('rotate', 1)
@@ -66,16 +74,23 @@ ACTION_PENALTY = {
     PASS: 0
 }
 
-ACTION_KEY = {
-    ROTATE_CLOCKWISE: pygame.K_d,
-    ROTATE_COUNTER_CLOCKWISE: pygame.K_a,
-    SWAP_HORIZONTAL: pygame.K_q,
-    SWAP_VERTICAL: pygame.K_e,
-    SMASH: pygame.K_SPACE,
-    COMBINE: pygame.K_c,
-    PAINT: pygame.K_r,
-    PASS: pygame.K_TAB
-}
 
-# Create a dictionary that is ACTION_KEY inverted
-KEY_ACTION = {value: key for key, value in ACTION_KEY.items()}
+def apply_action(block: Block, action: Tuple[str, Optional[int]],
+                 colour: Tuple[int, int, int],
+                 rng: Optional[random.Random] = None) -> bool:
+    """Perform <action> on <block>, painting with <colour> if <action> is PAINT,
+    and drawing from <rng> if <action> is SMASH (see Block.smash).
+
+    Return True iff the action was performed. PASS is never performed.
+    """
+    if action in [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE]:
+        return block.rotate(action[1])
+    elif action in [SWAP_HORIZONTAL, SWAP_VERTICAL]:
+        return block.swap(action[1])
+    elif action == SMASH:
+        return block.smash(rng)
+    elif action == PAINT:
+        return block.paint(colour)
+    elif action == COMBINE:
+        return block.combine()
+    return False
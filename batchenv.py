@@ -0,0 +1,372 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains an environment that plays many independent one-player
+Blocky games at once, for training and evaluating computer players.
+
+Each game is stored as two arrays of unit cells: its palette grid (see
+grids.py), and the level of the leaf block each unit cell belongs to. Together
+they describe the board exactly. A block at level l is the square of
+2 ** (max_depth - l) unit cells in column c and row r of the 2 ** l by 2 ** l
+grid of blocks at that level. It is on the board iff its upper-left unit cell
+belongs to a leaf at level l or deeper, and it is a leaf iff that leaf is at
+level l.
+
+Moves on every game are made together, with NumPy operations on the whole
+batch: rotations and swaps move the unit cells of the block, paints and
+combines overwrite them, and smashes subdivide them one level at a time.
+"""
+from __future__ import annotations
+from typing import Optional, Tuple
+
+import numpy as np
+
+from actions import ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, \
+    SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, PAINT, COMBINE, PASS, \
+    ACTION_PENALTY
+from block import Block
+from goal import Goal, BlobGoal, PerimeterGoal
+from grids import palette_grid, _perimeter_scores, _blob_scores
+from settings import BOARD_SIZE, COLOUR_LIST
+
+# The actions, in the order of the action numbers BatchEnv.step takes.
+ACTIONS = [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, SWAP_HORIZONTAL,
+           SWAP_VERTICAL, SMASH, PAINT, COMBINE, PASS]
+
+# The penalty of each action number.
+_PENALTIES = np.array([ACTION_PENALTY[action] for action in ACTIONS])
+
+# The numbers of the actions other than rotations and swaps, which come first.
+_SMASH = ACTIONS.index(SMASH)
+_PAINT = ACTIONS.index(PAINT)
+_COMBINE = ACTIONS.index(COMBINE)
+_PASS = ACTIONS.index(PASS)
+
+
+class BatchEnv:
+    """A batch of independent one-player Blocky games, stepped together.
+
+    In each game, one player makes every move, and their paints use their
+    goal's colour.
+
+    === Public Attributes ===
+    max_depth:
+        The max_depth of every board.
+    grids:
+        The palette grid of each game's board, with shape (games, d, d) where
+        d is 2 ** max_depth.
+    levels:
+        The level of the leaf block each unit cell of each board belongs to,
+        with the same shape as <grids>.
+    goal_colours:
+        The index in COLOUR_LIST of each game's goal colour.
+    blob_goals:
+        True for each game whose goal is a BlobGoal, and False for each game
+        whose goal is a PerimeterGoal.
+    scores:
+        The goal score of each game.
+    penalties:
+        The total penalty for the moves made in each game.
+    """
+    max_depth: int
+    grids: np.ndarray
+    levels: np.ndarray
+    goal_colours: np.ndarray
+    blob_goals: np.ndarray
+    scores: np.ndarray
+    penalties: np.ndarray
+
+    # === Private Attributes ===
+    # _rng:
+    #   The random number generator used for new boards, goals and smashes.
+    # _columns, _rows:
+    #   The column and row of every unit cell, shaped to broadcast against an
+    #   array of shape (games, d, d).
+    _rng: np.random.Generator
+    _columns: np.ndarray
+    _rows: np.ndarray
+
+    def __init__(self, games: int, max_depth: int,
+                 seed: Optional[int] = None) -> None:
+        """Initialize <games> games with random boards of <max_depth> and
+        random goals. <seed> seeds the random number generator.
+
+        Precondition: games >= 1 and max_depth >= 1
+        """
+        self.max_depth = max_depth
+        d = 2 ** max_depth
+        self.grids = np.zeros((games, d, d), dtype=np.int8)
+        self.levels = np.zeros((games, d, d), dtype=np.int8)
+        self.goal_colours = np.zeros(games, dtype=np.int8)
+        self.blob_goals = np.zeros(games, dtype=bool)
+        self.scores = np.zeros(games, dtype=np.int64)
+        self.penalties = np.zeros(games, dtype=np.int64)
+        self._rng = np.random.default_rng(seed)
+        self._columns = np.arange(d).reshape(1, d, 1)
+        self._rows = np.arange(d).reshape(1, 1, d)
+        self.reset()
+
+    def reset(self, games: Optional[np.ndarray] = None) -> np.ndarray:
+        """Start the <games> over with new random boards and goals, and return
+        the palette grids of every game. <games> is an array of game numbers,
+        and is every game by default.
+        """
+        if games is None:
+            games = np.arange(len(self.grids))
+        n = len(games)
+        self.levels[games] = 0
+        self.goal_colours[games] = self._rng.integers(0, len(COLOUR_LIST), n)
+        self.blob_goals[games] = self._rng.random(n) < 0.5
+        self.penalties[games] = 0
+        # Like generate_board, smash a board that is a single block
+        zeros = np.zeros(n, dtype=np.int64)
+        self._smash(games, zeros, zeros, zeros)
+        self.scores[games] = self._score(games)
+        return self.grids.copy()
+
+    def set_game(self, game: int, board: Block, goal: Goal) -> None:
+        """Replace game number <game> with <board> and <goal>.
+
+        Precondition: <board> is at level 0, has this environment's max_depth,
+        and all its colours and <goal>'s colour are in COLOUR_LIST.
+        """
+        self.grids[game] = palette_grid(board)
+        _fill_levels(board, self.levels[game], 0, 0, len(self.levels[game]))
+        self.goal_colours[game] = COLOUR_LIST.index(goal.colour)
+        self.blob_goals[game] = isinstance(goal, BlobGoal)
+        self.penalties[game] = 0
+        self.scores[game] = self._score(np.array([game]))[0]
+
+    def board(self, game: int) -> Block:
+        """Return game number <game>'s board as a Block of size BOARD_SIZE.
+        """
+        return _build_block(self.grids[game], self.levels[game], (0, 0),
+                            BOARD_SIZE, 0, self.max_depth, 0, 0)
+
+    def goal(self, game: int) -> Goal:
+        """Return game number <game>'s goal.
+        """
+        colour = COLOUR_LIST[self.goal_colours[game]]
+        if self.blob_goals[game]:
+            return BlobGoal(colour)
+        return PerimeterGoal(colour)
+
+    def step(self, actions: np.ndarray, levels: np.ndarray,
+             columns: np.ndarray, rows: np.ndarray) -> \
+            Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Make one move in every game, and return the new palette grids, the
+        change in each game's goal score, and whether each move was made.
+
+        In game i, the action numbered actions[i] in ACTIONS is performed on
+        the block at level levels[i], in column columns[i] and row rows[i] of
+        the blocks at that level. Moves that the Block methods would not
+        perform are not made, and give no penalty.
+
+        Precondition: 0 <= levels[i] <= max_depth, and
+        0 <= columns[i], rows[i] < 2 ** levels[i]
+        """
+        actions = np.asarray(actions)
+        levels = np.asarray(levels)
+        games = np.arange(len(self.grids))
+        size = (2 ** self.max_depth) >> levels
+        x = np.asarray(columns) * size
+        y = np.asarray(rows) * size
+        # The level of the leaf at each block's upper-left unit cell
+        top = self.levels[games, x, y]
+        colour = self.grids[games, x, y]
+
+        rearrange = (actions < _SMASH) & (top > levels)
+        smash = (actions == _SMASH) & (top == levels) & \
+            (levels < self.max_depth)
+        paint = (actions == _PAINT) & (top == levels) & \
+            (levels == self.max_depth) & (colour != self.goal_colours)
+        majority, has_majority = self._majority_colours(x, y)
+        combine = (actions == _COMBINE) & (levels == self.max_depth - 1) & \
+            (top == self.max_depth) & has_majority
+        valid = rearrange | smash | paint | combine | (actions == _PASS)
+
+        if rearrange.any():
+            self._rearrange(rearrange, actions, x, y, size)
+        if paint.any():
+            self.grids[games[paint], x[paint], y[paint]] = \
+                self.goal_colours[paint]
+        if combine.any():
+            g, cx, cy = games[combine], x[combine], y[combine]
+            for dx, dy in [(0, 0), (1, 0), (0, 1), (1, 1)]:
+                self.grids[g, cx + dx, cy + dy] = majority[combine]
+                self.levels[g, cx + dx, cy + dy] = self.max_depth - 1
+        if smash.any():
+            self._smash(games[smash], levels[smash], x[smash], y[smash])
+
+        self.penalties += np.where(valid, _PENALTIES[actions], 0)
+        # Only boards that changed need to be scored again
+        changed = games[valid & (actions != _PASS)]
+        deltas = np.zeros(len(games), dtype=np.int64)
+        if len(changed) > 0:
+            scores = self._score(changed)
+            deltas[changed] = scores - self.scores[changed]
+            self.scores[changed] = scores
+        return self.grids.copy(), deltas, valid
+
+    def _majority_colours(self, x: np.ndarray, y: np.ndarray) -> \
+            Tuple[np.ndarray, np.ndarray]:
+        """Return the most common colour among the four unit cells whose
+        upper-left cell is at column x[i] and row y[i] in game i, and whether
+        it is more common than every other colour.
+        """
+        games = np.arange(len(self.grids))
+        last = len(self.grids[0]) - 1
+        x1, y1 = np.minimum(x + 1, last), np.minimum(y + 1, last)
+        cells = np.stack([self.grids[games, x, y], self.grids[games, x1, y],
+                          self.grids[games, x, y1], self.grids[games, x1, y1]],
+                         axis=1)
+        counts = (cells[:, :, None] ==
+                  np.arange(len(COLOUR_LIST))[None, None, :]).sum(axis=1)
+        best = counts.max(axis=1)
+        unique = (counts == best[:, None]).sum(axis=1) == 1
+        return counts.argmax(axis=1).astype(np.int8), unique
+
+    def _rearrange(self, mask: np.ndarray, actions: np.ndarray, x: np.ndarray,
+                   y: np.ndarray, size: np.ndarray) -> None:
+        """Rotate or swap the block of each game in <mask>, whose upper-left
+        unit cell is at column x[i] and row y[i] and which is size[i] unit
+        cells across.
+
+        Every unit cell takes the colour and leaf level of the unit cell that
+        the move puts in its place.
+        """
+        a = actions[:, None, None]
+        s = size[:, None, None]
+        x0, y0 = x[:, None, None], y[:, None, None]
+        # Each unit cell's column and row within the block
+        ri = self._columns - x0
+        rj = self._rows - y0
+        inside = mask[:, None, None] & (ri >= 0) & (ri < s) & \
+            (rj >= 0) & (rj < s)
+        half = s // 2
+        clockwise = a == ACTIONS.index(ROTATE_CLOCKWISE)
+        counter = a == ACTIONS.index(ROTATE_COUNTER_CLOCKWISE)
+        source_i = np.select(
+            [clockwise, counter, a == ACTIONS.index(SWAP_HORIZONTAL)],
+            [rj, s - 1 - rj, (ri + half) % s], ri)
+        source_j = np.select(
+            [clockwise, counter, a == ACTIONS.index(SWAP_VERTICAL)],
+            [s - 1 - ri, ri, (rj + half) % s], rj)
+        source_i = np.where(inside, x0 + source_i, self._columns)
+        source_j = np.where(inside, y0 + source_j, self._rows)
+        games = np.arange(len(self.grids))[:, None, None]
+        self.grids = self.grids[games, source_i, source_j]
+        self.levels = self.levels[games, source_i, source_j]
+
+    def _smash(self, games: np.ndarray, levels: np.ndarray, x: np.ndarray,
+               y: np.ndarray) -> None:
+        """Smash the leaf block at level levels[i] whose upper-left unit cell
+        is at column x[i] and row y[i] of game games[i], like Block.smash.
+
+        The block becomes four children of random colours. Then, one level at
+        a time, each new block at level m that can be smashed is smashed with
+        probability math.exp(-0.25 * m).
+        """
+        n = len(games)
+        s = ((2 ** self.max_depth) >> levels)[:, None, None]
+        ri = self._columns - x[:, None, None]
+        rj = self._rows - y[:, None, None]
+        inside = (ri >= 0) & (ri < s) & (rj >= 0) & (rj < s)
+        new_levels = np.where(inside, levels[:, None, None] + 1,
+                              self.levels[games])
+        index = np.arange(n)[:, None, None]
+        for m in range(1, self.max_depth):
+            shift = self.max_depth - m
+            chance = self._rng.random((n, 2 ** m, 2 ** m))
+            chance = chance[index, self._columns >> shift, self._rows >> shift]
+            smashed = inside & (new_levels == m) & (chance < np.exp(-0.25 * m))
+            new_levels = np.where(smashed, m + 1, new_levels)
+
+        grids = self.grids[games]
+        for m in range(1, self.max_depth + 1):
+            shift = self.max_depth - m
+            colours = self._rng.integers(0, len(COLOUR_LIST),
+                                         (n, 2 ** m, 2 ** m), dtype=np.int8)
+            colours = colours[index, self._columns >> shift,
+                              self._rows >> shift]
+            grids = np.where(inside & (new_levels == m), colours, grids)
+        self.grids[games] = grids
+        self.levels[games] = new_levels
+
+    def _score(self, games: np.ndarray) -> np.ndarray:
+        """Return the goal score of each of the <games>.
+        """
+        cells = self.grids[games] == self.goal_colours[games, None, None]
+        blob = self.blob_goals[games]
+        scores = np.zeros(len(games), dtype=np.int64)
+        if blob.any():
+            scores[blob] = _blob_scores(cells[blob])
+        if not blob.all():
+            scores[~blob] = _perimeter_scores(cells[~blob])
+        return scores
+
+
+def _fill_levels(block: Block, levels: np.ndarray, x: int, y: int,
+                 d: int) -> None:
+    """Write the level of the leaf each of <block>'s unit cells belongs to into
+    the <d> by <d> square of <levels> whose upper-left cell is at column <x>
+    and row <y>.
+    """
+    if not block.children:
+        levels[x:x + d, y:y + d] = block.level
+    else:
+        half = d // 2
+        # Children are ordered upper-right, upper-left, lower-left, lower-right
+        corners = [(x + half, y), (x, y), (x, y + half), (x + half, y + half)]
+        for child, (cx, cy) in zip(block.children, corners):
+            _fill_levels(child, levels, cx, cy, half)
+
+
+def _build_block(grid: np.ndarray, levels: np.ndarray,
+                 position: Tuple[int, int], size: int, level: int,
+                 max_depth: int, x: int, y: int) -> Block:
+    """Return the block at <level> whose upper-left unit cell is at column <x>
+    and row <y> of the palette <grid> and leaf <levels>, with the given
+    <position> and <size>.
+    """
+    if levels[x, y] == level:
+        return Block(position, size, COLOUR_LIST[grid[x, y]], level, max_depth)
+    block = Block(position, size, None, level, max_depth)
+    half = 2 ** (max_depth - level - 1)
+    corners = [(x + half, y), (x, y), (x, y + half), (x + half, y + half)]
+    for child_position, (cx, cy) in zip(block._children_positions(), corners):
+        block.children.append(_build_block(grid, levels, child_position,
+                                           block._child_size(), level + 1,
+                                           max_depth, cx, cy))
+    return block
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'typing', '__future__', 'numpy',
+            'actions', 'block', 'goal', 'grids', 'settings'
+        ],
+        'max-attributes': 15,
+        'max-args': 8
+    })
@@ -22,7 +22,7 @@ Misha Schwartz, and Jaisie Sin
 This file contains the Block class, the main data structure used in the game.
 """
 from __future__ import annotations
-from typing import Optional, Tuple, List
+from typing import Dict, Optional, Tuple, List
 import random
 import math
 
@@ -30,10 +30,13 @@ import settings
 from settings import colour_name, COLOUR_LIST
 
 
-def generate_board(max_depth: int, size: int) -> Block:
+def generate_board(max_depth: int, size: int,
+                   rng: Optional[random.Random] = None) -> Block:
     """Return a new game board with a depth of <max_depth> and dimensions of
     <size> by <size>.
 
+    The board is drawn from <rng>, or from the random module if <rng> is None.
+
     >>> board = generate_board(3, 750)
     >>> board.max_depth
     3
@@ -42,12 +45,111 @@ def generate_board(max_depth: int, size: int) -> Block:
     >>> len(board.children) == 4
     True
     """
-    board = Block((0, 0), size, random.choice(COLOUR_LIST), 0, max_depth)
-    board.smash()
+    if rng is None:
+        rng = random
+    board = Block((0, 0), size, rng.choice(COLOUR_LIST), 0, max_depth)
+    board.smash(rng)
 
     return board
 
 
+# The byte that stands for a block with children in an encoded board.
+PARENT_BYTE = 255
+
+
+def encode_board(board: Block) -> bytes:
+    """Return a compact encoding of the structure and colours of <board>.
+
+    The blocks are listed in preorder, one byte each: the index in COLOUR_LIST
+    of a leaf's colour, or 255 for a block with children. Two boards with the
+    same max_depth have the same encoding iff they are equal.
+
+    Precondition: every leaf in <board> has a colour from COLOUR_LIST.
+
+    >>> encode_board(Block((0, 0), 750, COLOUR_LIST[1], 0, 1))
+    b'\\x01'
+    """
+    encoding = bytearray()
+    stack = [board]
+    while stack:
+        block = stack.pop()
+        if block.children:
+            encoding.append(PARENT_BYTE)
+            stack.extend(reversed(block.children))
+        else:
+            encoding.append(COLOUR_LIST.index(block.colour))
+    return bytes(encoding)
+
+
+def decode_board(encoding: bytes, position: Tuple[int, int], size: int,
+                 level: int, max_depth: int) -> Block:
+    """Return the board encoded in <encoding> by encode_board, whose outermost
+    block has the given <position>, <size>, <level> and <max_depth>.
+
+    >>> board = generate_board(3, 750)
+    >>> decode_board(encode_board(board), (0, 0), 750, 0, 3) == board
+    True
+    """
+    block, _ = _decode(encoding, 0, position, size, level, max_depth)
+    return block
+
+
+def _decode(encoding: bytes, start: int, position: Tuple[int, int], size: int,
+            level: int, max_depth: int) -> Tuple[Block, int]:
+    """Return the block encoded in <encoding> starting at index <start>, and
+    the index just after its encoding.
+    """
+    if encoding[start] != PARENT_BYTE:
+        block = Block(position, size, COLOUR_LIST[encoding[start]], level,
+                      max_depth)
+        return block, start + 1
+    block = Block(position, size, None, level, max_depth)
+    start += 1
+    for child_position in block._children_positions():
+        child, start = _decode(encoding, start, child_position,
+                               block._child_size(), level + 1, max_depth)
+        block.children.append(child)
+    return block, start
+
+
+def block_path(board: Block, block: Block) -> List[int]:
+    """Return the indices of the children to follow, in order, to get from
+    <board> down to <block>.
+
+    Precondition: <block> is <board> or one of its descendants.
+
+    >>> board = Block((0, 0), 750, None, 0, 1)
+    >>> board.smash()
+    True
+    >>> block_path(board, board.children[2])
+    [2]
+    """
+    path = []
+    x, y = block.position
+    while board is not block:
+        mid_x = board.position[0] + board._child_size()
+        mid_y = board.position[1] + board._child_size()
+        # Children are ordered upper-right, upper-left, lower-left, lower-right
+        if y < mid_y:
+            index = 0 if x >= mid_x else 1
+        else:
+            index = 3 if x >= mid_x else 2
+        path.append(index)
+        board = board.children[index]
+    return path
+
+
+def block_at(board: Block, path: List[int]) -> Block:
+    """Return the block reached by following the child indices in <path>,
+    in order, from <board>.
+
+    Precondition: <path> leads to a descendant of <board>.
+    """
+    for index in path:
+        board = board.children[index]
+    return board
+
+
 class Block:
     """A square Block in the Blocky game, represented as a tree.
 
@@ -96,10 +198,41 @@ class Block:
     # Public attribute types
     position: Tuple[int, int]
     size: int
-    colour: Optional[Tuple[int, int, int]]
     level: int
     max_depth: int
-    children: List[Block]
+
+    # === Private Attributes ===
+    # _colour:
+    #   The colour of this Block, which the property <colour> gets and sets.
+    # _children:
+    #   The children of this Block, which the property <children> gets and
+    #   sets.
+    # _counts:
+    #   The number of unit cells of each colour in this Block, or None if they
+    #   have not been counted yet. Colours with no unit cells are left out.
+    #   Once counted, the counts are kept up to date by the methods of this
+    #   class, and every descendant of this Block has been counted too.
+    # _moves:
+    #   The number of moves other than painting that can be made on this Block
+    #   and its descendants, and the number of unit cells at max_depth of each
+    #   colour among them, which can be painted any other colour; or None if
+    #   the unit cells of this Block have not been counted yet. Each of swap
+    #   and rotate is counted once for each of its two directions.
+    # _parent:
+    #   The Block whose children include this Block, if that Block's unit cells
+    #   have been counted. Otherwise, None.
+    # _version:
+    #   The number of times this Block or one of its descendants has been
+    #   changed, as far as this Block has been told (see version).
+    #
+    # If a Block's unit cells have not been counted, neither have those of its
+    # ancestors.
+    _colour: Optional[Tuple[int, int, int]]
+    _children: List[Block]
+    _counts: Optional[Dict[Tuple[int, int, int], int]]
+    _moves: Optional[Tuple[int, Dict[Tuple[int, int, int], int]]]
+    _parent: Optional[Block]
+    _version: int
 
     def __init__(self, position: Tuple[int, int], size: int,
                  colour: Optional[Tuple[int, int, int]], level: int,
@@ -115,10 +248,58 @@ class Block:
         """
         self.position = position
         self.size = size
-        self.colour = colour
+        self._colour = colour
         self.level = level
         self.max_depth = max_depth
-        self.children = []
+        self._children = []
+        self._counts = None
+        self._moves = None
+        self._parent = None
+        self._version = 0
+
+    @property
+    def colour(self) -> Optional[Tuple[int, int, int]]:
+        """The colour of this Block, or None if it has children.
+        """
+        return self._colour
+
+    @colour.setter
+    def colour(self, colour: Optional[Tuple[int, int, int]]) -> None:
+        """Set the colour of this Block to <colour>, keeping the counts of
+        unit cells up to date.
+        """
+        old = self._counts
+        self._colour = colour
+        if not self._children:
+            self._recount(old)
+        self._changed()
+
+    @property
+    def children(self) -> List[Block]:
+        """The children of this Block.
+
+        Assigning a new list of children is allowed, and so is changing that
+        list before the unit cells of this Block are next counted. After
+        that, the list must only be changed through the methods of this
+        class, such as replace_child.
+        """
+        return self._children
+
+    @children.setter
+    def children(self, children: List[Block]) -> None:
+        """Replace the children of this Block with <children>, discarding the
+        counts of unit cells of this Block and its ancestors, which are
+        counted again when next needed.
+        """
+        for child in self._children:
+            child._parent = None
+        self._children = children
+        block = self
+        while block is not None and block._counts is not None:
+            block._counts = None
+            block._moves = None
+            block = block._parent
+        self._changed()
 
     def __str__(self) -> str:
         """Return this Block in a string format.
@@ -197,6 +378,150 @@ class Block:
             for i in range(len(self.children)):
                 self.children[i]._update_children_positions(child_pos[i])
 
+    def colour_counts(self) -> Dict[Tuple[int, int, int], int]:
+        """Return the number of unit cells of each colour in this Block.
+
+        Colours with no unit cells in this Block are left out. After the first
+        call, this takes constant time.
+
+        >>> block = Block((0, 0), 750, COLOUR_LIST[0], 0, 1)
+        >>> block.colour_counts() == {COLOUR_LIST[0]: 4}
+        True
+        """
+        if self._counts is None:
+            self._count()
+        return dict(self._counts)
+
+    def colour_count(self, colour: Tuple[int, int, int]) -> int:
+        """Return the number of unit cells of <colour> in this Block.
+        """
+        if self._counts is None:
+            self._count()
+        return self._counts.get(colour, 0)
+
+    def move_count(self, colour: Tuple[int, int, int]) -> int:
+        """Return the number of moves other than PASS that can be made on this
+        Block and its descendants, painting with <colour>.
+
+        Each move is an action and the block it acts on, so a block with
+        children counts two swaps and two rotations. After the first call,
+        this takes constant time.
+
+        >>> Block((0, 0), 750, COLOUR_LIST[0], 0, 1).move_count(COLOUR_LIST[1])
+        1
+        >>> cell = Block((0, 0), 750, COLOUR_LIST[0], 1, 1)
+        >>> cell.move_count(COLOUR_LIST[1]), cell.move_count(COLOUR_LIST[0])
+        (1, 0)
+        """
+        if self._counts is None:
+            self._count()
+        fixed, cells = self._moves
+        return fixed + sum(cells.values()) - cells.get(colour, 0)
+
+    def _count(self) -> None:
+        """Count the unit cells of each colour and the moves that can be made
+        in this Block, counting its descendants first if need be.
+        """
+        if not self._children:
+            d = 2 ** (self.max_depth - self.level)
+            self._counts = {self._colour: d * d}
+            if self.level == self.max_depth:
+                self._moves = (0, {self._colour: 1})
+            else:
+                self._moves = (int(self.smashable()), {})
+        else:
+            counts = {}
+            for child in self._children:
+                child._parent = self
+                if child._counts is None:
+                    child._count()
+                for colour, count in child._counts.items():
+                    counts[colour] = counts.get(colour, 0) + count
+            self._counts = counts
+            self._moves = self._sum_moves()
+
+    def _sum_moves(self) -> Tuple[int, Dict[Tuple[int, int, int], int]]:
+        """Return the moves that can be made in this Block, as described for
+        <_moves>, from those of its children.
+
+        Precondition: this Block has children, and it and they have been
+        counted.
+        """
+        fixed = 4 + int(self.can_combine())
+        cells = {}
+        for child in self._children:
+            child_fixed, child_cells = child._moves
+            fixed += child_fixed
+            for colour, count in child_cells.items():
+                cells[colour] = cells.get(colour, 0) + count
+        return fixed, cells
+
+    def _recount(self, old: Optional[Dict[Tuple[int, int, int], int]]) -> None:
+        """Update the counts of this Block and its ancestors, now that this
+        Block's unit cells have changed from the counts in <old>.
+
+        <old> is None if this Block's unit cells had not been counted, in which
+        case neither had its ancestors', and there is nothing to update.
+        """
+        if old is None:
+            return
+        self._counts = None
+        delta = self.colour_counts()
+        for colour, count in old.items():
+            delta[colour] = delta.get(colour, 0) - count
+        ancestor = self._parent
+        # An ancestor that has not been counted will count this Block again
+        while ancestor is not None and ancestor._counts is not None:
+            for colour, count in delta.items():
+                total = ancestor._counts.get(colour, 0) + count
+                if total:
+                    ancestor._counts[colour] = total
+                else:
+                    ancestor._counts.pop(colour, None)
+            ancestor._moves = ancestor._sum_moves()
+            ancestor = ancestor._parent
+
+    def version(self) -> int:
+        """Return a number that changes whenever this Block or one of its
+        descendants is changed by the methods of this class, such as to tell
+        whether a drawing of this Block is still up to date.
+
+        >>> block = Block((0, 0), 750, COLOUR_LIST[0], 0, 2)
+        >>> block.smash()
+        True
+        >>> before = block.version()
+        >>> child = block.children[0]
+        >>> child.smash() or child.swap(0)
+        True
+        >>> block.version() != before
+        True
+        """
+        # Counting links every descendant to its parent, so that the changes
+        # to descendants reach this Block
+        if self._counts is None:
+            self.colour_counts()
+        return self._version
+
+    def _changed(self) -> None:
+        """Record that this Block has changed, in it and its ancestors.
+        """
+        block = self
+        while block is not None:
+            block._version += 1
+            block = block._parent
+
+    def replace_child(self, index: int, block: Block) -> None:
+        """Replace this Block's child at <index> with <block>.
+
+        Precondition: <block> has the position, size, level and max_depth of
+        the child it replaces, and is not part of another Block.
+        """
+        old = self._counts
+        self.children[index]._parent = None
+        self.children[index] = block
+        self._recount(old)
+        self._changed()
+
     def smashable(self) -> bool:
         """Return True iff this block can be smashed.
 
@@ -205,37 +530,39 @@ class Block:
         """
         return self.level != self.max_depth and not self.children
 
-    def smash(self) -> bool:
-        # TODO: Check
+    def smash(self, rng: Optional[random.Random] = None) -> bool:
         """Sub-divide this block so that it has four randomly generated
-        children.
+        children, drawn from <rng>, or from the random module if <rng> is None.
 
         If this Block's level is <max_depth>, do nothing. If this block has
         children, do nothing.
 
+        Each new child is itself smashed with probability
+        math.exp(-0.25 * level), where level is the child's level.
+
         Return True iff the smash was performed.
         """
         if not self.smashable():
             return False
         # The block can be smashed
-        rand_num = random.random()
-        # If you succeed in smashing, check the recursion step
-        if rand_num < math.exp(-0.25 * self.level):
-            child_pos = self._children_positions()
-            self.colour = None
-            for i in range(4):
-                self.children.append(Block(child_pos[i],
-                                           self._child_size(),
-                                           random.choice(COLOUR_LIST),
-                                           self.level + 1,
-                                           self.max_depth))
-            for child in self.children:
-                if child.smashable():
-                    child.smash()
-            return True
-        else:
-            self.colour = random.choice(COLOUR_LIST)
-            return False
+        if rng is None:
+            rng = random
+        old = self._counts
+        child_pos = self._children_positions()
+        self._colour = None
+        for i in range(4):
+            self._children.append(Block(child_pos[i],
+                                        self._child_size(),
+                                        rng.choice(COLOUR_LIST),
+                                        self.level + 1,
+                                        self.max_depth))
+        for child in self.children:
+            if child.smashable() and \
+                    rng.random() < math.exp(-0.25 * child.level):
+                child.smash(rng)
+        self._recount(old)
+        self._changed()
+        return True
 
     def swap(self, direction: int) -> bool:
         """Swap the child Blocks of this Block.
@@ -247,7 +574,7 @@ class Block:
 
         Precondition: <direction> is either 0 or 1
         """
-        if not self.children:
+        if not self.can_swap():
             return False
         else:
             # Vertical swap
@@ -263,6 +590,7 @@ class Block:
                 self.children[2], self.children[3] = self.children[3], \
                                                      self.children[2]
             self._update_children_positions(self.position)
+            self._changed()
             return True
 
     def rotate(self, direction: int) -> bool:
@@ -276,7 +604,7 @@ class Block:
         Precondition: <direction> is either 1 or 3.
         """
         # Base Case: unit block, cannot be rotated
-        if not self.children:
+        if not self.can_rotate():
             return False
         # Recursive step
         else:
@@ -296,21 +624,67 @@ class Block:
                     child.rotate(1)
             return True
 
+    def can_swap(self) -> bool:
+        """Return True iff this Block's children can be swapped.
+
+        A block can be swapped if it has children.
+        """
+        return len(self.children) != 0
+
+    def can_rotate(self) -> bool:
+        """Return True iff this Block can be rotated.
+
+        A block can be rotated if it has children.
+        """
+        return len(self.children) != 0
+
+    def can_paint(self, colour: Tuple[int, int, int]) -> bool:
+        """Return True iff this Block can be painted <colour>.
+
+        A block can be painted if it is a leaf at a level of max_depth and its
+        colour is different from <colour>.
+        """
+        return not self.children and self.level == self.max_depth and \
+            self.colour != colour
+
+    def can_combine(self) -> bool:
+        """Return True iff this Block can be combined.
+
+        A block can be combined if it is at a level of max_depth - 1, it has
+        children, and its children have a majority colour.
+        """
+        return self.majority_colour() is not None
+
+    def majority_colour(self) -> Optional[Tuple[int, int, int]]:
+        """Return the majority colour of this Block's children, or None if
+        this Block cannot be combined.
+
+        The majority colour is the colour with the most child blocks of that
+        colour. A tie does not constitute a majority.
+        """
+        if self.level != (self.max_depth - 1) or len(self.children) == 0:
+            return None
+        # The children are unit cells, so the counts are of children
+        counts = self.colour_counts()
+        majority = max(counts, key=counts.get)
+        # Some other colour has as many children, so there is no majority
+        if any(counts[c] == counts[majority] for c in counts if c != majority):
+            return None
+        return majority
+
     def paint(self, colour: Tuple[int, int, int]) -> bool:
         """Change this Block's colour iff it is a leaf at a level of max_depth
         and its colour is different from <colour>.
 
         Return True iff this Block's colour was changed.
         """
-        # Both conditions should hold
-        if not self.children and self.level == self.max_depth:
-            if self.colour != colour:
-                self.colour = colour
-                return True
-            else:
-                return False
-        else:
+        if not self.can_paint(colour):
             return False
+        old = self._counts
+        self._colour = colour
+        self._recount(old)
+        self._changed()
+        return True
 
     def combine(self) -> bool:
         """Turn this Block into a leaf based on the majority colour of its
@@ -325,18 +699,17 @@ class Block:
 
         Return True iff this Block was turned into a leaf node.
         """
-        if self.level == (self.max_depth - 1) and len(self.children) != 0:
-            cols_lst = [c.colour for c in self.children]
-            cols = set(cols_lst)
-            # No majority colour
-            if len(cols) == 4 or len(cols) == 2:
-                return False
-            else:
-                self.colour = max(cols, key=cols_lst.count)
-                self.children = []
-                return True
-        else:
+        majority = self.majority_colour()
+        if majority is None:
             return False
+        old = self._counts
+        for child in self._children:
+            child._parent = None
+        self._colour = majority
+        self._children = []
+        self._recount(old)
+        self._changed()
+        return True
 
     def create_copy(self) -> Block:
         """Return a new Block that is a deep copy of this Block.
@@ -346,11 +719,18 @@ class Block:
         copy_block = Block(self.position, self.size,
                            self.colour, self.level,
                            self.max_depth)
+        if self._counts is not None:
+            copy_block._counts = dict(self._counts)
+            # The counts of moves are never changed in place
+            copy_block._moves = self._moves
         if not self.children:
             return copy_block
         else:
             for child in self.children:
-                copy_block.children.append(child.create_copy())
+                child_copy = child.create_copy()
+                if self._counts is not None:
+                    child_copy._parent = copy_block
+                copy_block.children.append(child_copy)
             return copy_block
 
 
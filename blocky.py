@@ -20,16 +20,22 @@ Misha Schwartz, and Jaisie Sin
 === Module Description ===
 
 This file contains the different game states for the Blocky game.
+
+The game states show a game on the screen and pass on the players' events. The
+rules for taking turns are in engine.py.
 """
 
 from __future__ import annotations
-from typing import Dict, List, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
 import pygame
 
-from actions import ACTION_MESSAGE, ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, \
-    SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, PASS, PAINT, COMBINE, ACTION_PENALTY
+from actions import ACTION_MESSAGE
 from block import Block
-from player import Player
+from controls import process_event
+from engine import GameData, TurnEngine
+from movelog import MoveLog
+from player import ComputerPlayer, HumanPlayer
 from renderer import Renderer
 from settings import ANIMATION_DURATION
 
@@ -56,69 +62,6 @@ def _block_to_squares(board: Block) -> List[Tuple[Tuple[int, int, int],
     return [(board.colour, board.position, board.size)]
 
 
-class GameData:
-    """
-    A bundle of the data needed for a Blocky game.
-
-    === Public Attributes ===
-    max_turns:
-        The maximum number of turns for the game.
-    board:
-        The Blocky board on which this game will be played.
-    players:
-        The entities that are playing this game.
-    smashes:
-        The number of smashes done by each player.
-    combines:
-        The number of combines done by each player.
-    paints:
-        The number of paints done by each player.
-
-    === Representation Invariants ===
-    - len(players) >= 1
-    """
-    max_turns: int
-    board: Block
-    players: List[Player]
-    smashes: Dict[int, int]
-    combines: Dict[int, int]
-    paints: Dict[int, int]
-
-    def __init__(self, board: Block, players: List[Player]) -> None:
-        """Initialize the game data, saving a reference to <board> and
-        <players>.
-
-        Precondition:
-            - len(players) >= 1
-        """
-        self.max_turns = 0
-        self.board = board
-        self.players = players
-
-        self.smashes = {}
-        self.combines = {}
-        self.paints = {}
-
-        # Start off all counts at 0
-        for player in players:
-            self.smashes[player.id] = 0
-            self.combines[player.id] = 0
-            self.paints[player.id] = 0
-
-    def calculate_score(self, player_id: int) -> Tuple[int, int]:
-        """Return a tuple containing first the <player_id>'s score based on
-        their goal in the game and second the deductions from their score based
-        on the actions they've taken.
-        """
-        goal_score = self.players[player_id].goal.score(self.board)
-
-        penalty = self.smashes[player_id] * ACTION_PENALTY[SMASH] + \
-                  self.combines[player_id] * ACTION_PENALTY[COMBINE] + \
-                  self.paints[player_id] * ACTION_PENALTY[PAINT]
-
-        return goal_score, penalty
-
-
 class GameState:
     """One of the different states that a Blocky game can be in.
     """
@@ -145,114 +88,189 @@ class MainState(GameState):
     """A GameState that manages the moves made by different players in Blocky.
     """
     # === Private Attributes ===
-    # _turn:
-    #   The current turn.
     # _data:
     #   A reference to the shared GameData.
-    # _current_player_index:
-    #   The index of the current player in GameData.players.
-    # _current_score:
-    #   The score of the current player, including penalties.
-    _turn: int
+    # _engine:
+    #   The turns of the game.
+    # _after_move:
+    #   Called with <_engine> after every move that is done, or None.
+    # _turbo:
+    #   True iff computer players should move as soon as their turns come,
+    #   without animating their moves.
+    # _executor:
+    #   Runs computer players' searches away from the render loop.
+    # _pending:
+    #   The search for the current computer player's move, or None if no
+    #   search is running.
+    # _ponders:
+    #   The searches computer players are doing ahead of their turns, keyed by
+    #   player ID.
     _data: GameData
-    _current_player_index: int
-    _current_score: int
-
-    def __init__(self, data: GameData) -> None:
+    _engine: TurnEngine
+    _after_move: Optional[Callable[[TurnEngine], None]]
+    _turbo: bool
+    _executor: ThreadPoolExecutor
+    _pending: Optional[Future]
+    _ponders: Dict[int, Future]
+
+    def __init__(self, data: GameData, turbo: bool = False,
+                 log: Optional[MoveLog] = None,
+                 engine: Optional[TurnEngine] = None,
+                 after_move: Optional[Callable[[TurnEngine], None]] = None) \
+            -> None:
         """Initialize this GameState.
-        """
-        self._turn = 0
-        self._data = data
-        self._current_player_index = 0
 
-        score, penalty = self._data.calculate_score(self._current_player().id)
-        self._current_score = score - penalty
+        If <turbo> is True, computer players do not wait to be clicked, their
+        moves are found right away instead of in the background, and no moves
+        are animated. If <log> is given, the game is recorded in it.
 
-    def _current_player(self) -> Player:
-        """Return the player whose turn it is.
+        If <engine> is given, the game carries on from the turn it is at, such
+        as after loading a checkpoint, and <log> is not used. If <after_move>
+        is given, it is called with the turns of the game after every move.
         """
-        return self._data.players[self._current_player_index]
-
-    def _update_player(self) -> None:
-        """Update the player whose turn it is.
+        self._data = data
+        if engine is None:
+            engine = TurnEngine(data, log=log)
+        self._engine = engine
+        self._after_move = after_move
+        self._turbo = turbo
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = None
+        self._ponders = {}
+
+        if not turbo:
+            self._start_pondering()
+
+    def turn(self) -> int:
+        """Return the current turn.
         """
-        self._current_player_index = (self._current_player_index + 1) % len(
-            self._data.players)
+        return self._engine.turn
 
-        score, penalty = self._data.calculate_score(self._current_player().id)
-        self._current_score = score - penalty
+    def process_event(self, event: pygame.event.Event) -> None:
+        process_event(self._engine.current_player(), event)
 
-        if self._current_player_index == 0:
-            self._turn += 1
+    def _start_pondering(self) -> None:
+        """Let every computer player search ahead on the current board, in
+        the order their turns come up, so that their moves are ready if the
+        board is still the same when their turns arrive.
 
-    def _do_move(self, move: Tuple[str, Optional[int], Block]) -> bool:
-        """Attempt to do the player's requested move.
+        Searches ahead that have not started yet are abandoned, since they were
+        for an older board.
         """
-        action = (move[0], move[1])
-        direction = move[1]
-        block = move[2]
-        player = self._current_player()
-        move_successful = False
-
-        if action in [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE]:
-            move_successful = block.rotate(direction)
-        elif action in [SWAP_HORIZONTAL, SWAP_VERTICAL]:
-            move_successful = block.swap(direction)
-        elif action == SMASH:
-            move_successful = block.smash()
-            self._data.smashes[player.id] += int(move_successful)
-        elif action == PAINT:
-            move_successful = block.paint(self._current_player().goal.colour)
-            self._data.paints[player.id] += int(move_successful)
-        elif action == COMBINE:
-            move_successful = block.combine()
-            self._data.combines[player.id] += int(move_successful)
-        elif action == PASS:
-            # Do nothing
-            move_successful = True
-
-        if move_successful:
-            self._update_player()
-
-        return move_successful
-
-    def process_event(self, event: pygame.event.Event) -> None:
-        self._current_player().process_event(event)
+        self._stop_pondering()
+        board = self._data.board.create_copy()
+        players = self._data.players
+        for i in range(len(players)):
+            index = (self._engine.current_player_index + i) % len(players)
+            player = players[index]
+            if isinstance(player, ComputerPlayer):
+                player.turns_left = self._engine.turns_left(index)
+                self._ponders[player.id] = self._executor.submit(player.ponder,
+                                                                 board)
+
+    def _stop_pondering(self, keep: Optional[int] = None) -> None:
+        """Abandon the searches ahead that have not started yet, except for
+        the one by the player with ID <keep>.
+        """
+        for player_id, future in self._ponders.items():
+            if player_id != keep:
+                future.cancel()
+        self._ponders = {player_id: future
+                         for player_id, future in self._ponders.items()
+                         if player_id == keep}
+
+    def close(self) -> None:
+        """Abandon the computer players' searches that have not started yet,
+        and let the thread they run on exit once the one running, if any, is
+        done.
+        """
+        self._stop_pondering()
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        self._executor.shutdown(wait=False)
 
     def update(self) -> GameState:
-        if self._turn >= self._data.max_turns:
+        if self._engine.game_over():
+            self.close()
             return GameOverState(self._data)
 
         # Ask the player to make a move
-        move = self._current_player().generate_move(self._data.board)
+        player = self._engine.current_player()
+        player.turns_left = self._engine.turns_left(
+            self._engine.current_player_index)
+        if isinstance(player, ComputerPlayer) and self._turbo:
+            player.proceed()
+            move = player.generate_move(self._data.board)
+        elif isinstance(player, ComputerPlayer):
+            move = self._poll_computer_move(player)
+        else:
+            move = player.generate_move(self._data.board)
 
         if move is None:
             # No move was made, stay in the current state
             return self
+        elif self._turbo:
+            # Do the move without animating it
+            if self._engine.do_move(move) and self._after_move is not None:
+                self._after_move(self._engine)
+            return self
         else:
             # Save what the board looks like before the move
-            background = _block_to_squares(self._data.board)
+            background = self._data.board.create_copy()
             # Also save the current player ID
-            player_id = self._current_player().id
+            player_id = player.id
 
             # Do the move
-            if self._do_move(move):
+            if self._engine.do_move(move):
+                if self._after_move is not None:
+                    self._after_move(self._engine)
+                # The next players can start thinking during the animation
+                self._start_pondering()
                 # Animate the move that was just done
                 return AnimateMoveState(self, player_id, move, background)
             else:
                 # The move was not valid, let the player try again
                 return self
 
+    def _poll_computer_move(self, player: ComputerPlayer) -> \
+            Optional[Tuple[str, Optional[int], Block]]:
+        """Return <player>'s move if its search has finished, or None if it
+        is still searching or has not been told to move yet.
+
+        The search runs on <_executor> so that slow players do not stop events
+        from being handled and the screen from being drawn.
+        """
+        if self._pending is None:
+            if player.is_ready():
+                # The other players' searches ahead would only delay this one
+                self._stop_pondering(keep=player.id)
+                self._pending = self._executor.submit(player.generate_move,
+                                                      self._data.board)
+            return None
+        elif self._pending.done():
+            move = self._pending.result()
+            self._pending = None
+            return move
+        else:
+            return None
+
     def render(self, renderer: Renderer) -> None:
-        renderer.draw_board(_block_to_squares(self._data.board))
+        renderer.draw_block(self._data.board)
 
-        b = self._current_player().get_selected_block(self._data.board)
+        p = self._engine.current_player()
+        if isinstance(p, HumanPlayer):
+            # The mouse may have stayed still since the player's turn began
+            p.point_at(pygame.mouse.get_pos())
+        b = p.get_selected_block(self._data.board)
         if b is not None:
             renderer.highlight_block(b.position, b.size)
 
-        p = self._current_player()
-        status = f'Turn {self._turn} | Player {p.id} | ' \
-                 f'Score {self._current_score} | {p.goal.description()}'
+        status = f'Turn {self._engine.turn} | Player {p.id} | ' \
+                 f'Score {self._engine.current_score} | ' \
+                 f'{p.goal.description()}'
+        if self._pending is not None:
+            status += ' | Thinking...'
         renderer.draw_status(status)
 
 
@@ -270,17 +288,16 @@ class AnimateMoveState(GameState):
     # _start_time:
     #   The time that the animation started.
     # _background:
-    #   The board to display behind the animation.
+    #   A copy of the board before the move, to display behind the animation.
     _parent: GameState
     _player_id: int
     _move: Tuple[str, Optional[int], Block]
     _start_time: int
-    _background: List[Tuple[Tuple[int, int, int], Tuple[int, int], int]]
+    _background: Block
 
     def __init__(self, parent: GameState, player_id: int,
                  move: Tuple[str, Optional[int], Block],
-                 background: List[Tuple[Tuple[int, int, int], Tuple[int, int],
-                                        int]]) -> None:
+                 background: Block) -> None:
         """Initialize this GameState.
         """
         self._parent = parent
@@ -304,7 +321,7 @@ class AnimateMoveState(GameState):
             return self
 
     def render(self, renderer: Renderer) -> None:
-        renderer.draw_board(self._background)
+        renderer.draw_block(self._background)
 
         # Draw an outline around the selected block
         b = self._move[2]
@@ -333,11 +350,7 @@ class GameOverState(GameState):
     def __init__(self, data: GameData) -> None:
         """Initialize this GameState.
         """
-        self._scores = []
-        for p in data.players:
-            goal_score, penalty = data.calculate_score(p.id)
-            self._scores.append((p.id, goal_score, penalty))
-
+        self._scores = data.final_scores()
         self._winner = max(self._scores, key=lambda item: item[1] - item[2])[0]
 
     def process_event(self, event: pygame.event.Event) -> None:
@@ -370,7 +383,8 @@ if __name__ == '__main__':
         'allowed-io': ['run_game'],
         'allowed-import-modules': [
             'doctest', 'python_ta', 'random', 'typing', 'pygame', '__future__',
-            'block', 'player', 'renderer', 'settings', 'actions'
+            'block', 'player', 'renderer', 'settings', 'actions',
+            'concurrent.futures', 'engine', 'movelog', 'controls'
         ],
         'generated-members': 'pygame.*'
     })
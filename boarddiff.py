@@ -0,0 +1,201 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains diffs between boards: compact descriptions of how a board
+changed, so that a copy of it elsewhere can be brought up to date without
+sending or redrawing the whole board.
+
+A diff is a sequence of changes, each made to the block at some path from the
+board (see block_path). Each change is one byte for its kind, one byte for the
+length of the path and one byte per index in it, then:
+
+    ROTATE, SWAP: one byte for the direction of the rotation or swap.
+    LEAF: one byte for the index in COLOUR_LIST of the colour the block is
+        now, without children.
+    SUBTREE: four bytes for the length of the block's encoding, then the
+        block as encoded by encode_board.
+
+Rotations, swaps, paints and combines are always described in a few bytes,
+however big the block. Only a smash, whose result is random, needs the new
+subtree, and that subtree is only as big as the smashed block.
+"""
+from __future__ import annotations
+from typing import List, Optional, Tuple
+
+from actions import ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, \
+    SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, PAINT, COMBINE, PASS
+from block import Block, block_at, decode_board, encode_board
+from settings import COLOUR_LIST
+
+# The kinds of change in a diff.
+ROTATE = 0
+SWAP = 1
+LEAF = 2
+SUBTREE = 3
+
+# The number of bytes for the length of a SUBTREE change's encoding. A board
+# with a max_depth of 8 already takes more than two bytes' worth.
+_LENGTH_BYTES = 4
+
+
+def _header(kind: int, path: List[int]) -> bytes:
+    """Return the bytes that start a change of <kind> at <path>.
+    """
+    return bytes([kind, len(path)] + path)
+
+
+def _subtree(block: Block, path: List[int]) -> bytes:
+    """Return a SUBTREE change that makes the block at <path> <block>.
+    """
+    encoding = encode_board(block)
+    return _header(SUBTREE, path) + \
+        len(encoding).to_bytes(_LENGTH_BYTES, 'big') + encoding
+
+
+def move_diff(board: Block, action: Tuple[str, Optional[int]],
+              path: List[int]) -> bytes:
+    """Return the diff for <action> having been done on the block at <path> in
+    <board>.
+
+    Precondition: <action> has just been done on that block, and every leaf in
+    the block has a colour from COLOUR_LIST.
+
+    >>> board = Block((0, 0), 750, COLOUR_LIST[0], 0, 2)
+    >>> board.smash()
+    True
+    >>> move_diff(board, ROTATE_CLOCKWISE, [])
+    b'\\x00\\x00\\x01'
+    >>> move_diff(board, PASS, [])
+    b''
+    """
+    if action == PASS:
+        return b''
+    elif action in [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE]:
+        return _header(ROTATE, path) + bytes([action[1]])
+    elif action in [SWAP_HORIZONTAL, SWAP_VERTICAL]:
+        return _header(SWAP, path) + bytes([action[1]])
+    block = block_at(board, path)
+    if action in [PAINT, COMBINE]:
+        return _header(LEAF, path) + bytes([COLOUR_LIST.index(block.colour)])
+    assert action == SMASH
+    return _subtree(block, path)
+
+
+def board_diff(old: Block, new: Block) -> bytes:
+    """Return a diff that changes <old> into <new>, made of a LEAF or SUBTREE
+    change for each largest block that is not the same in both.
+
+    This is for boards that have changed in ways other than one known move,
+    such as after several moves. It does not notice rotations and swaps, so
+    they are described by the subtrees they changed.
+
+    Precondition: <old> and <new> have the same position, size and max_depth,
+    and every leaf in <new> has a colour from COLOUR_LIST.
+    """
+    diff = bytearray()
+    stack = [(old, new, [])]
+    while stack:
+        before, after, path = stack.pop()
+        if before.children and after.children:
+            for i in range(3, -1, -1):
+                stack.append((before.children[i], after.children[i],
+                              path + [i]))
+        elif not after.children:
+            if before.children or before.colour != after.colour:
+                diff += _header(LEAF, path) + \
+                    bytes([COLOUR_LIST.index(after.colour)])
+        else:
+            diff += _subtree(after, path)
+    return bytes(diff)
+
+
+def _changes(diff: bytes) -> List[Tuple[int, List[int], bytes]]:
+    """Return the kind, path and the bytes after the path of each change in
+    <diff>, in order.
+    """
+    changes = []
+    i = 0
+    while i < len(diff):
+        kind, length = diff[i], diff[i + 1]
+        path = list(diff[i + 2:i + 2 + length])
+        i += 2 + length
+        if kind == SUBTREE:
+            size = int.from_bytes(diff[i:i + _LENGTH_BYTES], 'big')
+            i += _LENGTH_BYTES
+            payload = diff[i:i + size]
+            i += size
+        else:
+            payload = diff[i:i + 1]
+            i += 1
+        changes.append((kind, path, payload))
+    return changes
+
+
+def apply_diff(board: Block, diff: bytes) -> Block:
+    """Make the changes in <diff> to <board>, and return the board, which is a
+    new Block if a change replaced the whole board.
+
+    Precondition: <diff> was made for a board equal to <board>.
+    """
+    for kind, path, payload in _changes(diff):
+        block = block_at(board, path)
+        if kind == ROTATE:
+            block.rotate(payload[0])
+        elif kind == SWAP:
+            block.swap(payload[0])
+        else:
+            if kind == LEAF:
+                new = Block(block.position, block.size, COLOUR_LIST[payload[0]],
+                            block.level, block.max_depth)
+            else:
+                new = decode_board(payload, block.position, block.size,
+                                   block.level, block.max_depth)
+            if not path:
+                board = new
+            else:
+                block_at(board, path[:-1]).replace_child(path[-1], new)
+    return board
+
+
+def diff_regions(board: Block, diff: bytes) -> \
+        List[Tuple[Tuple[int, int], int]]:
+    """Return the position and size of each block changed by <diff> in
+    <board>, which is all of the board that needs to be drawn again after
+    it.
+
+    Precondition: <diff> was made for a board of the same size as <board>.
+    """
+    regions = []
+    for _, path, _ in _changes(diff):
+        block = block_at(board, path)
+        regions.append((block.position, block.size))
+    return regions
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'typing', '__future__', 'actions',
+            'block', 'settings'
+        ]
+    })
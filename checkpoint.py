@@ -0,0 +1,247 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains checkpoints of a game in progress: everything needed to
+carry on with the game later, in another process, as if it had never stopped.
+
+A checkpoint holds the board (encoded by encode_board), the number of turns,
+the turn and player whose move is next, each player's kind, goal and settings,
+how many smashes, combines and paints each player has done, the seed for
+smashes (see TurnEngine), and the state of every random number generator the
+game draws from: the engine's, each computer player's, and the random module,
+for those that have no generator of their own. It is saved as JSON, with the
+board in hexadecimal as in a move log (see movelog.py), so a checkpoint file
+can be read without running any of its contents, and it is cheap enough to
+make after every move.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import os
+import random
+
+from block import decode_board, encode_board
+from engine import GameData, TurnEngine, run_turns
+from goal import make_goal
+from player import Player, ComputerPlayer, HumanPlayer, RandomPlayer, \
+    SmartPlayer, BeamPlayer
+from settings import COLOUR_LIST
+
+# The version of the checkpoint format, which is saved in every checkpoint.
+VERSION = 3
+
+
+def snapshot(engine: TurnEngine) -> str:
+    """Return a checkpoint of the game being played by <engine>.
+
+    Precondition: every leaf in the board has a colour from COLOUR_LIST.
+    """
+    data = engine.data
+    state = {
+        'version': VERSION,
+        'board': encode_board(data.board).hex(),
+        'size': data.board.size,
+        'max_depth': data.board.max_depth,
+        'max_turns': data.max_turns,
+        'turn': engine.turn,
+        'current_player_index': engine.current_player_index,
+        'seed': engine.seed,
+        'rng': _rng_state(engine.rng),
+        'players': [_player_state(p) for p in data.players],
+        'smashes': data.smashes,
+        'combines': data.combines,
+        'paints': data.paints,
+        'random': _json_state(random.getstate())
+    }
+    return json.dumps(state)
+
+
+def restore(checkpoint: str) -> TurnEngine:
+    """Return the turns of the game saved in <checkpoint> by snapshot, with
+    every random number generator, and the random module, set back to the
+    state it was in then.
+
+    Raise a ValueError if <checkpoint> was made by another version of this
+    module.
+    """
+    state = json.loads(checkpoint)
+    if state.get('version') != VERSION:
+        raise ValueError(f'checkpoint version {state.get("version")} is not '
+                         f'{VERSION}')
+
+    board = decode_board(bytes.fromhex(state['board']), (0, 0), state['size'],
+                         0, state['max_depth'])
+    players = [_make_player(i, player_state)
+               for i, player_state in enumerate(state['players'])]
+    data = GameData(board, players)
+    data.max_turns = state['max_turns']
+    # JSON keeps the player IDs that these are keyed by as strings
+    data.smashes = _int_keys(state['smashes'])
+    data.combines = _int_keys(state['combines'])
+    data.paints = _int_keys(state['paints'])
+
+    engine = TurnEngine(data, seed=state['seed'],
+                        rng=_make_rng(state['rng']))
+    engine.turn = state['turn']
+    engine.current_player_index = state['current_player_index']
+    score, penalty = data.calculate_score(engine.current_player().id)
+    engine.current_score = score - penalty
+
+    random.setstate(_tuple_state(state['random']))
+    return engine
+
+
+def _int_keys(counts: Dict[str, int]) -> Dict[int, int]:
+    """Return <counts> with each of its keys turned back into an int.
+    """
+    return {int(key): count for key, count in counts.items()}
+
+
+def _json_state(state: Tuple) -> List:
+    """Return the state of a random number generator, as returned by its
+    getstate method, as a list that JSON can hold.
+    """
+    version, internal, gauss = state
+    return [version, list(internal), gauss]
+
+
+def _tuple_state(state: List) -> Tuple:
+    """Return the state of a random number generator returned by _json_state
+    as its setstate method expects it.
+    """
+    version, internal, gauss = state
+    return version, tuple(internal), gauss
+
+
+def _rng_state(rng: Optional[random.Random]) -> Optional[List]:
+    """Return the state of <rng> as _json_state does, or None if <rng> is
+    None.
+    """
+    return None if rng is None else _json_state(rng.getstate())
+
+
+def _make_rng(state: Optional[List]) -> Optional[random.Random]:
+    """Return a new random number generator in the <state> returned by
+    _rng_state, or None if <state> is None.
+    """
+    if state is None:
+        return None
+    rng = random.Random()
+    rng.setstate(_tuple_state(state))
+    return rng
+
+
+def _player_state(player: Player) -> \
+        Tuple[str, str, int, Dict[str, Any], Optional[List]]:
+    """Return the kind of <player>, the class name and colour index of their
+    goal, the settings needed to make them again, and the state of their random
+    number generator.
+    """
+    goal = (type(player.goal).__name__, COLOUR_LIST.index(player.goal.colour))
+    if isinstance(player, SmartPlayer):
+        settings = {'difficulty': player.difficulty,
+                    'time_budget': player.time_budget}
+    elif isinstance(player, BeamPlayer):
+        settings = {'width': player.width, 'depth': player.depth,
+                    'time_budget': player.time_budget}
+    else:
+        settings = {}
+    rng = player.rng if isinstance(player, ComputerPlayer) else None
+    return type(player).__name__, goal[0], goal[1], settings, _rng_state(rng)
+
+
+def _make_player(player_id: int,
+                 player_state: Tuple[str, str, int, Dict[str, Any],
+                                     Optional[List]]) -> Player:
+    """Return a new player with <player_id> from the <player_state> returned by
+    _player_state.
+    """
+    kind, goal_name, colour, settings, rng_state = player_state
+    goal = make_goal(goal_name, COLOUR_LIST[colour])
+    kinds = {cls.__name__: cls for cls in [HumanPlayer, RandomPlayer,
+                                           SmartPlayer, BeamPlayer]}
+    player = kinds[kind](player_id, goal, **settings)
+    if isinstance(player, ComputerPlayer):
+        player.rng = _make_rng(rng_state)
+    return player
+
+
+def save_checkpoint(path: str, engine: TurnEngine) -> None:
+    """Save a checkpoint of the game being played by <engine> in the file named
+    <path>.
+
+    The checkpoint is written to another file first and then put in place, so
+    the file at <path> is never left half written if the process dies.
+    """
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+        f.write(snapshot(engine))
+    os.replace(temp_path, path)
+
+
+def keep_checkpoint(path: str, engine: TurnEngine) -> None:
+    """Save a checkpoint of the game being played by <engine> in the file
+    named <path> as save_checkpoint does, or remove the file if the game is
+    over, since there is nothing left to carry on with.
+    """
+    if engine.game_over():
+        if os.path.exists(path):
+            os.remove(path)
+    else:
+        save_checkpoint(path, engine)
+
+
+def load_checkpoint(path: str) -> TurnEngine:
+    """Return the turns of the game saved in the file named <path> by
+    save_checkpoint.
+    """
+    with open(path) as f:
+        return restore(f.read())
+
+
+def resume_game(path: str,
+                timings: Optional[List[Tuple[int, float]]] = None) -> \
+        List[Tuple[int, int, int]]:
+    """Carry on with the game saved in the file named <path> without a display,
+    saving a checkpoint there after every move, and return each player ID,
+    goal score, and penalty at the end. The file is removed once the game is
+    over.
+
+    <timings> is as for play_game.
+
+    Precondition: every player in the game is a ComputerPlayer.
+    """
+    engine = load_checkpoint(path)
+    run_turns(engine, timings,
+              lambda turns: keep_checkpoint(path, turns))
+    return engine.data.final_scores()
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-io': ['save_checkpoint', 'load_checkpoint'],
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'typing', '__future__', 'json', 'os',
+            'random', 'block', 'engine', 'goal', 'player', 'settings'
+        ]
+    })
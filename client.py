@@ -0,0 +1,270 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains a command-line program that tests how much load a game
+server (see server.py) can take, by connecting many clients at once that each
+play many games, making random moves for the remote players.
+
+Each client keeps its own copy of the board, changed only by the moved lines
+the server sends, and checks it against the server's board at the end of every
+game. For example, to test a server that this program starts itself, with 50
+clients that each play 20 games:
+
+    python client.py --local --clients 50 --games 20 \\
+        --seats remote,random,smart:5
+"""
+from __future__ import annotations
+from typing import List, Optional, Tuple
+import argparse
+import asyncio
+import random
+import time
+
+from block import block_path, decode_board, encode_board
+from boarddiff import apply_diff
+from goal import Goal, make_goal
+from player import RandomPlayer
+from server import GameServer, serve
+from settings import COLOUR_LIST
+from tournament import percentile
+
+
+def _parse_goals(text: str) -> List[Goal]:
+    """Return the goals listed in a game line.
+    """
+    goals = []
+    for item in text.split(','):
+        name, colour = item.split(':')
+        goals.append(make_goal(name, COLOUR_LIST[int(colour)]))
+    return goals
+
+
+class ServerError(Exception):
+    """An error line sent by a game server."""
+    pass
+
+
+class LoadClient:
+    """One connection to a game server, which plays games on it.
+
+    === Public Attributes ===
+    latencies:
+        The seconds from sending each new or move line to being told it was a
+        remote player's turn again, or the game was over.
+    moves:
+        The number of moves made in this client's games, by any player.
+    mismatches:
+        The number of games whose board, as changed by the moved lines, was
+        not the server's board at the end.
+    """
+    latencies: List[float]
+    moves: int
+    mismatches: int
+
+    # === Private Attributes ===
+    # _reader, _writer:
+    #   The connection to the server.
+    # _rng:
+    #   The random number generator the remote players' moves are drawn from.
+    _reader: asyncio.StreamReader
+    _writer: asyncio.StreamWriter
+    _rng: random.Random
+
+    def __init__(self, reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter, rng: random.Random) -> None:
+        """Initialize a client that has connected to a server through <reader>
+        and <writer>, and draws its moves from <rng>.
+        """
+        self._reader = reader
+        self._writer = writer
+        self._rng = rng
+        self.latencies = []
+        self.moves = 0
+        self.mismatches = 0
+
+    async def _send(self, line: str) -> List[List[str]]:
+        """Send <line> to the server, and return the words of each line it
+        answers with, up to the turn or over line.
+
+        Raise a ServerError if the server answers with an error line.
+        """
+        start = time.perf_counter()
+        self._writer.write((line + '\n').encode())
+        await self._writer.drain()
+        replies = []
+        while True:
+            words = (await self._reader.readline()).decode().split()
+            if not words:
+                raise ConnectionError('the server closed the connection')
+            elif words[0] == 'error':
+                raise ServerError(' '.join(words[1:]))
+            replies.append(words)
+            if words[0] in ['turn', 'over']:
+                self.latencies.append(time.perf_counter() - start)
+                return replies
+            elif words[0] == 'board':
+                return replies
+
+    async def play(self, max_depth: int, num_turns: int, seed: int,
+                   seats: str) -> List[Tuple[int, int, int]]:
+        """Play one game with the settings of a new line, and return each
+        player ID, goal score, and penalty at the end.
+        """
+        replies = await self._send(f'new {max_depth} {num_turns} {seed} '
+                                   f'{seats}')
+        _, game_id, size, depth, encoding, goals_text = replies[0]
+        board = decode_board(bytes.fromhex(encoding), (0, 0), int(size), 0,
+                             int(depth))
+        goals = _parse_goals(goals_text)
+        replies = replies[1:]
+
+        while True:
+            for words in replies:
+                if words[0] == 'moved':
+                    self.moves += 1
+                    if words[7] != '-':
+                        board = apply_diff(board, bytes.fromhex(words[7]))
+            last = replies[-1]
+            if last[0] == 'over':
+                break
+            player = RandomPlayer(int(last[2]), goals[int(last[2])],
+                                  self._rng)
+            player.proceed()
+            action, direction, block = player.generate_move(board)
+            direction = '-' if direction is None else direction
+            path = ''.join(str(i) for i in block_path(board, block)) or '-'
+            replies = await self._send(f'move {game_id} {action} '
+                                       f'{direction} {path}')
+
+        server_board = (await self._send(f'board {game_id}'))[0][2]
+        if server_board != encode_board(board).hex():
+            self.mismatches += 1
+        scores = []
+        for item in last[2].split(','):
+            player_id, score, penalty = item.split(':')
+            scores.append((int(player_id), int(score), int(penalty)))
+        return scores
+
+    def close(self) -> None:
+        """Close the connection to the server.
+        """
+        self._writer.close()
+
+
+async def run_clients(clients: int, games: int, max_depth: int,
+                      num_turns: int, seats: str, seed: int = 0,
+                      host: str = '127.0.0.1', port: int = 8148,
+                      path: Optional[str] = None) -> List[LoadClient]:
+    """Connect <clients> clients at once to the server at the Unix socket named
+    <path>, or at <port> on <host> if <path> is None, and play <games> games
+    on each, one after another. Return the clients once every game is over.
+
+    Client i plays its games with the seeds <seed> + i * <games> onwards, and
+    the other arguments are as for a new line.
+    """
+    async def connect(i: int) -> LoadClient:
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        client = LoadClient(reader, writer, random.Random(seed + i))
+        try:
+            for game in range(games):
+                await client.play(max_depth, num_turns, seed + i * games + game,
+                                  seats)
+        finally:
+            client.close()
+        return client
+
+    return list(await asyncio.gather(*[connect(i) for i in range(clients)]))
+
+
+def report(results: List[LoadClient], games: int, elapsed: float) -> str:
+    """Return a summary of the load test whose clients are <results>, which
+    played <games> games each in <elapsed> seconds.
+    """
+    total = len(results) * games
+    moves = sum(client.moves for client in results)
+    latencies = sorted(t for client in results for t in client.latencies)
+    lines = [f'{total} games, {moves} moves in {elapsed:.2f}s '
+             f'({total / elapsed:.1f} games/s, {moves / elapsed:.1f} moves/s)',
+             'round trip ms: ' + ', '.join(
+                 f'p{p} {percentile(latencies, p) * 1000:.2f}'
+                 for p in [50, 90, 99, 100]),
+             f'boards out of step: '
+             f'{sum(client.mismatches for client in results)}']
+    return '\n'.join(lines)
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    """Run a load test with the settings in the command-line <args>, and print
+    the results.
+    """
+    parser = argparse.ArgumentParser(
+        description='Test a Blocky game server with many clients at once.')
+    parser.add_argument('--clients', type=int, default=10,
+                        help='number of clients connected at once')
+    parser.add_argument('--games', type=int, default=10,
+                        help='number of games each client plays')
+    parser.add_argument('--depth', type=int, default=3,
+                        help='max_depth of the boards')
+    parser.add_argument('--turns', type=int, default=5,
+                        help='number of turns in each game')
+    parser.add_argument('--seats', default='remote,random,smart:5',
+                        help='players in each game, as in a new line')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='random seed of the first game')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='address of the server')
+    parser.add_argument('--port', type=int, default=8148,
+                        help='TCP port of the server')
+    parser.add_argument('--unix', default=None,
+                        help='Unix socket of the server instead of TCP')
+    parser.add_argument('--local', action='store_true',
+                        help='start a server in this process to test')
+    options = parser.parse_args(args)
+
+    async def run() -> None:
+        port = options.port
+        server = listener = None
+        if options.local:
+            server = GameServer()
+            listener = await serve(server, options.host, 0, options.unix)
+            if options.unix is None:
+                port = listener.sockets[0].getsockname()[1]
+        try:
+            start = time.perf_counter()
+            results = await run_clients(options.clients, options.games,
+                                        options.depth, options.turns,
+                                        options.seats, options.seed,
+                                        options.host, port, options.unix)
+            print(report(results, options.games,
+                         time.perf_counter() - start))
+        finally:
+            if listener is not None:
+                listener.close()
+                server.close()
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains the keys that choose each action in the pygame interface,
+and passes on the events of the pygame interface to the players.
+"""
+import pygame
+
+from actions import ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, \
+    SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, COMBINE, PAINT, PASS
+from player import ComputerPlayer, HumanPlayer, Player
+
+ACTION_KEY = {
+    ROTATE_CLOCKWISE: pygame.K_d,
+    ROTATE_COUNTER_CLOCKWISE: pygame.K_a,
+    SWAP_HORIZONTAL: pygame.K_q,
+    SWAP_VERTICAL: pygame.K_e,
+    SMASH: pygame.K_SPACE,
+    COMBINE: pygame.K_c,
+    PAINT: pygame.K_r,
+    PASS: pygame.K_TAB
+}
+
+# Create a dictionary that is ACTION_KEY inverted
+KEY_ACTION = {value: key for key, value in ACTION_KEY.items()}
+
+# The keys that select the block one level up and one level down
+LARGER_KEY = pygame.K_w
+SMALLER_KEY = pygame.K_s
+
+
+def process_event(player: Player, event: pygame.event.Event) -> None:
+    """Pass on <event> to <player>, if it means anything to them.
+
+    A human player points at the position of the mouse, and picks the level
+    and action with the keys above. A computer player makes its next move when
+    the left mouse button is clicked.
+    """
+    if isinstance(player, HumanPlayer):
+        player.point_at(pygame.mouse.get_pos())
+        if event.type == pygame.KEYDOWN:
+            if event.key in KEY_ACTION:
+                player.choose_action(KEY_ACTION[event.key])
+            elif event.key == LARGER_KEY:
+                player.select_larger()
+            elif event.key == SMALLER_KEY:
+                player.select_smaller()
+    elif isinstance(player, ComputerPlayer):
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            player.proceed()
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'pygame', 'actions', 'player'
+        ],
+        'generated-members': 'pygame.*'
+    })
@@ -0,0 +1,313 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains a solver for a player's last turn of the game.
+
+On a player's last turn, nothing that happens afterwards matters to them, so
+the best move is simply the one that maximizes their goal score minus the
+move's penalty. The solver checks every valid (action, block) pair, but first
+works out an upper bound on what each pair could gain. Pairs are examined from
+the highest bound down, a few at a time, and the search stops as soon as no
+remaining pair could beat the best one found.
+
+Smashes are left out: what they produce is random, so no smash is certain to
+be the best move.
+"""
+from __future__ import annotations
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from actions import ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, \
+    SWAP_HORIZONTAL, SWAP_VERTICAL, PAINT, COMBINE, PASS, ACTION_PENALTY
+from block import Block
+from goal import Goal, BlobGoal, PerimeterGoal, score_delta
+from grids import move_cells, palette_grid, score_batch
+from settings import COLOUR_LIST
+
+# A move, and the column and row of the upper-left unit cell of the block it
+# acts on and that block's width in unit cells.
+Candidate = Tuple[Tuple[str, Optional[int], Block], int, int, int]
+
+# The number of moves whose exact gains are found at once.
+_BATCH = 16
+
+
+def solve_last_turn(board: Block, goal: Goal) -> \
+        Tuple[Tuple[str, Optional[int], Block], int]:
+    """Return the move on <board> that gives the highest score for <goal>
+    minus the move's penalty, along with how much better that is than the
+    current score. PAINT moves paint <goal>'s colour.
+
+    Return PASS on <board>, and 0, if no move does better than passing.
+
+    This function does not mutate <board>.
+    """
+    grid = palette_grid(board)
+    if isinstance(goal, BlobGoal):
+        bounds = _BlobBounds(goal, grid)
+    else:
+        bounds = _PerimeterBounds(goal, len(grid))
+
+    candidates = []
+    for move, x, y, d in candidate_moves(board, goal.colour):
+        action = (move[0], move[1])
+        gain = bounds.gain_bound(action, x, y, d)
+        candidates.append((gain - ACTION_PENALTY[action], move, x, y, d))
+
+    candidates.sort(key=lambda item: item[0], reverse=True)
+    best_move = (PASS[0], PASS[1], board)
+    best_value = 0
+    start = 0
+    # Once a bound is no more than the best value found so far, nothing from
+    # there on can beat it
+    while start < len(candidates) and candidates[start][0] > best_value:
+        batch = [item for item in candidates[start:start + _BATCH]
+                 if item[0] > best_value]
+        start += len(batch)
+        moves = [(move, x, y, d) for _, move, x, y, d in batch]
+        for (move, _, _, _), gain in zip(moves, bounds.gains(board, moves)):
+            value = gain - ACTION_PENALTY[(move[0], move[1])]
+            if value > best_value:
+                best_move, best_value = move, value
+    return best_move, best_value
+
+
+def candidate_moves(board: Block, colour: Tuple[int, int, int]) -> \
+        Iterator[Candidate]:
+    """Yield every move other than PASS and SMASH that can be made on
+    <board>, painting with <colour>, with where its block is in <board>'s
+    palette grid.
+
+    Rotations and swaps of a block whose unit cells are all one colour change
+    nothing, so they are left out.
+    """
+    stack = [(board, 0, 0, 2 ** (board.max_depth - board.level))]
+    while stack:
+        block, x, y, d = stack.pop()
+        for action in _final_actions(block, colour):
+            yield (action[0], action[1], block), x, y, d
+        half = d // 2
+        # Children are ordered upper-right, upper-left, lower-left, lower-right
+        corners = [(x + half, y), (x, y), (x, y + half), (x + half, y + half)]
+        for child, (cx, cy) in zip(block.children, corners):
+            stack.append((child, cx, cy, half))
+
+
+def _final_actions(block: Block, colour: Tuple[int, int, int]) -> \
+        List[Tuple[str, Optional[int]]]:
+    """Return the actions other than PASS and SMASH that can be performed on
+    <block>, painting with <colour>, leaving out rotations and swaps that
+    would change nothing because all of <block>'s unit cells are one colour.
+    """
+    actions = []
+    if len(block.colour_counts()) > 1:
+        if block.can_rotate():
+            actions.extend([ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE])
+        if block.can_swap():
+            actions.extend([SWAP_HORIZONTAL, SWAP_VERTICAL])
+    if block.can_paint(colour):
+        actions.append(PAINT)
+    if block.can_combine():
+        actions.append(COMBINE)
+    return actions
+
+
+def fill_colour(move: Tuple[str, Optional[int], Block],
+                colour: Tuple[int, int, int]) -> Optional[int]:
+    """Return the palette index that <move> makes every cell of its block, as
+    grids.move_cells expects, when it paints with <colour>, or None if it only
+    moves cells around.
+    """
+    if (move[0], move[1]) == PAINT:
+        return COLOUR_LIST.index(colour)
+    elif (move[0], move[1]) == COMBINE:
+        return COLOUR_LIST.index(move[2].majority_colour())
+    return None
+
+
+class _PerimeterBounds:
+    """Bounds and exact gains for the moves on a board, for a PerimeterGoal.
+
+    A move can only gain the unit cells of the moved block that are on the
+    sides of the board, so blocks away from the sides are never examined.
+    """
+    # === Private Attributes ===
+    # _goal:
+    #   The goal whose score is being maximized.
+    # _width:
+    #   The width of the board in unit cells.
+    _goal: PerimeterGoal
+    _width: int
+
+    def __init__(self, goal: PerimeterGoal, width: int) -> None:
+        """Initialize the bounds for <goal> on a board <width> unit cells
+        wide.
+        """
+        self._goal = goal
+        self._width = width
+
+    def gain_bound(self, action: Tuple[str, Optional[int]], x: int, y: int,
+                   d: int) -> int:
+        """Return an upper bound on the score gained by performing <action>
+        on the <d> by <d> block whose upper-left unit cell is at (<x>, <y>).
+        """
+        n = self._width
+        # The number of the block's unit cells on each side of the board
+        return d * ((x == 0) + (y == 0) + (x + d == n) + (y + d == n))
+
+    def gains(self, board: Block, moves: List[Candidate]) -> List[int]:
+        """Return the score gained by making each of <moves> on <board>.
+        """
+        return [score_delta(self._goal, board, move) for move, _, _, _ in moves]
+
+
+class _BlobBounds:
+    """Bounds and exact gains for the moves on a board, for a BlobGoal.
+
+    A move only changes the cells of the moved block. Afterwards, any blob
+    that did not touch the block or its neighbouring cells is unchanged, and
+    any other blob is made of target-coloured cells in the block plus the
+    cells outside the block of the blobs that touched it. So the new score is
+    at most the larger of the current score and the sum of those.
+
+    Exact gains are found by making the moves on copies of the board's palette
+    grid, which are scored together by grids.score_batch.
+    """
+    # === Private Attributes ===
+    # _goal:
+    #   The goal whose score is being maximized.
+    # _grid:
+    #   The palette grid of the board.
+    # _labels:
+    #   A parallel structure to _grid, with the index in _sizes of the blob
+    #   each unit cell belongs to, or -1 if the cell is not the goal's colour.
+    # _sizes:
+    #   The size of each blob on the board.
+    # _score:
+    #   The current score.
+    # _regions:
+    #   The number of target-coloured cells in each block examined so far,
+    #   and the labels of the blobs touching it, keyed by its upper-left unit
+    #   cell and width.
+    _goal: BlobGoal
+    _grid: np.ndarray
+    _labels: List[List[int]]
+    _sizes: List[int]
+    _score: int
+    _regions: Dict[Tuple[int, int, int], Tuple[int, Set[int]]]
+
+    def __init__(self, goal: BlobGoal, grid: np.ndarray) -> None:
+        """Initialize the bounds for <goal> on the palette grid <grid>,
+        finding every blob on it.
+        """
+        self._goal = goal
+        self._grid = grid
+        n = len(grid)
+        self._labels = [[-1] * n for _ in range(n)]
+        self._sizes = []
+        if goal.colour in COLOUR_LIST:
+            cells = (grid == COLOUR_LIST.index(goal.colour)).tolist()
+            for i in range(n):
+                for j in range(n):
+                    if self._labels[i][j] == -1 and cells[i][j]:
+                        self._sizes.append(self._label_blob(
+                            cells, i, j, len(self._sizes)))
+        self._score = max(self._sizes, default=0)
+        self._regions = {}
+
+    def _label_blob(self, cells: List[List[bool]], i: int, j: int,
+                    label: int) -> int:
+        """Label every cell of the blob that includes the cell at column <i>
+        and row <j> with <label>, and return the size of the blob.
+
+        <cells> is a parallel structure to _grid that is True where a unit
+        cell is the goal's colour.
+        """
+        n = len(cells)
+        size = 0
+        stack = [(i, j)]
+        while stack:
+            i, j = stack.pop()
+            if 0 <= i < n and 0 <= j < n and self._labels[i][j] == -1 and \
+                    cells[i][j]:
+                self._labels[i][j] = label
+                size += 1
+                stack.extend([(i + 1, j), (i - 1, j), (i, j + 1), (i, j - 1)])
+        return size
+
+    def _region(self, x: int, y: int, d: int) -> Tuple[int, Set[int]]:
+        """Return the number of target-coloured cells in the <d> by <d> block
+        whose upper-left unit cell is at (<x>, <y>), and the labels of the
+        blobs in it or next to it.
+        """
+        if (x, y, d) not in self._regions:
+            n = len(self._grid)
+            inside = 0
+            touching = set()
+            for i in range(max(0, x - 1), min(n, x + d + 1)):
+                for j in range(max(0, y - 1), min(n, y + d + 1)):
+                    label = self._labels[i][j]
+                    if label != -1:
+                        touching.add(label)
+                        inside += x <= i < x + d and y <= j < y + d
+            self._regions[(x, y, d)] = (inside, touching)
+        return self._regions[(x, y, d)]
+
+    def gain_bound(self, action: Tuple[str, Optional[int]], x: int, y: int,
+                   d: int) -> int:
+        """Return an upper bound on the score gained by performing <action>
+        on the <d> by <d> block whose upper-left unit cell is at (<x>, <y>).
+        """
+        inside, touching = self._region(x, y, d)
+        # The touching blobs' cells outside the block
+        outside = sum(self._sizes[label] for label in touching) - inside
+        if action == PAINT:
+            inside += 1
+        elif action == COMBINE:
+            # Combining can at most make the whole block the target colour
+            inside = d * d
+        elif inside == 0:
+            # Moving the cells of a block with no target-coloured cells
+            # changes no blob
+            return 0
+        return max(0, inside + outside - self._score)
+
+    def gains(self, board: Block, moves: List[Candidate]) -> List[int]:
+        """Return the score gained by making each of <moves> on <board>.
+        """
+        grids = np.repeat(self._grid[None], len(moves), axis=0)
+        for k, (move, x, y, d) in enumerate(moves):
+            move_cells(grids[k], (move[0], move[1]), x, y, d,
+                       fill_colour(move, self._goal.colour))
+        return (score_batch(self._goal, grids) - self._score).tolist()
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'typing', '__future__', 'numpy', 'actions',
+            'block', 'goal', 'grids', 'settings'
+        ],
+        'max-attributes': 15
+    })
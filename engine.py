@@ -0,0 +1,297 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains the rules for taking turns in a Blocky game, separate from
+how the game is shown on the screen.
+
+Nothing here uses pygame, so games between computer players can be played
+without a display, as fast as the players can choose their moves.
+"""
+from __future__ import annotations
+from typing import Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+import random
+import time
+
+from actions import SMASH, PASS, PAINT, COMBINE, ACTION_PENALTY, apply_action
+from block import Block, block_path
+from player import Player, ComputerPlayer
+
+if TYPE_CHECKING:
+    from movelog import MoveLog
+
+
+class GameData:
+    """
+    A bundle of the data needed for a Blocky game.
+
+    === Public Attributes ===
+    max_turns:
+        The maximum number of turns for the game.
+    board:
+        The Blocky board on which this game will be played.
+    players:
+        The entities that are playing this game.
+    smashes:
+        The number of smashes done by each player.
+    combines:
+        The number of combines done by each player.
+    paints:
+        The number of paints done by each player.
+
+    === Representation Invariants ===
+    - len(players) >= 1
+    """
+    max_turns: int
+    board: Block
+    players: List[Player]
+    smashes: Dict[int, int]
+    combines: Dict[int, int]
+    paints: Dict[int, int]
+
+    def __init__(self, board: Block, players: List[Player]) -> None:
+        """Initialize the game data, saving a reference to <board> and
+        <players>.
+
+        Precondition:
+            - len(players) >= 1
+        """
+        self.max_turns = 0
+        self.board = board
+        self.players = players
+
+        self.smashes = {}
+        self.combines = {}
+        self.paints = {}
+
+        # Start off all counts at 0
+        for player in players:
+            self.smashes[player.id] = 0
+            self.combines[player.id] = 0
+            self.paints[player.id] = 0
+
+    def calculate_score(self, player_id: int) -> Tuple[int, int]:
+        """Return a tuple containing first the <player_id>'s score based on
+        their goal in the game and second the deductions from their score based
+        on the actions they've taken.
+        """
+        goal_score = self.players[player_id].goal.score(self.board)
+
+        penalty = self.smashes[player_id] * ACTION_PENALTY[SMASH] + \
+                  self.combines[player_id] * ACTION_PENALTY[COMBINE] + \
+                  self.paints[player_id] * ACTION_PENALTY[PAINT]
+
+        return goal_score, penalty
+
+    def final_scores(self) -> List[Tuple[int, int, int]]:
+        """Return a list of tuples containing each player ID, goal score, and
+        penalty, in the order of the players.
+        """
+        scores = []
+        for p in self.players:
+            goal_score, penalty = self.calculate_score(p.id)
+            scores.append((p.id, goal_score, penalty))
+        return scores
+
+
+class TurnEngine:
+    """The turns of a Blocky game: whose turn it is, and making their moves.
+
+    Every player makes one move per turn, in the order of GameData.players.
+
+    === Public Attributes ===
+    data:
+        The game being played.
+    turn:
+        The current turn.
+    current_player_index:
+        The index of the current player in data.players.
+    current_score:
+        The score of the current player, including penalties.
+    seed:
+        If not None, what each smash produces depends only on this number and
+        how many moves came before it, so that smashes can be made again
+        exactly when the game is replayed.
+    rng:
+        The random number generator smashes are drawn from when <seed> is
+        None, or None if they are drawn from the random module.
+    """
+    data: GameData
+    turn: int
+    current_player_index: int
+    current_score: int
+    seed: Optional[int]
+    rng: Optional[random.Random]
+
+    # === Private Attributes ===
+    # _log:
+    #   Where each move made is recorded, or None if moves are not recorded.
+    _log: Optional[MoveLog]
+
+    def __init__(self, data: GameData, seed: Optional[int] = None,
+                 log: Optional[MoveLog] = None,
+                 rng: Optional[random.Random] = None) -> None:
+        """Initialize the turns of the game in <data>, starting with the first
+        player's first turn.
+
+        If <log> is given, the start of the game and every move made are
+        recorded in it, and the log's seed is used instead of <seed>.
+        """
+        self.data = data
+        self.turn = 0
+        self.current_player_index = 0
+        self.seed = seed
+        self.rng = rng
+        self._log = log
+        if log is not None:
+            self.seed = log.seed
+            log.start(data)
+
+        score, penalty = self.data.calculate_score(self.current_player().id)
+        self.current_score = score - penalty
+
+    def current_player(self) -> Player:
+        """Return the player whose turn it is.
+        """
+        return self.data.players[self.current_player_index]
+
+    def game_over(self) -> bool:
+        """Return True iff every turn of the game has been played.
+        """
+        return self.turn >= self.data.max_turns
+
+    def turns_left(self, index: int) -> int:
+        """Return the number of turns the player at <index> in data.players has
+        left, including the current turn if they have not moved in it yet.
+        """
+        # Players before the current one next move in the next turn
+        turn = self.turn + int(index < self.current_player_index)
+        return self.data.max_turns - turn
+
+    def do_move(self, move: Tuple[str, Optional[int], Block]) -> bool:
+        """Attempt to do the current player's requested move, and if it was
+        done, go on to the next player.
+
+        Return True iff the move was done.
+        """
+        action = (move[0], move[1])
+        player = self.current_player()
+        path = block_path(self.data.board, move[2])
+
+        if action == PASS:
+            # Do nothing
+            move_successful = True
+        elif action == SMASH and self.seed is not None:
+            # Seed the smash without changing what anything else draws
+            moves = self.turn * len(self.data.players) + \
+                self.current_player_index
+            move_successful = move[2].smash(random.Random(f'{self.seed}:'
+                                                          f'{moves}'))
+        elif action == SMASH:
+            move_successful = move[2].smash(self.rng)
+        else:
+            move_successful = apply_action(move[2], action, player.goal.colour)
+
+        if move_successful:
+            if self._log is not None:
+                self._log.record(self.turn, player.id, action, path)
+            if action == SMASH:
+                self.data.smashes[player.id] += 1
+            elif action == PAINT:
+                self.data.paints[player.id] += 1
+            elif action == COMBINE:
+                self.data.combines[player.id] += 1
+            self._update_player()
+
+        return move_successful
+
+    def _update_player(self) -> None:
+        """Update the player whose turn it is.
+        """
+        self.current_player_index = (self.current_player_index + 1) % len(
+            self.data.players)
+
+        score, penalty = self.data.calculate_score(self.current_player().id)
+        self.current_score = score - penalty
+
+        if self.current_player_index == 0:
+            self.turn += 1
+
+
+def play_game(data: GameData, num_turns: int,
+              timings: Optional[List[Tuple[int, float]]] = None,
+              log: Optional[MoveLog] = None,
+              after_move: Optional[Callable[[TurnEngine], None]] = None,
+              rng: Optional[random.Random] = None) \
+        -> List[Tuple[int, int, int]]:
+    """Play the game in <data> for <num_turns> turns without a display, and
+    return each player ID, goal score, and penalty at the end.
+
+    A move that cannot be done counts as passing. If <timings> is given, the
+    ID of the player and the number of seconds they took to choose each move
+    are appended to it. If <log> is given, the game is recorded in it.
+    <after_move> is as for run_turns. Smashes are drawn from <rng>, or from the
+    random module if <rng> is None.
+
+    Precondition: every player in <data> is a ComputerPlayer.
+    """
+    data.max_turns = num_turns
+    engine = TurnEngine(data, log=log, rng=rng)
+    run_turns(engine, timings, after_move)
+    return data.final_scores()
+
+
+def run_turns(engine: TurnEngine,
+              timings: Optional[List[Tuple[int, float]]] = None,
+              after_move: Optional[Callable[[TurnEngine], None]] = None) \
+        -> None:
+    """Play the turns left in the game of <engine> without a display.
+
+    <timings> is as for play_game. If <after_move> is given, it is called with
+    <engine> after every move, such as to save a checkpoint of the game.
+
+    Precondition: every player in the game is a ComputerPlayer.
+    """
+    data = engine.data
+    while not engine.game_over():
+        player = engine.current_player()
+        assert isinstance(player, ComputerPlayer)
+        player.turns_left = engine.turns_left(engine.current_player_index)
+        player.proceed()
+        start = time.perf_counter()
+        move = player.generate_move(data.board)
+        if timings is not None:
+            timings.append((player.id, time.perf_counter() - start))
+        if move is None or not engine.do_move(move):
+            engine.do_move((PASS[0], PASS[1], data.board))
+        if after_move is not None:
+            after_move(engine)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'typing', '__future__', 'random', 'time',
+            'actions', 'block', 'player', 'movelog'
+        ],
+        'max-attributes': 15
+    })
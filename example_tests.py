@@ -23,17 +23,42 @@ This file contains some sample tests for Assignment 2.
 Please use this as a starting point to check your work and write your own
 tests!
 """
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 from typing import List, Optional, Tuple
 import os
+import random
+import numpy as np
 import pygame
 import pytest
 
-from block import Block
-from blocky import _block_to_squares
-from goal import BlobGoal, PerimeterGoal, _flatten
-from player import _get_block
+from actions import PASS, ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, \
+    SWAP_HORIZONTAL, SWAP_VERTICAL, PAINT, COMBINE, apply_action
+from batchenv import BatchEnv
+from block import Block, block_at, block_path, decode_board, encode_board, \
+    generate_board
+from blocky import GameOverState, MainState, _block_to_squares
+from boarddiff import apply_diff, board_diff, move_diff
+from checkpoint import load_checkpoint, resume_game, save_checkpoint
+from client import LoadClient, run_clients
+from controls import ACTION_KEY, LARGER_KEY, SMALLER_KEY, process_event
+from goal import BlobGoal, PerimeterGoal, _flatten, score_delta
+from endgame import candidate_moves, solve_last_turn
+from engine import GameData, TurnEngine, play_game
+from frames import replay_frames
+from grids import palette_grid, score_batch, score_boards
+from hashcons import NodeTable, planning_moves
+from mosaic import PADDING, draw_mosaic, thumbnail, tile_size
+from movelog import MoveLog, replay
+from player import BeamPlayer, HumanPlayer, RandomPlayer, SmartPlayer, \
+    create_players, _get_block, _random_move
+from raster import rasterize
 from renderer import Renderer
-from settings import COLOUR_LIST
+from server import GameServer, serve
+from settings import BACKGROUND_COLOUR, COLOUR_LIST, OUTLINE_COLOUR, \
+    OUTLINE_THICKNESS
+from symmetry import SymmetryIndex, canonical_key
+from tournament import parse_corpus_line, run_tournament
 
 
 def set_children(block: Block, colours: List[Optional[Tuple[int, int, int]]]) \
@@ -205,6 +230,104 @@ class TestRender:
         renderer.draw_board(_block_to_squares(board_16x16))
         renderer.save_to_file('your-rotate-1.png')
 
+    def test_draw_block(self, renderer, board_16x16, tmp_path) -> None:
+        """Test that drawing a board from its kept image looks the same as
+        drawing its squares, including after the board has changed.
+        """
+        def screen(filename: str) -> bytes:
+            renderer.save_to_file(str(tmp_path / filename))
+            image = pygame.image.load(str(tmp_path / filename))
+            return pygame.image.tostring(image, 'RGB')
+
+        for _ in range(2):
+            renderer.clear()
+            renderer.draw_board(_block_to_squares(board_16x16))
+            squares = screen('squares.png')
+            renderer.clear()
+            renderer.draw_block(board_16x16)
+            assert screen('block.png') == squares
+            board_16x16.children[0].rotate(1)
+
+    def test_draw_image_sizes(self, renderer, tmp_path) -> None:
+        """Test that the images stretched ahead of time for each block size are
+        drawn the same as stretching the image when it is drawn.
+        """
+        renderer.prepare_images(2)
+        expected = pygame.Surface((188, 188))
+        expected.blit(pygame.transform.scale(
+            pygame.image.load('images/smash.png'), (188, 188)), (0, 0))
+
+        renderer.draw_image(('smash', None), (375, 188), 188)
+        renderer.save_to_file(str(tmp_path / 'image.png'))
+        screen = pygame.image.load(str(tmp_path / 'image.png'))
+        drawn = screen.subsurface(((375, 188), (188, 188)))
+        assert pygame.image.tostring(drawn, 'RGB') == \
+            pygame.image.tostring(expected, 'RGB')
+
+    def test_rasterize(self) -> None:
+        """Test that drawing squares all at once with NumPy gives the same
+        pixels as drawing each with pygame, even where blocks overlap because
+        they are not exactly half the size of their parents.
+        """
+        rng = random.Random(48)
+        for size in [750, 333]:
+            board = generate_board(4, size, rng)
+            squares = _block_to_squares(board)
+            expected = pygame.Surface((size + 3, size + 3))
+            expected.fill(BACKGROUND_COLOUR)
+            for colour, pos, side in squares:
+                rect = (pos[0], pos[1], side, side)
+                pygame.draw.rect(expected, colour, rect, 0)
+                pygame.draw.rect(expected, OUTLINE_COLOUR, rect,
+                                 OUTLINE_THICKNESS)
+            pixels = rasterize(squares, expected.get_rect())
+            assert (pixels == pygame.surfarray.array3d(expected)).all()
+
+    def test_replay_frames(self, renderer, board_16x16, tmp_path) -> None:
+        """Test that the frames saved of a replayed game are its board after
+        each move, and that a Renderer draws the same without a display.
+        """
+        data = GameData(board_16x16, create_players(0, 2, []))
+        log = MoveLog(str(tmp_path / 'game.log'), 49)
+        play_game(data, 2, log=log)
+        log.close()
+        assert replay_frames(log.path, str(tmp_path / 'frames')) == 5
+        last = pygame.image.load(str(tmp_path / 'frames' / 'frame-00004.png'))
+        squares = _block_to_squares(data.board)
+        assert (pygame.surfarray.array3d(last) ==
+                rasterize(squares, pygame.Rect(0, 0, 750, 750))).all()
+
+        offscreen = Renderer(750, offscreen=True)
+        for drawer in [renderer, offscreen]:
+            drawer.draw_board(squares)
+            drawer.draw_image(ROTATE_CLOCKWISE, (375, 0), 375)
+            drawer.draw_status('Turn 2')
+        assert (renderer.pixels() == offscreen.pixels()).all()
+
+    def test_redraw_changes(self, renderer, board_16x16, tmp_path) -> None:
+        """Test that a frame drawn by redrawing only what changed since the last
+        frame looks the same as the frame drawn from scratch.
+        """
+        def frame(drawer: Renderer, highlight: Block, status: str) -> None:
+            drawer.clear()
+            drawer.draw_block(board_16x16)
+            drawer.highlight_block(highlight.position, highlight.size)
+            drawer.draw_status(status)
+
+        frame(renderer, board_16x16.children[1], 'Turn 0')
+        renderer.save_to_file(str(tmp_path / 'first.png'))
+        board_16x16.children[0].swap(1)
+        frame(renderer, board_16x16.children[2], 'Turn 1')
+        renderer.save_to_file(str(tmp_path / 'changed.png'))
+
+        fresh = Renderer(750)
+        frame(fresh, board_16x16.children[2], 'Turn 1')
+        fresh.save_to_file(str(tmp_path / 'fresh.png'))
+        images = [pygame.image.tostring(
+            pygame.image.load(str(tmp_path / name)), 'RGB')
+            for name in ['changed.png', 'fresh.png']]
+        assert images[0] == images[1]
+
 
 class TestBlock:
     """A collection of methods that test the Block class.
@@ -243,6 +366,109 @@ class TestBlock:
                 # There should only be either 0 or 4 children (RI)
                 assert False
 
+    def test_can_combine(self, board_16x16) -> None:
+        """Test that a block can be combined iff its children have a majority
+        colour, and that checking does not change the block.
+        """
+        block = board_16x16.children[0]
+
+        assert block.can_combine()
+        assert len(block.children) == 4
+
+        block.children[0].colour = COLOUR_LIST[3]
+        assert not block.can_combine()
+        assert not block.combine()
+
+        block.children[0].colour = COLOUR_LIST[1]
+        assert block.combine()
+        assert block.colour == COLOUR_LIST[1]
+
+    def test_can_paint(self, board_16x16) -> None:
+        """Test that only unit cells of a different colour can be painted.
+        """
+        cell = board_16x16.children[0].children[0]
+
+        assert cell.can_paint(COLOUR_LIST[1])
+        assert not cell.can_paint(COLOUR_LIST[0])
+        assert not board_16x16.children[1].can_paint(COLOUR_LIST[0])
+
+    def test_colour_counts(self, board_16x16) -> None:
+        """Test that the unit cells of each colour are counted, and that the
+        counts are kept up to date as blocks change.
+        """
+        assert board_16x16.colour_counts() == {
+            COLOUR_LIST[0]: 1, COLOUR_LIST[1]: 6, COLOUR_LIST[2]: 4,
+            COLOUR_LIST[3]: 5}
+
+        board_16x16.children[0].children[0].paint(COLOUR_LIST[1])
+        assert board_16x16.colour_count(COLOUR_LIST[0]) == 0
+        assert board_16x16.colour_count(COLOUR_LIST[1]) == 7
+
+        board_16x16.children[0].combine()
+        assert board_16x16.children[0].colour_counts() == {COLOUR_LIST[1]: 4}
+
+        board_16x16.replace_child(1, Block((0, 0), 375, COLOUR_LIST[3], 1, 2))
+        assert board_16x16.colour_counts() == {
+            COLOUR_LIST[1]: 8, COLOUR_LIST[3]: 8}
+
+        # Setting children or a colour directly keeps the counts right too
+        set_children(board_16x16.children[2], [COLOUR_LIST[0]] * 4)
+        board_16x16.children[3].colour = COLOUR_LIST[2]
+        assert board_16x16.colour_counts() == {
+            COLOUR_LIST[0]: 4, COLOUR_LIST[1]: 4, COLOUR_LIST[2]: 4,
+            COLOUR_LIST[3]: 4}
+
+    def test_encode_board(self, board_16x16, board_16x16_swap0) -> None:
+        """Test that encoding tells boards apart and can be decoded.
+        """
+        encoding = encode_board(board_16x16)
+
+        assert encoding != encode_board(board_16x16_swap0)
+        assert decode_board(encoding, (0, 0), 750, 0, 2) == board_16x16
+
+    def test_canonical_key(self, board_16x16, board_16x16_swap0,
+                           board_16x16_rotate1) -> None:
+        """Test that rotated boards share a canonical key, that a swap (which
+        does not reflect the children) does not, and that the key of a board
+        with one block replaced can be found incrementally.
+        """
+        key = canonical_key(board_16x16)
+        rotated = board_16x16.create_copy()
+        rotated.rotate(1)
+        assert canonical_key(rotated) == key
+        assert canonical_key(board_16x16_swap0) != key
+
+        replacement = board_16x16.children[0].create_copy()
+        replacement.rotate(1)
+        assert SymmetryIndex(board_16x16).key_with([0], replacement) == \
+            canonical_key(board_16x16_rotate1)
+
+    def test_node_table(self, board_16x16) -> None:
+        """Test that a NodeTable stores each board once, that its moves match
+        those on blocks, and that it remembers a bounded number of rotated and
+        reflected nodes.
+        """
+        table = NodeTable(max_cached=8)
+        root = table.intern(board_16x16)
+        assert table.intern(board_16x16.create_copy()) is root
+        rotated = board_16x16.create_copy()
+        rotated.rotate(1)
+        assert table.intern(rotated) in table.symmetries(root)
+
+        colour = COLOUR_LIST[0]
+        grid = palette_grid(board_16x16)
+        moves = list(planning_moves(root, grid, 0, 2, colour))
+        assert len(moves) == len(list(candidate_moves(board_16x16, colour)))
+        for action, path, _, _, _, _ in moves:
+            moved = board_16x16.create_copy()
+            block = moved
+            for index in path:
+                block = block.children[index]
+            apply_action(block, action, colour)
+            assert table.move(root, path, action, colour) is \
+                table.intern(moved)
+        assert len(table._cache) <= 8
+
     def test_swap0(self, board_16x16, board_16x16_swap0) -> None:
         """Test that the reference board can be correctly swapped along the
         horizontal plane.
@@ -257,6 +483,19 @@ class TestBlock:
         board_16x16.children[0].rotate(1)
         assert board_16x16 == board_16x16_rotate1
 
+    def test_combine_three_one(self, board_16x16) -> None:
+        """Test that a block whose children are three of one colour and one of
+        another is combined into the majority colour, and that a tie is not.
+        """
+        block = board_16x16.children[0]
+        set_children(block, [COLOUR_LIST[2]] * 2 + [COLOUR_LIST[1]] * 2)
+        assert not block.combine()
+
+        set_children(block, [COLOUR_LIST[3]] + [COLOUR_LIST[1]] * 3)
+        assert block.combine()
+        assert block.colour == COLOUR_LIST[1]
+        assert block.children == []
+
 
 class TestPlayer:
     """A collection of methods for testing the methods and functions in the
@@ -283,6 +522,371 @@ class TestPlayer:
         assert _get_block(board_16x16, top_right, 2) == \
             board_16x16.children[0].children[0]
 
+    def test_controls(self, board_16x16) -> None:
+        """Test that pygame events choose a human player's move on the block
+        under the mouse, and tell a computer player to move when clicked.
+        """
+        human = HumanPlayer(0, PerimeterGoal(COLOUR_LIST[0]))
+        assert human.get_selected_block(board_16x16) is None
+        for key in [SMALLER_KEY, SMALLER_KEY, LARGER_KEY, ACTION_KEY[PAINT]]:
+            process_event(human, pygame.event.Event(pygame.KEYDOWN, key=key))
+        expected = _get_block(board_16x16, pygame.mouse.get_pos(), 1)
+
+        assert human.generate_move(board_16x16) == PAINT + (expected,)
+        assert human.generate_move(board_16x16) is None
+
+        computer = RandomPlayer(1, PerimeterGoal(COLOUR_LIST[0]))
+        process_event(computer, pygame.event.Event(pygame.KEYDOWN,
+                                                   key=ACTION_KEY[PAINT]))
+        assert not computer.is_ready()
+        process_event(computer, pygame.event.Event(pygame.MOUSEBUTTONDOWN,
+                                                   button=1))
+        assert computer.is_ready()
+
+    def test_smart_player_out_of_time_passes(self, board_16x16) -> None:
+        """Test that a SmartPlayer with no time to search settles for the
+        best move found so far, which is to pass.
+        """
+        player = SmartPlayer(0, PerimeterGoal(COLOUR_LIST[0]), 5, 0)
+        player.proceed()
+        move = player.generate_move(board_16x16)
+
+        assert move[:2] == PASS
+        assert not player.is_ready()
+
+    def test_smart_player_uses_pondered_move(self, board_16x16) -> None:
+        """Test that a SmartPlayer that pondered a copy of the board makes
+        the move it found then, on the actual board.
+        """
+        player = SmartPlayer(0, PerimeterGoal(COLOUR_LIST[1]), 5,
+                             rng=random.Random(0))
+        player.ponder(board_16x16.create_copy())
+        [(action, path)] = player._pondered.values()
+        player.time_budget = 0  # Searching now would only find PASS
+        player.proceed()
+        move = player.generate_move(board_16x16)
+
+        assert action != PASS
+        assert move[:2] == action
+        assert move[2] is block_at(board_16x16, path)
+
+    def test_beam_player_plans_ahead(self, board_16x16,
+                                     board_16x16_swap0) -> None:
+        """Test that a BeamPlayer finds a move that improves its score without
+        mutating the board, and passes when it has no turns left to plan.
+        """
+        goal = PerimeterGoal(COLOUR_LIST[1])
+        player = BeamPlayer(0, goal, 3, 2)
+        board_16x16_swap0.swap(0)  # Now the same as board_16x16
+
+        player.proceed()
+        move = player.generate_move(board_16x16)
+        assert board_16x16 == board_16x16_swap0
+        assert score_delta(goal, board_16x16, move) > 0
+
+        player.turns_left = 0
+        player.proceed()
+        assert player.generate_move(board_16x16)[:2] == PASS
+
+    def test_beam_player_time_budget(self, monkeypatch) -> None:
+        """Test that a BeamPlayer out of time scores every move on the board
+        and nothing after, and so makes the best single move.
+        """
+        board = generate_board(5, 750, random.Random(4))
+        goal = BlobGoal(COLOUR_LIST[0])
+        scored = []
+
+        def count_scores(g: BlobGoal, grids: np.ndarray) -> np.ndarray:
+            scored.append(len(grids))
+            return score_batch(g, grids)
+
+        monkeypatch.setattr('player.score_batch', count_scores)
+        player = BeamPlayer(0, goal, 3, 3, time_budget=0)
+        player.proceed()
+        move = player.generate_move(board)
+
+        # The board itself is scored first
+        assert sum(scored) == 1 + len(list(candidate_moves(board,
+                                                            goal.colour)))
+        greedy = BeamPlayer(0, goal, 3, 1)
+        greedy.proceed()
+        assert move == greedy.generate_move(board)
+
+    def test_solve_last_turn(self, board_16x16) -> None:
+        """Test that the last-turn solver finds the best moves on the reference
+        board.
+        """
+        # Swapping the whole board puts two more red cells on the perimeter
+        move, value = solve_last_turn(board_16x16,
+                                      PerimeterGoal(COLOUR_LIST[1]))
+        assert value == 2
+        assert move == ('swap', 0, board_16x16)
+
+        # Painting the upper-right corner olive gains 2, less 1 penalty
+        move, value = solve_last_turn(board_16x16,
+                                      PerimeterGoal(COLOUR_LIST[2]))
+        assert value == 1
+        assert move == ('paint', None, board_16x16.children[0].children[0])
+
+        # No blob of yellow can be made bigger at no cost
+        move, value = solve_last_turn(board_16x16, BlobGoal(COLOUR_LIST[3]))
+        assert value == 0
+        assert move[:2] == PASS
+
+    def test_create_players_with_beam_players(self) -> None:
+        """Test that BeamPlayers come last, with their widths and depths.
+        """
+        players = create_players(1, 0, [2], [(4, 3)])
+
+        assert [p.id for p in players] == [0, 1, 2]
+        assert isinstance(players[2], BeamPlayer)
+        assert (players[2].width, players[2].depth) == (4, 3)
+
+    def test_play_game(self, board_16x16) -> None:
+        """Test that a game between computer players runs to the end without
+        a display, and reports each player's final score and penalty.
+        """
+        players = create_players(0, 2, [], [(2, 2)])
+        data = GameData(board_16x16, players)
+        scores = play_game(data, 3)
+
+        assert [score[0] for score in scores] == [0, 1, 2]
+        assert scores == [(p.id, *data.calculate_score(p.id))
+                          for p in players]
+
+    def test_per_game_rng(self) -> None:
+        """Test that games given their own random number generators play out
+        the same way from the same seed, even while other games are played in
+        other threads at the same time.
+        """
+        def play(seed: int) -> Tuple[bytes, List[Tuple[int, int, int]]]:
+            rng = random.Random(seed)
+            board = generate_board(3, 16, rng)
+            players = create_players(0, 2, [4], rng=rng)
+            data = GameData(board, players)
+            scores = play_game(data, 5, rng=rng)
+            return encode_board(data.board), scores
+
+        expected = play(42)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(play, [42, 7, 42, 7, 42]))
+        assert results[0] == results[2] == results[4] == expected
+        assert results[1] == results[3]
+
+    def test_resume_checkpoint(self, board_16x16, tmp_path) -> None:
+        """Test that carrying on with a game from a checkpoint made part way
+        through gives the same scores as playing it straight through, and that
+        the checkpoint is removed once the game is over.
+        """
+        path = str(tmp_path / 'game.ckpt')
+
+        def save_once(engine: TurnEngine) -> None:
+            if engine.turn == 2 and not os.path.exists(path):
+                save_checkpoint(path, engine)
+
+        random.seed(41)
+        data = GameData(board_16x16, create_players(0, 2, [3]))
+        scores = play_game(data, 4, after_move=save_once)
+
+        resumed = load_checkpoint(path)
+        assert resumed.turn == 2
+        assert resume_game(path) == scores
+        assert not os.path.exists(path)
+
+    def test_board_diff(self, board_16x16) -> None:
+        """Test that the diff of each move brings a copy of the board up to
+        date, and that a diff between two boards turns one into the other.
+        """
+        copy = board_16x16.create_copy()
+        rng = random.Random(44)
+        for _ in range(30):
+            move = _random_move(board_16x16, COLOUR_LIST[1], rng)
+            path = block_path(board_16x16, move[2])
+            apply_action(move[2], (move[0], move[1]), COLOUR_LIST[1], rng)
+            diff = move_diff(board_16x16, (move[0], move[1]), path)
+            copy = apply_diff(copy, diff)
+            assert copy == board_16x16
+
+        other = generate_board(2, 750, rng)
+        assert apply_diff(other, board_diff(other, copy)) == board_16x16
+
+    def test_board_diff_large_subtree(self) -> None:
+        """Test that a diff brings a board up to date with a subtree whose
+        encoding is too long for its length to fit in two bytes.
+        """
+        def full(level: int, index: int) -> bytes:
+            # The encoding of a block with every level below it divided
+            if level == 8:
+                return bytes([index % len(COLOUR_LIST)])
+            return bytes([255]) + b''.join(full(level + 1, 4 * index + i)
+                                           for i in range(4))
+
+        old = Block((0, 0), 768, COLOUR_LIST[0], 0, 8)
+        new = decode_board(full(0, 0), (0, 0), 768, 0, 8)
+        assert len(encode_board(new)) > 65535
+
+        assert apply_diff(old, board_diff(old, new)) == new
+
+    def test_game_server(self) -> None:
+        """Test that clients of a game server can play games at the same time,
+        and that the moved lines keep their boards the same as the server's.
+        """
+        async def run() -> List[LoadClient]:
+            server = GameServer()
+            listener = await serve(server)
+            port = listener.sockets[0].getsockname()[1]
+            try:
+                return await run_clients(3, 2, 2, 3, 'remote,random,smart:2',
+                                         port=port)
+            finally:
+                listener.close()
+                server.close()
+
+        results = asyncio.run(run())
+        assert [client.moves for client in results] == [18, 18, 18]
+        assert [client.mismatches for client in results] == [0, 0, 0]
+
+    def test_game_server_errors(self) -> None:
+        """Test that a game server answers lines it cannot carry out, including
+        settings out of range, with an error line and starts no game.
+        """
+        server = GameServer()
+        try:
+            for line in ['new -1 2 1 remote', 'new 9 2 1 remote',
+                         'new 2 0 1 remote', 'new 2 2 1 smart:-3',
+                         'new 2 2 1 beam:0x0', 'new 2 2 1 beam:3',
+                         'new 2 2 x remote', 'board x', 'hello']:
+                replies = asyncio.run(server.command(line.split(), []))
+                assert len(replies) == 1
+                assert replies[0].startswith('error ')
+            assert server.games == {}
+        finally:
+            server.close()
+
+    def test_game_server_bad_bytes(self) -> None:
+        """Test that a game server answers a line that is not UTF-8 with an
+        error line, and keeps the connection open.
+        """
+        async def run() -> List[bytes]:
+            server = GameServer()
+            listener = await serve(server)
+            port = listener.sockets[0].getsockname()[1]
+            try:
+                reader, writer = await asyncio.open_connection('127.0.0.1',
+                                                               port)
+                writer.write(b'\xff\xfe\nboard x\n')
+                await writer.drain()
+                replies = [await reader.readline() for _ in range(2)]
+                writer.close()
+                return replies
+            finally:
+                listener.close()
+                server.close()
+
+        replies = asyncio.run(run())
+        assert all(reply.startswith(b'error ') for reply in replies)
+
+    def test_replay_move_log(self, board_16x16, tmp_path) -> None:
+        """Test that replaying a logged game, including its smashes, gives the
+        same board and scores.
+        """
+        players = create_players(0, 3, [])
+        data = GameData(board_16x16, players)
+        log = MoveLog(str(tmp_path / 'game.log'), 148)
+        scores = play_game(data, 4, log=log)
+        log.close()
+
+        replayed = replay(log.path)
+        assert replayed.board == data.board
+        assert replayed.final_scores() == scores
+
+    def test_run_tournament(self) -> None:
+        """Test that a tournament counts every player in every game, shares
+        out one win per game, and can be played again from its seed.
+        """
+        stats = run_tournament(6, 2, 2, (1, [2], []), seed=3)
+
+        assert stats.games == 6
+        assert stats.seats == {'RandomPlayer': 6, 'SmartPlayer(2)': 6}
+        assert sum(stats.wins.values()) == pytest.approx(6)
+        assert len(stats.move_times['RandomPlayer']) == 12
+        assert run_tournament(6, 2, 2, (1, [2], []), seed=3).scores == \
+            stats.scores
+
+    def test_draw_mosaic(self, tmp_path) -> None:
+        """Test that the final boards of a tournament's games are drawn from
+        its corpus file in order, the same in several processes as in one.
+        """
+        with open(tmp_path / 'games.txt', 'w') as corpus:
+            run_tournament(5, 2, 1, (2, [], []), seed=50, corpus=corpus)
+        with open(tmp_path / 'games.txt') as corpus:
+            seed, board, players = parse_corpus_line(corpus.readline())
+        assert seed == 50
+        assert [label for label, _, _ in players] == ['RandomPlayer'] * 2
+
+        for workers in [1, 2]:
+            assert draw_mosaic(str(tmp_path / 'games.txt'),
+                               str(tmp_path / f'mosaic{workers}.png'),
+                               columns=3, size=32, workers=workers) == 5
+        images = [pygame.image.load(str(tmp_path / f'mosaic{workers}.png'))
+                  for workers in [1, 2]]
+        assert pygame.image.tostring(images[0], 'RGB') == \
+            pygame.image.tostring(images[1], 'RGB')
+
+        width, height = tile_size(32)
+        assert images[0].get_size() == (3 * width, 2 * height)
+        pixels = pygame.surfarray.array3d(images[0])
+        first = pixels[PADDING:PADDING + 32, PADDING:PADDING + 32]
+        expected = np.array(COLOUR_LIST)[thumbnail(board, 32)]
+        assert (first == expected).all()
+
+    def test_thumbnail_scales_down(self, board_16x16) -> None:
+        """Test that a thumbnail narrower than the board's unit cells keeps
+        cells from the whole board rather than cropping it.
+        """
+        grid = palette_grid(board_16x16)
+        for size in [2, 3]:
+            assert thumbnail(board_16x16, size).tolist() == \
+                grid[::2, ::2].tolist()
+        assert thumbnail(board_16x16, 1).tolist() == [[grid[0, 0]]]
+
+    def test_turbo_main_state(self, board_16x16) -> None:
+        """Test that in turbo mode, computer players move without being clicked
+        and without their moves being animated.
+        """
+        data = GameData(board_16x16, create_players(0, 2, [3]))
+        data.max_turns = 2
+        state = MainState(data, turbo=True)
+        for _ in range(6):
+            assert state.update() is state
+        assert isinstance(state.update(), GameOverState)
+
+    def test_main_state_close(self, board_16x16) -> None:
+        """Test that the thread computer players search on is shut down when
+        the game is over.
+        """
+        data = GameData(board_16x16, create_players(0, 1, [3]))
+        data.max_turns = 0
+        state = MainState(data)
+        assert isinstance(state.update(), GameOverState)
+        with pytest.raises(RuntimeError):
+            state._executor.submit(print)
+
+    def test_random_player_does_not_mutate(self, board_16x16,
+                                           board_16x16_swap0) -> None:
+        """Test that a RandomPlayer's moves are valid and that generating them
+        leaves the board alone.
+        """
+        player = RandomPlayer(0, PerimeterGoal(COLOUR_LIST[0]))
+        board_16x16_swap0.swap(0)  # Now the same as board_16x16
+        for _ in range(50):
+            player.proceed()
+            move = player.generate_move(board_16x16)
+
+            assert move[:2] != PASS
+            assert board_16x16 == board_16x16_swap0
+
+
 def _2d_print(lst):
     print("[")
     for x in lst:
@@ -341,6 +945,68 @@ class TestGoal:
             goal = PerimeterGoal(colour)
             assert goal.score(board_16x16) == expected
 
+    def test_score_batch(self, board_16x16, board_16x16_swap0,
+                         board_16x16_rotate1) -> None:
+        """Test that scoring a batch of boards at once gives the same scores as
+        scoring them one at a time.
+        """
+        boards = [board_16x16, board_16x16_swap0, board_16x16_rotate1]
+        for colour in COLOUR_LIST:
+            for goal in [BlobGoal(colour), PerimeterGoal(colour)]:
+                expected = [goal.score(board) for board in boards]
+                assert score_boards(goal, boards).tolist() == expected
+
+    def test_batch_env_step(self, board_16x16) -> None:
+        """Test that moves in a batch of games change the boards and scores
+        the same way as the Block methods do, and that invalid moves are not
+        made.
+        """
+        env = BatchEnv(3, 2, seed=0)
+        goal = BlobGoal(COLOUR_LIST[1])
+        for game in range(3):
+            env.set_game(game, board_16x16, goal)
+
+        # Rotate the upper-right block, combine it, and paint the upper-left
+        # block (which is not at max_depth)
+        _, deltas, valid = env.step(np.array([0, 6, 5]), np.array([1, 1, 1]),
+                                    np.array([1, 1, 0]), np.array([0, 0, 0]))
+        assert valid.tolist() == [True, True, False]
+
+        rotated = board_16x16.create_copy()
+        rotated.children[0].rotate(1)
+        combined = board_16x16.create_copy()
+        combined.children[0].combine()
+        assert env.board(0) == rotated
+        assert env.board(1) == combined
+        assert env.board(2) == board_16x16
+        before = goal.score(board_16x16)
+        assert deltas.tolist() == [goal.score(rotated) - before,
+                                   goal.score(combined) - before, 0]
+        assert env.penalties.tolist() == [0, 1, 0]
+
+    def test_perimeter_score_delta(self, board_16x16) -> None:
+        """Test that the analytic change in perimeter score for each move on
+        each block of the reference board matches making the move and scoring
+        the board again.
+        """
+        blocks = [board_16x16] + board_16x16.children + \
+            board_16x16.children[0].children
+        actions = [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, SWAP_HORIZONTAL,
+                   SWAP_VERTICAL, PAINT, COMBINE]
+        for colour in COLOUR_LIST:
+            goal = PerimeterGoal(colour)
+            before = goal.score(board_16x16)
+            for i in range(len(blocks)):
+                for action in actions:
+                    move = (action[0], action[1], blocks[i])
+                    delta = score_delta(goal, board_16x16, move,
+                                        COLOUR_LIST[0])
+
+                    copy = board_16x16.create_copy()
+                    copies = [copy] + copy.children + copy.children[0].children
+                    apply_action(copies[i], action, COLOUR_LIST[0])
+                    assert delta == goal.score(copy) - before
+
 
 if __name__ == '__main__':
     pytest.main(['example_tests.py'])
@@ -0,0 +1,239 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains a command-line program that saves images of boards, and
+of games recorded in move logs (see movelog.py) as they are replayed, without
+a display. It also contains a writer of PNG files for images of a few colours,
+such as boards.
+
+Each game is saved as a sequence of PNG files, one for the start of the game
+and one after every move. By default only the board is drawn, by NumPy (see
+raster.py), and saved as a PNG of a few colours, which is many times faster
+than drawing and saving the game's whole window; --window draws the window,
+status message and all, on a Renderer that is not shown. For example, to save
+the frames of two games into frames/game1 and frames/game2, replaying them in
+two processes:
+
+    python frames.py --out frames --workers 2 game1.log game2.log
+"""
+from __future__ import annotations
+from typing import Any, BinaryIO, List, Optional, Tuple
+import argparse
+import multiprocessing
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+import pygame
+
+from block import Block
+from blocky import _block_to_squares
+from engine import TurnEngine
+from movelog import read_log, replay_engine, replay_move
+from raster import rasterize_palette
+from renderer import Renderer
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    """Return a PNG chunk of <kind> holding <data>.
+    """
+    return struct.pack('>I', len(data)) + kind + data + \
+        struct.pack('>I', zlib.crc32(kind + data))
+
+
+class PngWriter:
+    """A PNG file being written a band of rows at a time, so that the whole
+    image never needs to be in memory.
+    """
+    # === Private Attributes ===
+    # _file:
+    #   The file being written.
+    # _palette:
+    #   The colours that the pixels given to write_rows are indices of, or
+    #   None if the file has them as colours because there are more than a
+    #   PNG palette can hold.
+    # _compressor:
+    #   The compressor that the rows are passed through.
+    _file: BinaryIO
+    _palette: Optional[np.ndarray]
+    _compressor: Any
+
+    def __init__(self, filename: str, width: int, height: int,
+                 palette: List[Tuple[int, int, int]]) -> None:
+        """Start writing a PNG file named <filename> of <width> by <height>
+        pixels, each of which will be one of the colours in <palette>.
+        """
+        self._file = open(filename, 'wb')
+        self._file.write(b'\x89PNG\r\n\x1a\n')
+        if len(palette) <= 256:
+            self._palette = None
+            self._file.write(_png_chunk(b'IHDR', struct.pack(
+                '>IIBBBBB', width, height, 8, 3, 0, 0, 0)))
+            self._file.write(_png_chunk(b'PLTE', bytes(
+                c for colour in palette for c in colour)))
+        else:
+            self._palette = np.array(palette, dtype=np.uint8)
+            self._file.write(_png_chunk(b'IHDR', struct.pack(
+                '>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        # Boards are large areas of a few colours, which the fastest
+        # compression already shrinks well
+        self._compressor = zlib.compressobj(1)
+
+    def write_rows(self, indices: np.ndarray) -> None:
+        """Write the next rows of the image, whose pixels are <indices>,
+        indexed [x, y], of colours in the palette.
+        """
+        width, height = indices.shape
+        # Each row starts with the byte for no filter
+        if self._palette is None:
+            rows = np.zeros((height, width + 1), dtype=np.uint8)
+            rows[:, 1:] = indices.T
+        else:
+            rows = np.zeros((height, 3 * width + 1), dtype=np.uint8)
+            rows[:, 1:] = self._palette[indices.T].reshape(height, 3 * width)
+        data = self._compressor.compress(rows.tobytes())
+        if data:
+            self._file.write(_png_chunk(b'IDAT', data))
+
+    def close(self) -> None:
+        """Finish writing the file, once all of its rows have been written.
+        """
+        self._file.write(_png_chunk(b'IDAT', self._compressor.flush()))
+        self._file.write(_png_chunk(b'IEND', b''))
+        self._file.close()
+
+
+def write_png(filename: str, indices: np.ndarray,
+              palette: List[Tuple[int, int, int]]) -> None:
+    """Save the image whose pixels are <indices>, indexed [x, y], of colours
+    in <palette> to a PNG file named <filename>.
+    """
+    writer = PngWriter(filename, indices.shape[0], indices.shape[1], palette)
+    writer.write_rows(indices)
+    writer.close()
+
+
+def save_board(board: Block, filename: str) -> None:
+    """Save an image of <board> alone, drawn the same way as
+    Renderer.draw_board, to a PNG file named <filename>.
+    """
+    rect = pygame.Rect(board.position, (board.size, board.size))
+    write_png(filename, *rasterize_palette(_block_to_squares(board), rect))
+
+
+def _status(engine: TurnEngine) -> str:
+    """Return the status message for the game of <engine>.
+    """
+    if engine.game_over():
+        return 'Game over | ' + ' | '.join(
+            f'Player {player_id}: {score} - {penalty} = {score - penalty}'
+            for player_id, score, penalty in engine.data.final_scores())
+    player = engine.current_player()
+    return f'Turn {engine.turn} | Player {player.id} | ' \
+           f'Score {engine.current_score} | {player.goal.description()}'
+
+
+def replay_frames(log_path: str, directory: str, window: bool = False) -> int:
+    """Replay the game in the log file named <log_path>, and save an image of
+    the game at the start and after every move into <directory>, named
+    frame-00000.png, frame-00001.png and so on. Return the number of images
+    saved.
+
+    Each image is of the board alone, as save_board saves it, or of the whole
+    window of the game if <window> is True.
+
+    Raise a ValueError if a move in the log is out of turn or cannot be made.
+    """
+    os.makedirs(directory, exist_ok=True)
+    renderer = None
+    if window:
+        pygame.font.init()
+        header, _ = read_log(log_path)
+        renderer = Renderer(header['size'], offscreen=True)
+    engine, entries = replay_engine(log_path)
+    frames = 0
+    while True:
+        filename = os.path.join(directory, f'frame-{frames:05d}.png')
+        if renderer is None:
+            save_board(engine.data.board, filename)
+        else:
+            renderer.clear()
+            renderer.draw_block(engine.data.board)
+            renderer.draw_status(_status(engine))
+            renderer.save_to_file(filename)
+        frames += 1
+        entry = next(entries, None)
+        if entry is None:
+            return frames
+        replay_move(engine, entry)
+
+
+def _frames_task(task: Tuple[str, str, bool]) -> int:
+    """Return replay_frames(*<task>), for use with a process pool.
+    """
+    return replay_frames(*task)
+
+
+def render_replays(log_paths: List[str], directory: str, window: bool = False,
+                   workers: int = 1) -> int:
+    """Save the frames of the game in each of <log_paths> as replay_frames
+    does with <window>, into a directory in <directory> named after the log
+    file without its extension, using <workers> processes. Return the number
+    of images saved.
+    """
+    tasks = [(path, os.path.join(
+        directory, os.path.splitext(os.path.basename(path))[0]), window)
+             for path in log_paths]
+    if workers == 1:
+        return sum(_frames_task(task) for task in tasks)
+    with multiprocessing.Pool(workers) as pool:
+        return sum(pool.imap_unordered(_frames_task, tasks))
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    """Save the frames of the games in the command-line <args>, and print how
+    long it took.
+    """
+    parser = argparse.ArgumentParser(
+        description='Save the frames of Blocky games as PNG files.')
+    parser.add_argument('logs', nargs='+',
+                        help='move logs of the games to replay')
+    parser.add_argument('--out', default='frames',
+                        help='directory to save the frames in')
+    parser.add_argument('--window', action='store_true',
+                        help='draw the whole window, not only the board')
+    parser.add_argument('--workers', type=int,
+                        default=multiprocessing.cpu_count(),
+                        help='number of processes to replay games in')
+    options = parser.parse_args(args)
+
+    start = time.perf_counter()
+    frames = render_replays(options.logs, options.out, options.window,
+                            min(options.workers, len(options.logs)))
+    elapsed = time.perf_counter() - start
+    print(f'{frames} frames in {elapsed:.2f}s '
+          f'({frames / elapsed:.1f} frames/s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -25,11 +25,17 @@ Blocky game.
 At the bottom of the file, there are some function that you
 can call to try playing the game in several different configurations.
 """
-from typing import List
+from typing import List, Optional
+import functools
+import os
+import random
 import pygame
 
 from block import generate_board
-from blocky import GameData, GameState, MainState
+from blocky import GameState, MainState, GameOverState
+from checkpoint import keep_checkpoint, load_checkpoint
+from engine import GameData, TurnEngine
+from movelog import MoveLog
 from player import create_players
 from renderer import Renderer
 from settings import BOARD_SIZE
@@ -44,31 +50,106 @@ class Game:
     # _data:
     #   The data of the game that can be shared with other GameState objects.
     # _state:
-    #   The current GameState.
+    #   The current GameState, or None if the game has not started.
+    # _checkpoint_path:
+    #   The name of the file the game is saved in after every move, or None
+    #   if it is not saved.
+    # _resumed:
+    #   The turns of the game loaded from <_checkpoint_path>, or None if the
+    #   game is starting from the beginning.
+    # _rng:
+    #   The random number generator the game draws from, or None if it draws
+    #   from the random module.
     _renderer: Renderer
     _data: GameData
-    _state: GameState
+    _state: Optional[GameState]
+    _checkpoint_path: Optional[str]
+    _resumed: Optional[TurnEngine]
+    _rng: Optional[random.Random]
 
     def __init__(self, max_depth: int,
                  num_human: int,
                  num_random: int,
-                 smart_players: List[int]) -> None:
+                 smart_players: List[int],
+                 checkpoint_path: Optional[str] = None,
+                 rng: Optional[random.Random] = None) -> None:
         """Initialize this game, as described in the Assignment 2 handout.
 
+        If <checkpoint_path> is given, the game is saved in a checkpoint file
+        with that name after every move, and the file is removed when the game
+        is over. If that file already exists, the game saved in it is carried
+        on instead of starting a new one, and the other arguments are not
+        used.
+
+        If <rng> is given, the board, goals, smashes and computer players' moves
+        are all drawn from it, so that games with the same seed play out the
+        same way, and other games do not change how this one plays out (as
+        long as no computer player runs out of time to choose a move).
+
         Precondition:
             2 <= max_depth <= 5
         """
-        board = generate_board(max_depth, BOARD_SIZE)
-        players = create_players(num_human, num_random, smart_players)
-
         self._renderer = Renderer(BOARD_SIZE)
-        self._data = GameData(board, players)
-        self._state = MainState(self._data)
-
-    def run_game(self, num_turns: int) -> None:
+        self._state = None
+        self._checkpoint_path = checkpoint_path
+        self._resumed = None
+        self._rng = rng
+
+        if checkpoint_path is not None and os.path.exists(checkpoint_path):
+            self._resumed = load_checkpoint(checkpoint_path)
+            self._data = self._resumed.data
+        else:
+            board = generate_board(max_depth, BOARD_SIZE, rng)
+            players = create_players(num_human, num_random, smart_players,
+                                     rng=rng)
+            self._data = GameData(board, players)
+        self._renderer.prepare_images(self._data.board.max_depth)
+
+    def run_game(self, num_turns: int, turbo: bool = False,
+                 render_every: int = 0, log_path: Optional[str] = None) -> None:
         """Start the main game loop and stop after num_turns.
+
+        In turbo mode, computer players move as soon as their turns come,
+        without being clicked, and their moves are not animated. The loop does
+        not wait between frames, and only draws the board after every
+        <render_every> turns (never, if it is 0) and at the end of the game,
+        after which it returns. Turbo mode is meant for games between computer
+        players, since human players cannot see the board change as they play.
+
+        If <log_path> is given, the game is recorded in a log file with that
+        name, which movelog.replay can play again. A game carried on from a
+        checkpoint is not recorded.
         """
         self._data.max_turns = num_turns
+        log = None
+        engine = self._resumed
+        if engine is None:
+            if log_path is not None:
+                seed = (self._rng or random).randrange(2 ** 32)
+                log = MoveLog(log_path, seed)
+            engine = TurnEngine(self._data, log=log, rng=self._rng)
+        after_move = None
+        if self._checkpoint_path is not None:
+            after_move = functools.partial(keep_checkpoint,
+                                           self._checkpoint_path)
+        main_state = MainState(self._data, turbo, engine=engine,
+                               after_move=after_move)
+        self._state = main_state
+        try:
+            if turbo:
+                self._run_turbo(render_every)
+            else:
+                self._run_frames()
+        finally:
+            # The window may have been closed in the middle of the game
+            main_state.close()
+            if log is not None:
+                log.close()
+
+    def _run_frames(self) -> None:
+        """Run the main game loop at 30 frames per second until the window is
+        closed.
+        """
         clock = pygame.time.Clock()
 
         while True:
@@ -89,7 +170,35 @@ class Game:
             self._state.render(self._renderer)
 
             # Update the screen
-            pygame.display.flip()
+            self._renderer.present()
+
+    def _run_turbo(self, render_every: int) -> None:
+        """Run the main game loop in turbo mode, drawing the board after every
+        <render_every> turns and at the end of the game.
+        """
+        drawn_turn = 0
+        while True:
+            for e in pygame.event.get():
+                if e.type == pygame.QUIT:
+                    return
+                else:
+                    self._state.process_event(e)
+
+            self._state = self._state.update()
+
+            if isinstance(self._state, GameOverState):
+                self._renderer.clear()
+                self._state.render(self._renderer)
+                self._renderer.present()
+                return
+
+            turn = self._state.turn()
+            if render_every > 0 and turn != drawn_turn and \
+                    turn % render_every == 0:
+                drawn_turn = turn
+                self._renderer.clear()
+                self._state.render(self._renderer)
+                self._renderer.present()
 
 
 def create_auto_game() -> Game:
@@ -134,6 +243,8 @@ if __name__ == '__main__':
     # debugging, uncomment-out the call to random.seed.
     # import random
     # random.seed(1001)
+    # Or give the game its own random number generator:
+    # game = Game(3, 1, 0, [6], rng=random.Random(1001))
 
     # game = create_sample_game()
     # game = create_auto_game()
@@ -143,4 +254,13 @@ if __name__ == '__main__':
     # Run the game for 5 turns
     game.run_game(5)
 
+    # Or, for games between computer players, play as fast as possible and
+    # only show the end of the game
+    # game.run_game(5, turbo=True)
+
+    # Or, to be able to carry on with the game if it is closed, save it after
+    # every move (running this again carries on from where it stopped)
+    # game = Game(3, 1, 0, [6], checkpoint_path='blocky.ckpt')
+    # game.run_game(5)
+
     pygame.quit()
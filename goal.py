@@ -24,13 +24,17 @@ This file contains the hierarchy of Goal classes.
 from __future__ import annotations
 import math
 import random
-from typing import List, Tuple, Any
-from block import Block
+from typing import List, Optional, Tuple, Any
+from actions import ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, \
+    SWAP_HORIZONTAL, SWAP_VERTICAL, PAINT, COMBINE, PASS, SMASH, apply_action
+from block import Block, block_at, block_path
 from settings import colour_name, COLOUR_LIST
 
 
-def generate_goals(num_goals: int) -> List[Goal]:
-    """Return a randomly generated list of goals with length num_goals.
+def generate_goals(num_goals: int,
+                   rng: Optional[random.Random] = None) -> List[Goal]:
+    """Return a randomly generated list of goals with length num_goals, drawn
+    from <rng>, or from the random module if <rng> is None.
 
     All elements of the list must be the same type of goal, but each goal
     must have a different randomly generated colour from COLOUR_LIST. No two
@@ -39,11 +43,25 @@ def generate_goals(num_goals: int) -> List[Goal]:
     Precondition:
         - num_goals <= len(COLOUR_LIST)
     """
+    if rng is None:
+        rng = random
     # Assures independent colours chosen
-    cols = random.sample(COLOUR_LIST, num_goals)
-    if random.randint(0, 1) > .5:
-        return [PerimeterGoal(random.choice(col)) for col in cols]
-    return [BlobGoal(random.choice(col)) for col in cols]
+    cols = rng.sample(COLOUR_LIST, num_goals)
+    if rng.randint(0, 1) > .5:
+        return [PerimeterGoal(col) for col in cols]
+    return [BlobGoal(col) for col in cols]
+
+
+def make_goal(name: str, colour: Tuple[int, int, int]) -> Goal:
+    """Return a goal of the class named <name> for <colour>, such as to make a
+    goal again from the class name and colour saved with a game.
+
+    >>> type(make_goal('BlobGoal', COLOUR_LIST[0])).__name__
+    'BlobGoal'
+    """
+    if name == BlobGoal.__name__:
+        return BlobGoal(colour)
+    return PerimeterGoal(colour)
 
 
 def _flatten(block: Block) -> List[List[Tuple[int, int, int]]]:
@@ -94,6 +112,14 @@ class Goal:
     def score(self, board: Block) -> int:
         """Return the current score for this goal on the given board.
 
+        The score is always greater than or equal to 0.
+        """
+        return self.score_grid(_flatten(board))
+
+    def score_grid(self, grid: List[List[Tuple[int, int, int]]]) -> int:
+        """Return the score for this goal on a board flattened into <grid>, as
+        returned by _flatten.
+
         The score is always greater than or equal to 0.
         """
         raise NotImplementedError
@@ -105,12 +131,12 @@ class Goal:
 
 
 class PerimeterGoal(Goal):
-    def score(self, board: Block) -> int:
-        grid = _flatten(board)
+    def score_grid(self, grid: List[List[Tuple[int, int, int]]]) -> int:
         col = self.colour
         counter = 0
         for i in range(len(grid)):
-            counter += (grid[0][i] == col) + (grid[-1][i] == col) + (grid[i][0] == col) + (grid[i][-1] == col)
+            counter += (grid[0][i] == col) + (grid[-1][i] == col) + \
+                (grid[i][0] == col) + (grid[i][-1] == col)
         return counter
 
     def description(self) -> str:
@@ -119,11 +145,11 @@ class PerimeterGoal(Goal):
 
 
 class BlobGoal(Goal):
-    def score(self, board: Block) -> int:
-        bd = _flatten(board)
-        d = len(bd)
+    def score_grid(self, grid: List[List[Tuple[int, int, int]]]) -> int:
+        d = len(grid)
         visited = [[-1 for i in range(d)] for j in range(d)]
-        return max(self._undiscovered_blob_size((i, j), bd, visited) for i in range(d) for j in range(d))
+        return max(self._undiscovered_blob_size((i, j), grid, visited)
+                   for i in range(d) for j in range(d))
 
     def _undiscovered_blob_size(self, pos: Tuple[int, int],
                                 board: List[List[Tuple[int, int, int]]],
@@ -146,25 +172,158 @@ class BlobGoal(Goal):
         either 0 or 1.
         """
         d = len(board)
-        i, j = pos
-        if not (0 <= i < d and 0 <= j < d) or visited[i][j] != -1:
-            return 0
-        visited[i][j] = int(board[i][j] == self.colour)
-        next_steps = [(i + 1, j), (i - 1, j), (i, j + 1), (i, j - 1)]
-        return 0 if visited[i][j] == 0 else 1 + sum(self._undiscovered_blob_size(x, board, visited) for x in next_steps)
+        size = 0
+        # Search with an explicit stack, since blobs on deep boards have more
+        # cells than Python allows recursive calls
+        stack = [pos]
+        while stack:
+            i, j = stack.pop()
+            if not (0 <= i < d and 0 <= j < d) or visited[i][j] != -1:
+                continue
+            visited[i][j] = int(board[i][j] == self.colour)
+            if visited[i][j] == 1:
+                size += 1
+                stack.extend([(i + 1, j), (i - 1, j), (i, j + 1), (i, j - 1)])
+        return size
 
     def description(self) -> str:
         """return a description of blob goal."""
         return "Blob Goal: aim for largest blob of your given colour!"
 
 
+def score_delta(goal: Goal, board: Block,
+                move: Tuple[str, Optional[int], Block],
+                colour: Optional[Tuple[int, int, int]] = None,
+                rng: Optional[random.Random] = None) -> int:
+    """Return how much <goal>'s score on <board> would change if <move> were
+    made on <board>. <colour> is the colour a PAINT move paints with; it
+    defaults to <goal>'s colour.
+
+    For a PerimeterGoal, the change is worked out from the unit cells of the
+    moved block that are on the sides of <board>, without making the move.
+    Otherwise, the move is made on a copy of <board> which is then scored,
+    drawing from <rng> if it is a smash (see Block.smash). A move that would
+    not be performed changes nothing.
+
+    This function does not mutate <board>.
+
+    Precondition: the block in <move> is <board> or one of its descendants.
+    """
+    if colour is None:
+        colour = goal.colour
+    action = (move[0], move[1])
+    block = move[2]
+    if action == PASS:
+        return 0
+    if isinstance(goal, PerimeterGoal) and action != SMASH:
+        return _perimeter_delta(goal.colour, board, action, block, colour)
+    copy = board.create_copy()
+    if not apply_action(block_at(copy, block_path(board, block)), action,
+                        colour, rng):
+        return 0
+    return goal.score(copy) - goal.score(board)
+
+
+# The sides of a block, as indices into the lists returned by _side_counts.
+_TOP, _RIGHT, _BOTTOM, _LEFT = range(4)
+
+# The children of a block that are along each of its sides.
+_SIDE_CHILDREN = [(0, 1), (0, 3), (2, 3), (1, 2)]
+
+
+def _side_count(block: Block, side: int, colour: Tuple[int, int, int]) -> int:
+    """Return how many of the unit cells along <side> of <block> are <colour>.
+
+    Only the descendants of <block> along that side are visited.
+    """
+    if not block.children:
+        return 2 ** (block.max_depth - block.level) * (block.colour == colour)
+    return sum(_side_count(block.children[i], side, colour)
+               for i in _SIDE_CHILDREN[side])
+
+
+def _perimeter_delta(target: Tuple[int, int, int], board: Block,
+                     action: Tuple[str, Optional[int]], block: Block,
+                     colour: Tuple[int, int, int]) -> int:
+    """Return how much the perimeter score for <target> on <board> would
+    change if <action> were performed on <block>, painting with <colour>.
+
+    Only the sides of <block> that lie on the sides of <board> matter. Each of
+    their counts of <target> unit cells after the action is found from the
+    counts before it.
+    """
+    edges = _board_sides(board, block)
+    if not edges:
+        return 0
+
+    def old(side: int) -> int:
+        return _side_count(block, side, target)
+
+    def child(index: int, side: int) -> int:
+        return _side_count(block.children[index], side, target)
+
+    if action in [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE,
+                  SWAP_HORIZONTAL, SWAP_VERTICAL] and not block.children:
+        return 0
+    elif action == ROTATE_CLOCKWISE:
+        # Each side moves one place clockwise
+        new = {side: old((side - 1) % 4) for side in edges}
+    elif action == ROTATE_COUNTER_CLOCKWISE:
+        new = {side: old((side + 1) % 4) for side in edges}
+    elif action == SWAP_HORIZONTAL:
+        # The children trade places without being mirrored, so their inner
+        # sides become this block's left and right sides
+        new = {_TOP: old(_TOP), _BOTTOM: old(_BOTTOM),
+               _LEFT: child(0, _LEFT) + child(3, _LEFT),
+               _RIGHT: child(1, _RIGHT) + child(2, _RIGHT)}
+    elif action == SWAP_VERTICAL:
+        new = {_LEFT: old(_LEFT), _RIGHT: old(_RIGHT),
+               _TOP: child(2, _TOP) + child(3, _TOP),
+               _BOTTOM: child(0, _BOTTOM) + child(1, _BOTTOM)}
+    elif action == PAINT and block.can_paint(colour):
+        new = {side: int(colour == target) for side in edges}
+    elif action == COMBINE and block.can_combine():
+        majority = block.majority_colour()
+        new = {side: 2 * (majority == target) for side in edges}
+    else:
+        return 0
+    return sum(new[side] - old(side) for side in edges)
+
+
+def _board_sides(board: Block, block: Block) -> List[int]:
+    """Return the sides of <block> that lie on the sides of <board>.
+
+    Precondition: <block> is <board> or one of its descendants.
+    """
+    # Find the unit cell at the upper-left of <block>, and its width in cells
+    x = y = 0
+    d = 2 ** (board.max_depth - board.level)
+    for index in block_path(board, block):
+        d //= 2
+        if index in (0, 3):
+            x += d
+        if index in (2, 3):
+            y += d
+    board_d = 2 ** (board.max_depth - board.level)
+    sides = []
+    if y == 0:
+        sides.append(_TOP)
+    if x + d == board_d:
+        sides.append(_RIGHT)
+    if y + d == board_d:
+        sides.append(_BOTTOM)
+    if x == 0:
+        sides.append(_LEFT)
+    return sides
+
+
 if __name__ == '__main__':
     import python_ta
 
     python_ta.check_all(config={
         'allowed-import-modules': [
             'doctest', 'python_ta', 'random', 'typing', 'block', 'settings',
-            'math', '__future__'
+            'math', '__future__', 'actions'
         ],
         'max-attributes': 15
     })
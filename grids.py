@@ -0,0 +1,188 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains functions that represent boards as NumPy arrays of unit
+cells, and that score many of those arrays at once.
+
+A palette grid is the NumPy counterpart of goal._flatten: G[i, j] is the index
+in COLOUR_LIST of the colour of the unit cell at column i and row j, or
+NO_COLOUR if that colour is not in COLOUR_LIST. A batch of palette grids for
+boards of the same max_depth is stacked into an array of shape
+(boards, columns, rows).
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from actions import ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, \
+    SWAP_HORIZONTAL, SWAP_VERTICAL
+from block import Block
+from goal import Goal, BlobGoal, PerimeterGoal
+from settings import COLOUR_LIST
+
+# The palette index of unit cells whose colour is not in COLOUR_LIST.
+NO_COLOUR = -1
+
+
+def palette_grid(board: Block) -> np.ndarray:
+    """Return the palette grid of <board>.
+
+    >>> board = Block((0, 0), 750, COLOUR_LIST[2], 0, 1)
+    >>> palette_grid(board).tolist()
+    [[2, 2], [2, 2]]
+    """
+    d = 2 ** (board.max_depth - board.level)
+    grid = np.empty((d, d), dtype=np.int8)
+    _fill(board, grid, 0, 0, d)
+    return grid
+
+
+def _fill(block: Block, grid: np.ndarray, x: int, y: int, d: int) -> None:
+    """Write the palette indices of <block>'s unit cells into the <d> by <d>
+    square of <grid> whose upper-left cell is at column <x> and row <y>.
+    """
+    if not block.children:
+        if block.colour in COLOUR_LIST:
+            grid[x:x + d, y:y + d] = COLOUR_LIST.index(block.colour)
+        else:
+            grid[x:x + d, y:y + d] = NO_COLOUR
+    else:
+        half = d // 2
+        # Children are ordered upper-right, upper-left, lower-left, lower-right
+        corners = [(x + half, y), (x, y), (x, y + half), (x + half, y + half)]
+        for child, (cx, cy) in zip(block.children, corners):
+            _fill(child, grid, cx, cy, half)
+
+
+def stack_grids(boards: List[Block]) -> np.ndarray:
+    """Return the palette grids of <boards> stacked into one array.
+
+    Precondition: all of <boards> have the same max_depth and level.
+    """
+    return np.stack([palette_grid(board) for board in boards])
+
+
+def move_cells(grid: np.ndarray, action: Tuple[str, Optional[int]], x: int,
+               y: int, d: int, colour: Optional[int] = None) -> None:
+    """Change the palette <grid> in place as performing <action> on the <d>
+    by <d> block whose upper-left unit cell is at column <x> and row <y>
+    would. A PAINT or COMBINE makes every cell of the block the palette index
+    <colour>.
+
+    >>> grid = np.array([[0, 1], [2, 3]])
+    >>> move_cells(grid, ROTATE_CLOCKWISE, 0, 0, 2)
+    >>> grid.tolist()
+    [[1, 3], [0, 2]]
+    """
+    old = grid[x:x + d, y:y + d].copy()
+    if action == ROTATE_CLOCKWISE:
+        grid[x:x + d, y:y + d] = old.T[::-1]
+    elif action == ROTATE_COUNTER_CLOCKWISE:
+        grid[x:x + d, y:y + d] = old[::-1].T
+    elif action == SWAP_HORIZONTAL:
+        # The children trade places without being mirrored
+        grid[x:x + d, y:y + d] = np.roll(old, d // 2, axis=0)
+    elif action == SWAP_VERTICAL:
+        grid[x:x + d, y:y + d] = np.roll(old, d // 2, axis=1)
+    else:
+        grid[x:x + d, y:y + d] = colour
+
+
+def score_batch(goal: Goal, grids: np.ndarray) -> np.ndarray:
+    """Return an array with <goal>'s score on each of the stacked palette
+    <grids>.
+
+    The scores are the same as goal.score would give on the boards the grids
+    came from.
+
+    Raise a TypeError if <goal> is neither a PerimeterGoal nor a BlobGoal.
+    """
+    if goal.colour not in COLOUR_LIST:
+        return np.zeros(len(grids), dtype=np.int64)
+    cells = grids == COLOUR_LIST.index(goal.colour)
+    if isinstance(goal, PerimeterGoal):
+        return _perimeter_scores(cells)
+    elif isinstance(goal, BlobGoal):
+        return _blob_scores(cells)
+    raise TypeError(f'cannot score {type(goal).__name__}')
+
+
+def score_boards(goal: Goal, boards: List[Block]) -> np.ndarray:
+    """Return an array with <goal>'s score on each of <boards>.
+
+    Precondition: all of <boards> have the same max_depth and level.
+    """
+    return score_batch(goal, stack_grids(boards))
+
+
+def _perimeter_scores(cells: np.ndarray) -> np.ndarray:
+    """Return the perimeter score of each grid in the stacked boolean array
+    <cells>, which is True where a unit cell has the goal's colour.
+
+    Corner cells are on two edges, so they count twice.
+    """
+    return cells[:, 0, :].sum(axis=1) + cells[:, -1, :].sum(axis=1) + \
+        cells[:, :, 0].sum(axis=1) + cells[:, :, -1].sum(axis=1)
+
+
+def _blob_scores(cells: np.ndarray) -> np.ndarray:
+    """Return the size of the largest blob in each grid in the stacked boolean
+    array <cells>, which is True where a unit cell has the goal's colour.
+
+    Every cell of the goal's colour starts out labelled with its own index in
+    the flattened batch. Labels then repeatedly take the smallest label among
+    their neighbours, and follow the label they point to, until nothing
+    changes; each blob ends up labelled with the index of one of its cells.
+    """
+    n, d, _ = cells.shape
+    size = n * d * d
+    labels = np.where(cells, np.arange(size).reshape(cells.shape), size)
+    while True:
+        smallest = labels.copy()
+        np.minimum(smallest[:, 1:, :], labels[:, :-1, :],
+                   out=smallest[:, 1:, :])
+        np.minimum(smallest[:, :-1, :], labels[:, 1:, :],
+                   out=smallest[:, :-1, :])
+        np.minimum(smallest[:, :, 1:], labels[:, :, :-1],
+                   out=smallest[:, :, 1:])
+        np.minimum(smallest[:, :, :-1], labels[:, :, 1:],
+                   out=smallest[:, :, :-1])
+        smallest = np.where(cells, smallest, size)
+        # Jump to the label of the cell each label points to
+        flat = np.append(smallest.ravel(), size)
+        smallest = np.where(cells, flat[smallest], size)
+        if np.array_equal(smallest, labels):
+            break
+        labels = smallest
+    counts = np.bincount(labels[cells], minlength=size)
+    return counts.reshape(n, d * d).max(axis=1)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'typing', 'numpy', 'actions', 'block',
+            'goal', 'settings'
+        ],
+        'max-attributes': 15
+    })
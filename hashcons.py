@@ -0,0 +1,262 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+
+=== Module Description ===
+
+This file contains a compact, shared representation of boards, for keeping
+many boards at once, such as the boards in a beam search.
+
+A Node is an immutable block that only records its colour or its children.
+Position, size and level follow from where a node is used, so the same node
+can stand for every block with the same contents, anywhere on any board. A
+NodeTable makes sure that there is only ever one Node for each contents, so a
+board becomes a directed acyclic graph in which identical subtrees are stored
+once, and two nodes are equal iff they are the same object.
+
+Moves are made by building new nodes for the moved block and its ancestors
+only; everything else is shared with the board before the move. The
+rotations and reflections of each node are remembered, up to a limit, so
+that those of a board after a move are mostly found rather than rebuilt.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Iterator, List, Optional, Tuple
+from weakref import WeakValueDictionary
+
+import numpy as np
+
+from actions import ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, \
+    SWAP_HORIZONTAL, SWAP_VERTICAL, PAINT, COMBINE
+from block import Block
+from settings import COLOUR_LIST
+from symmetry import SOURCES
+
+# The number of rotated and reflected nodes a NodeTable remembers by default.
+MAX_CACHED = 1 << 16
+
+
+class Node:
+    """An immutable block in a board stored as a DAG.
+
+    Nodes should only be created by a NodeTable.
+
+    === Public Attributes ===
+    colour:
+        If this node is a leaf, its colour. Otherwise, None.
+    children:
+        This node's children, in the same order as Block.children, or an empty
+        tuple if this node is a leaf.
+    """
+    __slots__ = ['colour', 'children', '__weakref__']
+    colour: Optional[Tuple[int, int, int]]
+    children: Tuple[Node, ...]
+
+    def __init__(self, colour: Optional[Tuple[int, int, int]],
+                 children: Tuple[Node, ...]) -> None:
+        """Initialize this node with <colour> and <children>.
+        """
+        self.colour = colour
+        self.children = children
+
+    def majority_colour(self) -> Optional[Tuple[int, int, int]]:
+        """Return the colour that more of this node's children have than any
+        other, or None if there is a tie or this node is a leaf.
+
+        Like Block.majority_colour, this is only meaningful for a node whose
+        children are unit cells.
+        """
+        counts = {}
+        for child in self.children:
+            counts[child.colour] = counts.get(child.colour, 0) + 1
+        ranked = sorted(counts.values(), reverse=True)
+        if not ranked or len(ranked) > 1 and ranked[0] == ranked[1]:
+            return None
+        return max(counts, key=counts.get)
+
+
+class NodeTable:
+    """The one Node for each distinct block contents that is still in use.
+
+    Nodes no longer used by anything are dropped from the table.
+    """
+    # === Private Attributes ===
+    # _nodes:
+    #   The nodes in use, keyed by their colour for leaves, or by the ids of
+    #   their children otherwise. A node keeps its children alive, so the ids
+    #   in a key always belong to the children of that key's node.
+    # _cache:
+    #   The result of each symmetry (see symmetry.SOURCES) done to a node,
+    #   keyed by the node's id and the number of the symmetry, from the least
+    #   to the most recently used. Each entry keeps the node it came from
+    #   alive, so that its id is not reused.
+    # _max_cached:
+    #   The most entries that _cache may hold.
+    _nodes: WeakValueDictionary
+    _cache: OrderedDict
+    _max_cached: int
+
+    def __init__(self, max_cached: int = MAX_CACHED) -> None:
+        """Initialize an empty table that remembers at most <max_cached>
+        rotated or reflected nodes.
+        """
+        self._nodes = WeakValueDictionary()
+        self._cache = OrderedDict()
+        self._max_cached = max_cached
+
+    def __len__(self) -> int:
+        """Return the number of distinct nodes in use.
+        """
+        return len(self._nodes)
+
+    def leaf(self, colour: Tuple[int, int, int]) -> Node:
+        """Return the leaf node with <colour>.
+        """
+        node = self._nodes.get(colour)
+        if node is None:
+            node = Node(colour, ())
+            self._nodes[colour] = node
+        return node
+
+    def parent(self, children: Tuple[Node, ...]) -> Node:
+        """Return the node with the four <children>.
+
+        Precondition: every node in <children> came from this table.
+        """
+        key = tuple(id(child) for child in children)
+        node = self._nodes.get(key)
+        if node is None:
+            node = Node(None, tuple(children))
+            self._nodes[key] = node
+        return node
+
+    def intern(self, block: Block) -> Node:
+        """Return the node with the same contents as <block>.
+        """
+        if not block.children:
+            return self.leaf(block.colour)
+        return self.parent(tuple(self.intern(child)
+                                 for child in block.children))
+
+    def transform(self, node: Node, symmetry: int) -> Node:
+        """Return <node> rotated or reflected by symmetry number <symmetry>,
+        as numbered in symmetry.SOURCES. Symmetries 1 and 3 are the same as
+        rotating clockwise and counter-clockwise.
+        """
+        if not node.children:
+            return node
+        key = (id(node), symmetry)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key][1]
+        result = self.parent(tuple(self.transform(node.children[source],
+                                                  symmetry)
+                                   for source in SOURCES[symmetry]))
+        self._cache[key] = (node, result)
+        if len(self._cache) > self._max_cached:
+            self._cache.popitem(last=False)
+        return result
+
+    def symmetries(self, node: Node) -> List[Node]:
+        """Return the 8 rotations and reflections of <node>, starting with
+        <node> itself.
+        """
+        return [self.transform(node, symmetry) for symmetry in range(8)]
+
+    def move(self, root: Node, path: List[int],
+             action: Tuple[str, Optional[int]],
+             colour: Tuple[int, int, int]) -> Node:
+        """Return the root of the board <root> after performing <action> on
+        the block at <path>, painting with <colour>.
+
+        Precondition: <action> is one of the moves that planning_moves yields
+        for the block at <path>.
+        """
+        ancestors = [root]
+        for index in path:
+            ancestors.append(ancestors[-1].children[index])
+        node = ancestors.pop()
+        c = node.children
+        if action in [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE]:
+            node = self.transform(node, action[1])
+        elif action == SWAP_HORIZONTAL:
+            node = self.parent((c[1], c[0], c[3], c[2]))
+        elif action == SWAP_VERTICAL:
+            node = self.parent((c[3], c[2], c[1], c[0]))
+        elif action == PAINT:
+            node = self.leaf(colour)
+        else:
+            node = self.leaf(node.majority_colour())
+        # Rebuild the ancestors around the new node
+        for index in reversed(path):
+            children = list(ancestors.pop().children)
+            children[index] = node
+            node = self.parent(tuple(children))
+        return node
+
+
+def planning_moves(root: Node, grid: np.ndarray, level: int, max_depth: int,
+                   colour: Tuple[int, int, int]) -> \
+        Iterator[Tuple[Tuple[str, Optional[int]], List[int], int, int, int,
+                       Optional[int]]]:
+    """Yield every move other than PASS and SMASH that can be made on the
+    board <root>, painting with <colour>, as endgame.candidate_moves does for
+    a Block. The board is at <level>, has <max_depth>, and its palette grid is
+    <grid>.
+
+    Each move is its action, the path to its block, the column and row of the
+    block's upper-left unit cell and its width in unit cells, and the palette
+    index it makes every cell of the block, as grids.move_cells expects.
+    """
+    stack = [(root, [], 0, 0, len(grid), level)]
+    while stack:
+        node, path, x, y, d, node_level = stack.pop()
+        if node.children:
+            region = grid[x:x + d, y:y + d]
+            # Rotating or swapping a block of one colour changes nothing
+            if region.min() != region.max():
+                for action in [ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE,
+                               SWAP_HORIZONTAL, SWAP_VERTICAL]:
+                    yield action, path, x, y, d, None
+            if node_level == max_depth - 1:
+                majority = node.majority_colour()
+                if majority is not None:
+                    yield COMBINE, path, x, y, d, COLOUR_LIST.index(majority)
+            half = d // 2
+            # Children are ordered upper-right, upper-left, lower-left,
+            # lower-right
+            corners = [(x + half, y), (x, y), (x, y + half),
+                       (x + half, y + half)]
+            for i, (cx, cy) in enumerate(corners):
+                stack.append((node.children[i], path + [i], cx, cy, half,
+                              node_level + 1))
+        elif node_level == max_depth and node.colour != colour:
+            yield PAINT, path, x, y, d, COLOUR_LIST.index(colour)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'typing', '__future__', 'collections',
+            'weakref', 'numpy', 'actions', 'block', 'settings', 'symmetry'
+        ],
+        'max-attributes': 15
+    })
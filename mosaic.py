@@ -0,0 +1,208 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains a command-line program that draws the final boards of the
+games in a corpus file (see tournament.py) side by side in one PNG image. Each
+board is labelled with its game's seed, then each player's goal score minus
+penalty, in the order the players played.
+
+The boards are drawn small, straight from their palette grids (see grids.py):
+each unit cell becomes a square of the same number of pixels, without
+outlines. The image is drawn a row of boards at a time, in several processes,
+and each row is written to the file as soon as it is done. So only a few rows
+are ever in memory, however many games the corpus has. For example:
+
+    python tournament.py --games 500 --random 2 --corpus games.txt
+    python mosaic.py games.txt mosaic.png --columns 25 --size 96
+"""
+from __future__ import annotations
+from collections import deque
+from typing import Iterator, List, Optional, Tuple
+import argparse
+import math
+import multiprocessing
+import time
+
+import numpy as np
+import pygame
+
+from block import Block
+from frames import PngWriter
+from grids import NO_COLOUR, palette_grid
+from settings import BACKGROUND_COLOUR, COLOUR_LIST, TEXT_COLOUR
+from tournament import parse_corpus_line
+
+# The pixels between a board and the edge of its part of the image.
+PADDING = 4
+# The size of the font that boards are labelled in.
+FONT_SIZE = 12
+
+# The colours of the image, and the indices in them of the colours that are
+# not in COLOUR_LIST.
+_PALETTE = COLOUR_LIST + [BACKGROUND_COLOUR, TEXT_COLOUR]
+_BACKGROUND = len(COLOUR_LIST)
+_TEXT = len(COLOUR_LIST) + 1
+
+
+def _font() -> pygame.font.Font:
+    """Return the font that boards are labelled in.
+    """
+    pygame.font.init()
+    return pygame.font.Font(pygame.font.get_default_font(), FONT_SIZE)
+
+
+def tile_size(size: int) -> Tuple[int, int]:
+    """Return the width and height of the part of the image for each board,
+    when boards are drawn <size> pixels wide.
+    """
+    return size + 2 * PADDING, size + _font().get_linesize() + 2 * PADDING
+
+
+def thumbnail(board: Block, size: int) -> np.ndarray:
+    """Return the pixels of an image of <board> at most <size> pixels wide,
+    as indices of colours in COLOUR_LIST, indexed [x, y], or of
+    BACKGROUND_COLOUR after COLOUR_LIST's for colours that are not in it.
+
+    Each unit cell is the same whole number of pixels wide, so the image is
+    narrower than <size> unless <size> is a multiple of the number of unit
+    cells across. If <size> is smaller than that, the board is scaled down
+    instead, by keeping only every few unit cells in each direction.
+
+    >>> board = Block((0, 0), 750, COLOUR_LIST[2], 0, 1)
+    >>> thumbnail(board, 5).tolist()
+    [[2, 2, 2, 2], [2, 2, 2, 2], [2, 2, 2, 2], [2, 2, 2, 2]]
+    >>> thumbnail(board, 3).tolist()
+    [[2, 2], [2, 2]]
+    """
+    grid = palette_grid(board)
+    grid = np.where(grid == NO_COLOUR, _BACKGROUND, grid).astype(np.uint8)
+    cells = grid.shape[0]
+    if size < cells:
+        step = math.ceil(cells / size)
+        return grid[::step, ::step]
+    cell = size // cells
+    return np.repeat(np.repeat(grid, cell, axis=0), cell, axis=1)
+
+
+def _draw_row(task: Tuple[List[str], int, int]) -> np.ndarray:
+    """Return the pixels of one row of boards in the image, as indices of
+    colours in <_PALETTE>, indexed [x, y].
+
+    <task> is the lines of the corpus file for the games in the row, the
+    number of boards in a full row, and the largest width of each board.
+    """
+    lines, columns, size = task
+    font = _font()
+    width, height = tile_size(size)
+    row = np.full((columns * width, height), _BACKGROUND, dtype=np.uint8)
+    for i, line in enumerate(lines):
+        seed, board, players = parse_corpus_line(line)
+        image = thumbnail(board, size)
+        x = i * width + PADDING + (size - image.shape[0]) // 2
+        y = PADDING + (size - image.shape[1]) // 2
+        row[x:x + image.shape[0], y:y + image.shape[1]] = image
+
+        label = f'{seed}: ' + ' '.join(str(score - penalty)
+                                       for _, score, penalty in players)
+        text = font.render(label, False, TEXT_COLOUR, BACKGROUND_COLOUR)
+        mask = (pygame.surfarray.array3d(text) == TEXT_COLOUR).all(axis=2)
+        mask = mask[:size]
+        x = i * width + PADDING
+        y = PADDING + size
+        row[x:x + mask.shape[0], y:y + mask.shape[1]][mask] = _TEXT
+    return row
+
+
+def _rows(corpus_path: str, columns: int, size: int) -> \
+        Iterator[Tuple[List[str], int, int]]:
+    """Yield the task for _draw_row of each row of the image of the corpus
+    file named <corpus_path>, reading the file only as far as that row.
+    """
+    with open(corpus_path) as f:
+        lines = []
+        for line in f:
+            lines.append(line)
+            if len(lines) == columns:
+                yield lines, columns, size
+                lines = []
+        if lines:
+            yield lines, columns, size
+
+
+def draw_mosaic(corpus_path: str, filename: str, columns: int = 20,
+                size: int = 96, workers: int = 1) -> int:
+    """Draw the final boards of the games in the corpus file named
+    <corpus_path> in rows of <columns>, each at most <size> pixels wide, into
+    a PNG file named <filename>, using <workers> processes. Return the number
+    of boards drawn.
+    """
+    with open(corpus_path) as f:
+        boards = sum(1 for _ in f)
+    width, height = tile_size(size)
+    rows = max(1, -(-boards // columns))
+    writer = PngWriter(filename, columns * width, rows * height, _PALETTE)
+    try:
+        if boards == 0:
+            writer.write_rows(np.full((columns * width, height), _BACKGROUND,
+                                      dtype=np.uint8))
+        elif workers == 1:
+            for task in _rows(corpus_path, columns, size):
+                writer.write_rows(_draw_row(task))
+        else:
+            with multiprocessing.Pool(workers) as pool:
+                # Keep only a few rows ahead of the one being written
+                pending = deque()
+                for task in _rows(corpus_path, columns, size):
+                    pending.append(pool.apply_async(_draw_row, (task,)))
+                    if len(pending) > 2 * workers:
+                        writer.write_rows(pending.popleft().get())
+                while pending:
+                    writer.write_rows(pending.popleft().get())
+    finally:
+        writer.close()
+    return boards
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    """Draw the corpus file in the command-line <args>, and print how long it
+    took.
+    """
+    parser = argparse.ArgumentParser(
+        description='Draw the final boards of many Blocky games in one image.')
+    parser.add_argument('corpus', help='corpus file written by tournament.py')
+    parser.add_argument('output', help='PNG file to draw the boards in')
+    parser.add_argument('--columns', type=int, default=20,
+                        help='number of boards in each row')
+    parser.add_argument('--size', type=int, default=96,
+                        help='largest width of each board in pixels')
+    parser.add_argument('--workers', type=int,
+                        default=multiprocessing.cpu_count(),
+                        help='number of processes to draw boards in')
+    options = parser.parse_args(args)
+
+    start = time.perf_counter()
+    boards = draw_mosaic(options.corpus, options.output, options.columns,
+                         options.size, options.workers)
+    print(f'{boards} boards in {time.perf_counter() - start:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains a log of the moves made in a game, and a replayer that
+makes the same moves again without a display.
+
+A log file is a text file. Its first line describes the start of the game, as
+JSON: the seed for smashes (see TurnEngine), the number of turns, the board
+(encoded by encode_board, in hexadecimal) and each player's goal. Each later
+line is one move, in the order they were made:
+
+    <turn> <player ID> <action name> <direction> <path>
+
+where the direction is - for actions without one, and the path is the indices
+of the children to follow from the board to the block moved (see block_path),
+or - for the board itself. Lines are only ever added to the end of the file.
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+import json
+
+from block import decode_board, encode_board, block_at
+from engine import GameData, TurnEngine
+from goal import make_goal
+from player import Player
+from settings import COLOUR_LIST
+
+# One move in a log: the turn, player ID, action, and path to the block.
+LogEntry = Tuple[int, int, Tuple[str, Optional[int]], List[int]]
+
+
+class MoveLog:
+    """A log file that the moves of one game are added to as they are made.
+
+    === Public Attributes ===
+    path:
+        The name of the log file.
+    seed:
+        The seed for the smashes in the game.
+    """
+    path: str
+    seed: int
+
+    # === Private Attributes ===
+    # _file:
+    #   The open log file, or None if the game has not started or the log has
+    #   been closed.
+    _file: Optional[TextIO]
+
+    def __init__(self, path: str, seed: int) -> None:
+        """Initialize a log that will be written to the file named <path>, for
+        a game whose smashes are seeded with <seed>.
+        """
+        self.path = path
+        self.seed = seed
+        self._file = None
+
+    def start(self, data: GameData) -> None:
+        """Create the log file and record the start of the game in <data>.
+        """
+        header = {
+            'seed': self.seed,
+            'max_turns': data.max_turns,
+            'max_depth': data.board.max_depth,
+            'size': data.board.size,
+            'board': encode_board(data.board).hex(),
+            'goals': [[type(p.goal).__name__, COLOUR_LIST.index(p.goal.colour)]
+                      for p in data.players]
+        }
+        self._file = open(self.path, 'w')
+        self._file.write(json.dumps(header) + '\n')
+        self._file.flush()
+
+    def record(self, turn: int, player_id: int,
+               action: Tuple[str, Optional[int]], path: List[int]) -> None:
+        """Add the move of <action> on the block at <path>, made by the player
+        with <player_id> in <turn>, to the end of the log.
+        """
+        direction = '-' if action[1] is None else str(action[1])
+        path_text = ''.join(str(index) for index in path) or '-'
+        self._file.write(f'{turn} {player_id} {action[0]} {direction} '
+                         f'{path_text}\n')
+        self._file.flush()
+
+    def close(self) -> None:
+        """Close the log file.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_log(path: str) -> Tuple[Dict[str, Any], Iterator[LogEntry]]:
+    """Return the start of the game recorded in the log file named <path>,
+    and an iterator over the moves in it.
+    """
+    with open(path) as f:
+        header = json.loads(f.readline())
+    return header, _read_entries(path)
+
+
+def _read_entries(path: str) -> Iterator[LogEntry]:
+    """Yield each move in the log file named <path>.
+    """
+    with open(path) as f:
+        f.readline()
+        for line in f:
+            turn, player_id, name, direction, path_text = line.split()
+            action = (name, None if direction == '-' else int(direction))
+            moves = [] if path_text == '-' else [int(i) for i in path_text]
+            yield int(turn), int(player_id), action, moves
+
+
+def replay_engine(path: str) -> Tuple[TurnEngine, Iterator[LogEntry]]:
+    """Return a TurnEngine for the game in the log file named <path> as it was
+    at the start, and an iterator over the moves to make with replay_move.
+    """
+    header, entries = read_log(path)
+    board = decode_board(bytes.fromhex(header['board']), (0, 0),
+                         header['size'], 0, header['max_depth'])
+    players = [Player(i, make_goal(name, COLOUR_LIST[colour]))
+               for i, (name, colour) in enumerate(header['goals'])]
+    data = GameData(board, players)
+    data.max_turns = header['max_turns']
+    return TurnEngine(data, seed=header['seed']), entries
+
+
+def replay_move(engine: TurnEngine, entry: LogEntry) -> None:
+    """Make the move in <entry> again in the game of <engine>.
+
+    Raise a ValueError if the move is out of turn or cannot be made.
+    """
+    turn, player_id, action, moves = entry
+    if (turn, player_id) != (engine.turn, engine.current_player().id):
+        raise ValueError(f'move by player {player_id} in turn {turn} is '
+                         f'out of turn')
+    block = block_at(engine.data.board, moves)
+    if not engine.do_move((action[0], action[1], block)):
+        raise ValueError(f'move by player {player_id} in turn {turn} '
+                         f'cannot be made')
+
+
+def replay(path: str) -> GameData:
+    """Make the moves in the log file named <path> again, and return the game
+    as it was after the last move.
+
+    Raise a ValueError if a move in the log is out of turn or cannot be made.
+    """
+    engine, entries = replay_engine(path)
+    for entry in entries:
+        replay_move(engine, entry)
+    return engine.data
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-io': ['start', 'read_log', '_read_entries'],
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'typing', '__future__', 'json', 'block',
+            'engine', 'goal', 'player', 'settings'
+        ],
+        'max-attributes': 15
+    })
@@ -20,40 +20,70 @@ Misha Schwartz, and Jaisie Sin.
 === Module Description ===
 
 This file contains the hierarchy of player classes.
+
+Players do not depend on pygame. The pygame interface tells them what the
+person playing pressed or clicked through controls.py.
 """
 from __future__ import annotations
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 import random
-import pygame
+import time
+
+import numpy as np
 
-from block import Block
-from goal import Goal, generate_goals
+from block import Block, block_at, block_path
+from endgame import solve_last_turn
+from goal import Goal, generate_goals, score_delta
+from grids import move_cells, palette_grid, score_batch
+from hashcons import NodeTable, planning_moves
+from settings import AI_THINKING_TIME
 
-from actions import KEY_ACTION, ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, \
-    SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, PASS, PAINT, COMBINE
+from actions import ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE, \
+    SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, PASS, PAINT, COMBINE, \
+    ACTION_PENALTY
 
+# The number of a BeamPlayer's candidate moves that are scored at once.
+_BEAM_BATCH = 64
 
-def create_players(num_human: int, num_random: int, smart_players: List[int]) \
-        -> List[Player]:
+
+def create_players(num_human: int, num_random: int, smart_players: List[int],
+                   beam_players: Optional[List[Tuple[int, int]]] = None,
+                   rng: Optional[random.Random] = None) -> List[Player]:
     """Return a new list of Player objects.
 
     <num_human> is the number of human player, <num_random> is the number of
     random players, and <smart_players> is a list of difficulty levels for each
-    SmartPlayer that is to be created.
+    SmartPlayer that is to be created. <beam_players> is a list of the
+    (width, depth) of each BeamPlayer that is to be created.
 
     The list should contain <num_human> HumanPlayer objects first, then
     <num_random> RandomPlayer objects, then the same number of SmartPlayer
-    objects as the length of <smart_players>. The difficulty levels in
-    <smart_players> should be applied to each SmartPlayer object, in order.
+    objects as the length of <smart_players>, then the same number of
+    BeamPlayer objects as the length of <beam_players>. The difficulty levels
+    in <smart_players> should be applied to each SmartPlayer object, in order,
+    and likewise for the widths and depths in <beam_players>.
+
+    If <rng> is given, the goals are drawn from it, and each RandomPlayer and
+    SmartPlayer gets its own random number generator, seeded from <rng>.
+    Otherwise, they all draw from the random module.
     """
-    n = num_human + num_random + len(smart_players)
-    goals = generate_goals(n)
+    if beam_players is None:
+        beam_players = []
+    n = num_human + num_random + len(smart_players) + len(beam_players)
+    goals = generate_goals(n, rng)
+    rngs = [None if rng is None else random.Random(rng.getrandbits(64))
+            for _ in range(n)]
     offset_smarts = num_human + num_random
+    offset_beams = offset_smarts + len(smart_players)
     humans = [HumanPlayer(i, goals[i]) for i in range(num_human)]
-    rands = [RandomPlayer(i, goals[i]) for i in range(num_human, offset_smarts)]
-    smarts = [SmartPlayer(i, goals[i], smart_players[i - offset_smarts]) for i
-              in range(offset_smarts, n)]
-    return humans + rands + smarts
+    rands = [RandomPlayer(i, goals[i], rngs[i])
+             for i in range(num_human, offset_smarts)]
+    smarts = [SmartPlayer(i, goals[i], smart_players[i - offset_smarts],
+                          rng=rngs[i]) for i
+              in range(offset_smarts, offset_beams)]
+    beams = [BeamPlayer(i, goals[i], *beam_players[i - offset_beams]) for i
+             in range(offset_beams, n)]
+    return humans + rands + smarts + beams
 
 
 def _get_block(block: Block, location: Tuple[int, int], level: int) -> \
@@ -105,15 +135,20 @@ class Player:
         This player's number.
     goal:
         This player's assigned goal for the game.
+    turns_left:
+        The number of turns this player has left in the game, including the
+        current one, or None if it is not known.
     """
     id: int
     goal: Goal
+    turns_left: Optional[int]
 
     def __init__(self, player_id: int, goal: Goal) -> None:
         """Initialize this Player.
         """
         self.goal = goal
         self.id = player_id
+        self.turns_left = None
 
     def get_selected_block(self, board: Block) -> Optional[Block]:
         """Return the block that is currently selected by the player.
@@ -122,11 +157,6 @@ class Player:
         """
         raise NotImplementedError
 
-    def process_event(self, event: pygame.event.Event) -> None:
-        """Update this player based on the pygame event.
-        """
-        raise NotImplementedError
-
     def generate_move(self, board: Block) -> \
             Optional[Tuple[str, Optional[int], Block]]:
         """Return a potential move to make on the game board.
@@ -153,11 +183,15 @@ class HumanPlayer(Player):
     #     The level of the Block that the user selected most recently.
     # _desired_action:
     #     The most recent action that the user is attempting to do.
+    # _location:
+    #     The (x, y) position on the screen that the user is pointing at, or
+    #     None if they have not pointed anywhere yet.
     #
     # == Representation Invariants concerning the private attributes ==
     #     _level >= 0
     _level: int
     _desired_action: Optional[Tuple[str, Optional[int]]]
+    _location: Optional[Tuple[int, int]]
 
     def __init__(self, player_id: int, goal: Goal) -> None:
         """Initialize this HumanPlayer with the given <renderer>, <player_id>
@@ -169,32 +203,42 @@ class HumanPlayer(Player):
         # and _selected_block to None.
         self._level = 0
         self._desired_action = None
+        self._location = None
 
     def get_selected_block(self, board: Block) -> Optional[Block]:
         """Return the block that is currently selected by the player based on
-        the position of the mouse on the screen and the player's desired level.
+        the position the player is pointing at and the player's desired level.
 
         If no block is selected by the player, return None.
         """
-        mouse_pos = pygame.mouse.get_pos()
-        block = _get_block(board, mouse_pos, self._level)
+        if self._location is None:
+            return None
+        return _get_block(board, self._location, self._level)
 
-        return block
+    def point_at(self, location: Tuple[int, int]) -> None:
+        """Record that the player is pointing at the (x, y) position
+        <location> on the screen.
+        """
+        self._location = location
+
+    def choose_action(self, action: Tuple[str, Optional[int]]) -> None:
+        """Record that the player wants to do <action> to the selected
+        block.
+        """
+        self._desired_action = action
 
-    def process_event(self, event: pygame.event.Event) -> None:
-        """Respond to the relevant keyboard events made by the player based on
-        the mapping in KEY_ACTION, as well as the W and S keys for changing
-        the level.
+    def select_larger(self) -> None:
+        """Select the block one level up from the selected one, unless the
+        whole board is already selected.
         """
-        if event.type == pygame.KEYDOWN:
-            if event.key in KEY_ACTION:
-                self._desired_action = KEY_ACTION[event.key]
-            elif event.key == pygame.K_w:
-                self._level = max(0, self._level - 1)
-                self._desired_action = None
-            elif event.key == pygame.K_s:
-                self._level += 1
-                self._desired_action = None
+        self._level = max(0, self._level - 1)
+        self._desired_action = None
+
+    def select_smaller(self) -> None:
+        """Select the block one level down from the selected one.
+        """
+        self._level += 1
+        self._desired_action = None
 
     def generate_move(self, board: Block) -> \
             Optional[Tuple[str, Optional[int], Block]]:
@@ -214,32 +258,66 @@ class HumanPlayer(Player):
             return move
 
 
-class RandomPlayer(Player):
-    """ A Random Player.
+class ComputerPlayer(Player):
+    """A player whose moves are computed by the program rather than chosen by
+    a person.
+
+    This is an abstract class. Only child classes should be instantiated.
+
     === Public Attributes ===
-    id:
-    This player's number.
-    goal:
-    This player's assigned goal for the game.
+    rng:
+        The random number generator this player draws its moves from, or None
+        if it draws from the random module.
     """
     # === Private Attributes ===
     # _proceed:
     #   True when the player should make a move, False when the player should
     #   wait.
-    id: int
-    goal: Goal
+    rng: Optional[random.Random]
     _proceed: bool
 
-    def __init__(self, player_id: int, goal: Goal) -> None:
+    def __init__(self, player_id: int, goal: Goal,
+                 rng: Optional[random.Random] = None) -> None:
         Player.__init__(self, player_id, goal)
+        self.rng = rng
         self._proceed = False
 
     def get_selected_block(self, board: Block) -> Optional[Block]:
         return None
 
-    def process_event(self, event: pygame.event.Event) -> None:
-        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-            self._proceed = True
+    def proceed(self) -> None:
+        """Tell this player to make its next move.
+        """
+        self._proceed = True
+
+    def ponder(self, board: Block) -> None:
+        """Use spare time to prepare for <board> possibly becoming this
+        player's position.
+
+        By default, a computer player does nothing.
+        This function does not mutate <board>.
+        """
+        return
+
+    def is_ready(self) -> bool:
+        """Return True iff this player has been told to make its next move.
+
+        A player that is not ready returns None from generate_move without
+        doing any work, so there is no point generating its move elsewhere.
+        """
+        return self._proceed
+
+
+class RandomPlayer(ComputerPlayer):
+    """ A Random Player.
+    === Public Attributes ===
+    id:
+    This player's number.
+    goal:
+    This player's assigned goal for the game.
+    """
+    id: int
+    goal: Goal
 
     def generate_move(self, board: Block) -> \
             Optional[Tuple[str, Optional[int], Block]]:
@@ -255,69 +333,53 @@ class RandomPlayer(Player):
         if board is None:
             return None
         # Board is okay to be analyzed
-        # s0 horiz swap, s1 is vert swap, r1 is cw rot, r3 is ccw rot
-        mov_lst = [SMASH, SWAP_HORIZONTAL,SWAP_VERTICAL,
-                   ROTATE_COUNTER_CLOCKWISE, ROTATE_CLOCKWISE,
-                   PAINT, COMBINE]
-        # While there is still something left to analyze
-        while len(mov_lst) != 0:
-            rnd_mov = random.choice(mov_lst)
-            cp = board.create_copy()  # To not mutate original board
-            if rnd_mov == SMASH:
-                if cp.smashable():
-                    self._proceed = False
-                    return _create_move(SMASH, board)
-                else:
-                    mov_lst.remove(SMASH)
-            elif rnd_mov in [SWAP_HORIZONTAL, SWAP_VERTICAL,
-                             ROTATE_COUNTER_CLOCKWISE, ROTATE_CLOCKWISE]:
-                if len(cp.children) != 0:
-                    self._proceed = False
-                    return _create_move(rnd_mov, board)
-                else:
-                    mov_lst.remove(rnd_mov)
-            elif rnd_mov == COMBINE:
-                if cp.combine():
-                    self._proceed = False
-                    return _create_move(COMBINE, board)
-                else:
-                    mov_lst.remove(rnd_mov)
-            else:
-                if cp.paint(self.goal.colour):
-                    self._proceed = False
-                    return _create_move(PAINT, board)
-                else:
-                    mov_lst.remove(rnd_mov)
-
-
-class SmartPlayer(Player):
+        self._proceed = False
+        move = _random_move(board, self.goal.colour, self.rng)
+        if move is None:
+            # Nothing but PASS can be done on this board
+            return _create_move(PASS, board)
+        return move
+
+
+class SmartPlayer(ComputerPlayer):
     """ A Smart Player.
     === Public Attributes ===
     id:
     This player's number.
     goal:
     This player's assigned goal for the game.
+    difficulty:
+    How hard this player tries to find a good move.
+    time_budget:
+    The number of seconds generate_move may spend assessing moves before it
+    settles for the best move found so far.
     """
     # === Private Attributes ===
-    # _proceed:
-    #   True when the player should make a move, False when the player should
-    #   wait.
+    # _pondered:
+    #   Moves found ahead of time by ponder, as an action and the path to the
+    #   block it acts on, keyed by the board they were found for.
     player_id: int
     goal: Goal
-    _proceed: bool
     difficulty: int
+    time_budget: float
+    _pondered: Dict[Any, Tuple[Tuple[str, Optional[int]], List[int]]]
 
-    def __init__(self, player_id: int, goal: Goal, difficulty: int) -> None:
-        Player.__init__(self, player_id, goal)
-
-        self._proceed = False
+    def __init__(self, player_id: int, goal: Goal, difficulty: int,
+                 time_budget: float = AI_THINKING_TIME,
+                 rng: Optional[random.Random] = None) -> None:
+        ComputerPlayer.__init__(self, player_id, goal, rng)
+        self.difficulty = difficulty
+        self.time_budget = time_budget
+        self._pondered = {}
 
-    def get_selected_block(self, board: Block) -> Optional[Block]:
-        return None
+    def ponder(self, board: Block) -> None:
+        """Search for the move this player would make on <board>, and remember
+        it in case <board> becomes this player's position.
 
-    def process_event(self, event: pygame.event.Event) -> None:
-        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-            self._proceed = True
+        This function does not mutate <board>.
+        """
+        action, block = self._search(board)
+        self._pondered[_board_key(board)] = (action, block_path(board, block))
 
     def generate_move(self, board: Block) -> \
             Optional[Tuple[str, Optional[int], Block]]:
@@ -329,6 +391,9 @@ class SmartPlayer(Player):
         performed on the <board>. If no move can be found that is better than
         the current score, this player will pass.
 
+        If this player has already pondered <board>, the move it found then is
+        returned without searching again.
+
         This function does not mutate <board>.
         """
         if not self._proceed:
@@ -336,83 +401,243 @@ class SmartPlayer(Player):
         if board is None:
             return None
         # Board is okay to be analyzed
-        mov_lst = [SMASH, SWAP_HORIZONTAL, SWAP_VERTICAL,
-                   ROTATE_COUNTER_CLOCKWISE, ROTATE_CLOCKWISE,
-                   PAINT, COMBINE]
-        valid_movs = []  # Contains tuple (move, score)
-        # find list of valid moves and compute their score
-        while len(mov_lst) != 0:
-            rnd_mov = random.choice(mov_lst)
-            cp = board.create_copy()  # To not mutate original board
-            if rnd_mov == SMASH:
-                if cp.smashable():
-                    cp.smash()
-                    valid_movs.append((SMASH, self.goal.score(cp)))
-                    mov_lst.remove(SMASH)
-                else:
-                    mov_lst.remove(SMASH)
-            elif rnd_mov in [SWAP_HORIZONTAL, SWAP_VERTICAL,
-                             ROTATE_COUNTER_CLOCKWISE, ROTATE_CLOCKWISE]:
-                if len(cp.children) != 0:
-                    if rnd_mov == SWAP_HORIZONTAL:
-                        cp.swap(0)
-                        valid_movs.append((SWAP_HORIZONTAL,
-                                          self.goal.score(cp)))
-                        mov_lst.remove(SWAP_HORIZONTAL)
-                    elif rnd_mov == SWAP_VERTICAL:
-                        cp.swap(1)
-                        valid_movs.append((SWAP_VERTICAL,
-                                          self.goal.score(cp)))
-                        mov_lst.remove(SWAP_VERTICAL)
-                    elif rnd_mov == ROTATE_CLOCKWISE:
-                        cp.rotate(1)
-                        valid_movs.append((ROTATE_CLOCKWISE,
-                                          self.goal.score(cp)))
-                        mov_lst.remove(ROTATE_CLOCKWISE)
-                    else:
-                        cp.rotate(3)
-                        valid_movs.append((ROTATE_COUNTER_CLOCKWISE,
-                                           self.goal.score(cp)))
-                        mov_lst.remove(ROTATE_COUNTER_CLOCKWISE)
-                else:
-                    mov_lst.remove(rnd_mov)
-            elif rnd_mov == COMBINE:
-                if cp.combine():
-                    valid_movs.append((COMBINE, self.goal.score(cp)))
-                    mov_lst.remove(COMBINE)
-                else:
-                    mov_lst.remove(rnd_mov)
-            else:
-                if cp.paint(self.goal.colour):
-                    valid_movs.append((PAINT, self.goal.score(cp)))
-                    mov_lst.remove(PAINT)
-                else:
-                    mov_lst.remove(rnd_mov)
-        # Pick max score
-        if len(valid_movs) != 0:
-            max_score = 0
-            ind = 0
-            for i in range(len(valid_movs)):
-                if valid_movs[i][1] > max_score:
-                    ind = i
-                    max_score = valid_movs[i][1]
-            if self.goal.score(board) < max_score:
-                self._proceed = False
-                return _create_move(valid_movs[ind][0], board)
-            else:
-                self._proceed = False
-                return _create_move(PASS, board)
+        pondered = self._pondered.get(_board_key(board))
+        # Any other pondered boards can no longer come up
+        self._pondered = {}
+        self._proceed = False
+        if pondered is not None:
+            action, path = pondered
+            return _create_move(action, block_at(board, path))
+        action, block = self._search(board)
+        return _create_move(action, block)
+
+    def _search(self, board: Block) -> Tuple[Tuple[str, Optional[int]], Block]:
+        """Return the action with the highest score for this player's goal on
+        <board> out of <difficulty> randomly generated valid moves, and the
+        block it acts on. Return PASS if no move improves the current score.
+
+        This is an anytime search: once <time_budget> seconds have passed, no
+        more moves are assessed and the best move found so far is returned.
+
+        This function does not mutate <board>.
+        """
+        deadline = time.perf_counter() + self.time_budget
+        best_mov = (PASS, board)
+        best_delta = 0
+        # Assess <difficulty> random moves until time runs out
+        for _ in range(self.difficulty):
+            if time.perf_counter() > deadline:
+                break
+            move = _random_move(board, self.goal.colour, self.rng)
+            if move is None:
+                break
+            delta = score_delta(self.goal, board, move, rng=self.rng)
+            if delta > best_delta:
+                best_mov = ((move[0], move[1]), move[2])
+                best_delta = delta
+        return best_mov
+
+
+def _board_key(board: Block) -> Any:
+    """Return a hashable value that is equal for two boards iff they have the
+    same structure and colours.
+    """
+    if not board.children:
+        return board.colour
+    return tuple(_board_key(child) for child in board.children)
+
+
+class BeamPlayer(ComputerPlayer):
+    """A player that plans a sequence of its own moves over its remaining
+    turns, using a beam search.
+
+    Each step of the search tries every valid move on each board in the beam,
+    and keeps the <width> best distinct boards that result. Boards are ranked
+    by this player's goal score minus the penalties of the moves that led to
+    them. The first move of the best plan found is made.
+
+    Smashes are not planned, since what they produce is random.
+
+    === Public Attributes ===
+    id:
+    This player's number.
+    goal:
+    This player's assigned goal for the game.
+    width:
+    The number of boards kept after each step of the search.
+    depth:
+    The largest number of moves planned ahead, including the current one.
+    time_budget:
+    The number of seconds generate_move may spend searching before it settles
+    for the best plan found so far.
+    """
+    id: int
+    goal: Goal
+    width: int
+    depth: int
+    time_budget: float
+
+    def __init__(self, player_id: int, goal: Goal, width: int, depth: int,
+                 time_budget: float = AI_THINKING_TIME) -> None:
+        ComputerPlayer.__init__(self, player_id, goal)
+        self.width = width
+        self.depth = depth
+        self.time_budget = time_budget
+
+    def generate_move(self, board: Block) -> \
+            Optional[Tuple[str, Optional[int], Block]]:
+        """Return the first move of the best plan of at most <depth> moves,
+        and no more moves than this player has turns left. Return PASS if no
+        plan beats doing nothing.
+
+        On this player's last turn, the best move is found exactly by
+        endgame.solve_last_turn instead.
+
+        This function does not mutate <board>.
+        """
+        if not self._proceed:
+            return None  # Do not remove
+        if board is None:
+            return None
+        self._proceed = False
+        if self.turns_left == 1:
+            # Planning ahead is pointless, and the best move can be found
+            return solve_last_turn(board, self.goal)[0]
+        depth = self.depth
+        if self.turns_left is not None:
+            depth = min(depth, self.turns_left)
+        action, path = self._search(board, depth)
+        return _create_move(action, block_at(board, path))
+
+    def _search(self, board: Block, depth: int) -> \
+            Tuple[Tuple[str, Optional[int]], List[int]]:
+        """Return the first action of the best plan of at most <depth> moves on
+        <board>, and the path to the block it acts on.
+
+        The boards in the beam are kept as nodes of a NodeTable (see
+        hashcons.py), so they share every block that no move has changed.
+        Each step's moves are scored together, a batch at a time, on palette
+        grids (see grids.py). Every move on <board> itself is always scored.
+        After that, once <time_budget> seconds have passed, no more moves are
+        scored and the first action of the best plan found so far is returned.
+        """
+        deadline = time.perf_counter() + self.time_budget
+        colour = self.goal.colour
+        table = NodeTable()
+        root = table.intern(board)
+        grid = palette_grid(board)
+        score = int(score_batch(self.goal, grid[None])[0])
+        # Each entry is a value, the goal score, a board, its palette grid,
+        # and the first move that led to it
+        beam = [(score, score, root, grid, (PASS, []))]
+        best_value, best_first = score, (PASS, [])
+        # Boards that are rotations or reflections of each other score the
+        # same, now and after every later move, so only one is kept
+        seen = set(table.symmetries(root))
+        for step in range(depth):
+            candidates = [(entry, candidate) for entry in beam
+                          for candidate in planning_moves(
+                              entry[2], entry[3], board.level,
+                              board.max_depth, colour)]
+            scored = []
+            for start in range(0, len(candidates), _BEAM_BATCH):
+                if step > 0 and time.perf_counter() > deadline:
+                    break
+                batch = candidates[start:start + _BEAM_BATCH]
+                grids = np.stack([entry[3] for entry, _ in batch])
+                for k, (_, (action, _, x, y, d, fill)) in enumerate(batch):
+                    move_cells(grids[k], action, x, y, d, fill)
+                scores = score_batch(self.goal, grids).tolist()
+                for (entry, candidate), new_score in zip(batch, scores):
+                    scored.append((entry[0] + new_score - entry[1]
+                                   - ACTION_PENALTY[candidate[0]], new_score,
+                                   entry, candidate))
+            scored.sort(key=lambda item: item[0], reverse=True)
+
+            new_beam = []
+            for value, new_score, entry, candidate in scored:
+                if len(new_beam) == self.width:
+                    break
+                action, path, x, y, d, fill = candidate
+                node = table.move(entry[2], path, action, colour)
+                if node in seen:
+                    continue
+                seen.update(table.symmetries(node))
+                first = (action, path) if step == 0 else entry[4]
+                new_grid = entry[3].copy()
+                move_cells(new_grid, action, x, y, d, fill)
+                new_beam.append((value, new_score, node, new_grid, first))
+                if value > best_value:
+                    best_value, best_first = value, first
+            if not new_beam or len(scored) < len(candidates):
+                break
+            beam = new_beam
+        return best_first
+
+
+def _valid_actions(block: Block, colour: Tuple[int, int, int]) -> \
+        List[Tuple[str, Optional[int]]]:
+    """Return the actions other than PASS that can be performed on <block>,
+    painting with <colour>.
+    """
+    actions = []
+    if block.smashable():
+        actions.append(SMASH)
+    if block.can_swap():
+        actions.extend([SWAP_HORIZONTAL, SWAP_VERTICAL])
+    if block.can_rotate():
+        actions.extend([ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE])
+    if block.can_paint(colour):
+        actions.append(PAINT)
+    if block.can_combine():
+        actions.append(COMBINE)
+    return actions
+
+
+def _random_move(board: Block, colour: Tuple[int, int, int],
+                 rng: Optional[random.Random] = None) -> \
+        Optional[Tuple[str, Optional[int], Block]]:
+    """Return a move chosen uniformly at random from all the valid (action,
+    block) pairs on <board>, painting with <colour>. Return None if the only
+    valid move is PASS.
+
+    The move is drawn from <rng>, or from the random module if <rng> is None.
+
+    One of the pairs is picked by its index, and found by walking down from
+    <board> past the pairs of each block and of each child's subtree, which
+    Block.move_count counts. So this takes O(depth) time once <board> has
+    been counted.
+
+    This function does not mutate <board>.
+    """
+    if rng is None:
+        rng = random
+    total = board.move_count(colour)
+    if total == 0:
+        return None
+    index = rng.randrange(total)
+    block = board
+    while True:
+        actions = _valid_actions(block, colour)
+        if index < len(actions):
+            return _create_move(actions[index], block)
+        index -= len(actions)
+        for child in block.children:
+            count = child.move_count(colour)
+            if index < count:
+                block = child
+                break
+            index -= count
 
 
 if __name__ == '__main__':
     import python_ta
 
     python_ta.check_all(config={
-        'allowed-io': ['process_event'],
         'allowed-import-modules': [
             'doctest', 'python_ta', 'random', 'typing', 'actions', 'block',
-            'goal', 'pygame', '__future__'
+            'goal', '__future__', 'settings', 'time', 'endgame', 'numpy',
+            'grids', 'hashcons'
         ],
-        'max-attributes': 10,
-        'generated-members': 'pygame.*'
+        'max-attributes': 10
     })
@@ -0,0 +1,185 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains functions that draw boards into NumPy arrays of pixels,
+which pygame.surfarray can copy onto a surface in one call, instead of
+drawing each block with pygame.draw.
+
+The pixels are the same as drawing each square with pygame.draw.rect and
+outlining it, in order. Blocks are not always exactly half the size of their
+parents, so squares can overlap by a pixel, and which is drawn last matters.
+So rather than stretching a grid of unit cells, each axis is cut into
+segments at every edge of a square and of its outline. Within one segment of
+each axis every pixel is the same, so the squares are drawn in order on the
+much smaller grid of segments, which is then stretched to pixels by the
+width of each segment.
+
+Arrays of pixels are indexed [x, y, channel], as pygame.surfarray expects.
+"""
+from typing import List, Tuple
+
+import numpy as np
+import pygame
+
+from settings import BACKGROUND_COLOUR, OUTLINE_COLOUR, OUTLINE_THICKNESS
+
+
+def _segments(starts: np.ndarray, sizes: np.ndarray, low: int,
+              high: int) -> np.ndarray:
+    """Return the edges of the segments that the pixels from <low> up to
+    <high> on one axis are cut into, for squares that start at <starts> on
+    that axis with <sizes>.
+    """
+    edges = np.concatenate([starts, starts + sizes,
+                            starts + np.minimum(sizes, OUTLINE_THICKNESS),
+                            starts + sizes - OUTLINE_THICKNESS, [low, high]])
+    return np.unique(np.minimum(np.maximum(edges, low), high))
+
+
+def _segment_grid(squares: List[Tuple[Tuple[int, int, int],
+                                      Tuple[int, int], int]],
+                  rect: pygame.Rect) -> Tuple[np.ndarray,
+                                              List[Tuple[int, int, int]],
+                                              np.ndarray, np.ndarray]:
+    """Return the segments that <rect> is cut into for drawing <squares>, as
+    the index in a palette of the colour of each segment, the palette, and the
+    width in pixels of the segments along each axis.
+    """
+    palette = [BACKGROUND_COLOUR, OUTLINE_COLOUR]
+    if not squares:
+        return np.zeros((1, 1), dtype=np.uint8), palette, \
+            np.array([rect.width]), np.array([rect.height])
+    indices = {colour: i for i, colour in enumerate(palette)}
+    fills = []
+    for colour, _, _ in squares:
+        if colour not in indices:
+            indices[colour] = len(palette)
+            palette.append(colour)
+        fills.append(indices[colour])
+    xs = np.array([pos[0] for _, pos, _ in squares], dtype=np.int64)
+    ys = np.array([pos[1] for _, pos, _ in squares], dtype=np.int64)
+    sizes = np.array([size for _, _, size in squares], dtype=np.int64)
+    x_edges = _segments(xs, sizes, rect.left, rect.right)
+    y_edges = _segments(ys, sizes, rect.top, rect.bottom)
+    x_first = np.searchsorted(x_edges, xs).tolist()
+    x_last = np.searchsorted(x_edges, xs + sizes).tolist()
+    y_first = np.searchsorted(y_edges, ys).tolist()
+    y_last = np.searchsorted(y_edges, ys + sizes).tolist()
+
+    # The index of the square drawn last over each segment, or -1 if none is
+    owner = np.full((len(x_edges) - 1, len(y_edges) - 1), -1, dtype=np.int32)
+    for i in range(len(squares)):
+        owner[x_first[i]:x_last[i], y_first[i]:y_last[i]] = i
+
+    left, top, size = xs[owner], ys[owner], sizes[owner]
+    x_start, x_end = x_edges[:-1, None], x_edges[1:, None]
+    y_start, y_end = y_edges[None, :-1], y_edges[None, 1:]
+    outline = (x_start < left + OUTLINE_THICKNESS) | \
+        (x_end > left + size - OUTLINE_THICKNESS) | \
+        (y_start < top + OUTLINE_THICKNESS) | \
+        (y_end > top + size - OUTLINE_THICKNESS)
+    grid = np.array(fills, dtype=np.min_scalar_type(len(palette)))[owner]
+    grid[outline] = 1
+    grid[owner < 0] = 0
+    return grid, palette, np.diff(x_edges), np.diff(y_edges)
+
+
+def _stretch(grid: np.ndarray, widths: np.ndarray,
+             heights: np.ndarray) -> np.ndarray:
+    """Return <grid> with each column i repeated <widths>[i] times and each
+    row j repeated <heights>[j] times.
+    """
+    return np.repeat(np.repeat(grid, widths, axis=0), heights, axis=1)
+
+
+def rasterize(squares: List[Tuple[Tuple[int, int, int], Tuple[int, int],
+                                  int]],
+              rect: pygame.Rect) -> np.ndarray:
+    """Return the pixels in <rect> after drawing each of <squares> with its
+    outline, in order, on a background of BACKGROUND_COLOUR.
+
+    Each square is a colour, the position of its upper-left corner and its
+    size, as listed by blocky._block_to_squares.
+
+    >>> pixels = rasterize([((255, 0, 0), (0, 0), 8)], pygame.Rect(0, 0, 9, 9))
+    >>> pixels.shape
+    (9, 9, 3)
+    >>> [tuple(pixels[x, 4]) for x in [0, 2, 3, 4, 5, 8]] == \\
+    ...     [OUTLINE_COLOUR] * 2 + [(255, 0, 0)] * 2 + \\
+    ...     [OUTLINE_COLOUR, BACKGROUND_COLOUR]
+    True
+    """
+    indices, palette = rasterize_palette(squares, rect)
+    return np.array(palette, dtype=np.uint8)[indices]
+
+
+def rasterize_palette(squares: List[Tuple[Tuple[int, int, int],
+                                          Tuple[int, int], int]],
+                      rect: pygame.Rect) -> \
+        Tuple[np.ndarray, List[Tuple[int, int, int]]]:
+    """Return the pixels in <rect> as rasterize does, but as the index of each
+    pixel's colour in a palette, and the palette.
+
+    >>> indices, palette = rasterize_palette([((255, 0, 0), (0, 0), 8)],
+    ...                                      pygame.Rect(0, 0, 9, 9))
+    >>> palette[indices[4, 4]]
+    (255, 0, 0)
+    >>> palette[indices[8, 4]] == BACKGROUND_COLOUR
+    True
+    """
+    grid, palette, widths, heights = _segment_grid(squares, pygame.Rect(rect))
+    return _stretch(grid, widths, heights), palette
+
+
+def draw_squares(surface: pygame.Surface,
+                 squares: List[Tuple[Tuple[int, int, int], Tuple[int, int],
+                                     int]],
+                 rect: pygame.Rect) -> None:
+    """Draw <squares> as rasterize does onto the part of <surface> in <rect>,
+    in place of whatever was there.
+
+    Precondition: <rect> is inside <surface>.
+    """
+    if not rect.width or not rect.height:
+        return
+    grid, palette, widths, heights = _segment_grid(squares, rect)
+    # Copying pixels already in the surface's format is much faster than
+    # copying colours
+    mapped = np.array([surface.map_rgb(colour) for colour in palette],
+                      dtype=np.uint32)
+    pixels = _stretch(mapped[grid], widths, heights)
+    if surface.get_bytesize() == 3:
+        # pixels2d cannot refer to pixels of three bytes
+        pygame.surfarray.blit_array(surface.subsurface(rect), pixels)
+    else:
+        pygame.surfarray.pixels2d(surface.subsurface(rect))[...] = pixels
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'typing', '__future__', 'numpy', 'pygame',
+            'settings'
+        ],
+        'generated-members': 'pygame.*'
+    })
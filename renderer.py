@@ -21,15 +21,18 @@ Misha Schwartz, and Jaisie Sin.
 
 This file contains the class that "renders" the image of our game.
 """
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Dict, List, Tuple, Optional
+import numpy as np
 import pygame
 
 from actions import ROTATE_CLOCKWISE, ROTATE_COUNTER_CLOCKWISE,\
-    SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, ACTION_KEY, ACTION_LABEL, COMBINE,\
-    PAINT, PASS
-from settings import BACKGROUND_COLOUR, TEXT_COLOUR, OUTLINE_THICKNESS, \
-    OUTLINE_COLOUR, HIGHLIGHT_THICKNESS, HIGHLIGHT_COLOUR, COLOUR_LIST, \
-    colour_name
+    SWAP_HORIZONTAL, SWAP_VERTICAL, SMASH, ACTION_LABEL, COMBINE, PAINT, PASS
+from block import Block
+from boarddiff import board_diff, diff_regions
+from controls import ACTION_KEY
+from raster import draw_squares
+from settings import BACKGROUND_COLOUR, TEXT_COLOUR, HIGHLIGHT_THICKNESS, \
+    HIGHLIGHT_COLOUR, COLOUR_LIST, colour_name
 
 Y_FONT_PADDING = 2
 
@@ -142,25 +145,73 @@ def _print_instructions(screen: pygame.Surface,
 class Renderer:
     """
     A class designed to handle drawing the different aspects of a Blocky game.
+
+    Drawing is done a frame at a time: clear starts a frame, the draw methods
+    say what is in it, and present shows it. Only the parts of the screen that
+    differ from the last frame are drawn again and sent to the display: what
+    was drawn in one frame but not the other, such as a highlight or status
+    message that moved or changed, and the blocks of a board drawn by
+    draw_block that changed.
     """
     # === Private Attributes ===
     # _screen:
     #   The pygame image to draw on for visualizing graphics.
+    # _offscreen:
+    #   Whether <_screen> is an image that is never shown, rather than the
+    #   display.
     # _font:
     #   The font to use for text being drawn.
     # _images:
     #   A dictionary mapping actions to images that are displayed in the game.
+    # _scaled:
+    #   The images in <_images> stretched to each size they have been drawn
+    #   at, keyed by action and size.
     # _status_position:
     #   The (x, y) position of the status messages.
+    # _status_rect:
+    #   The part of the screen the status messages are drawn in.
+    # _board_image:
+    #   The last board drawn by draw_block, drawn off the screen, or None if
+    #   no board has been drawn yet.
+    # _board_drawn:
+    #   The board in <_board_image>, and its version when it was drawn.
+    # _board_copy:
+    #   A copy of the board in <_board_image>, to compare the next board drawn
+    #   with, or None if no board has been drawn yet.
+    # _ops:
+    #   What has been drawn in the current frame, in order, as a description
+    #   of each drawing and the part of the screen it covers.
+    # _drawn_ops:
+    #   What was in <_ops> when the screen was last drawn, or None if it has
+    #   not been drawn yet.
+    # _dirty:
+    #   Parts of the screen that must be drawn again even if the frame is
+    #   described the same way, because a board in it has changed.
+    # _unshown:
+    #   Parts of the screen that have been drawn again, but not yet sent to the
+    #   display, or None if the whole screen must be sent.
     _screen: pygame.Surface
+    _offscreen: bool
     _instructions: pygame.Surface
     _images: Dict[Tuple[str, Optional[int]], pygame.Surface]
+    _scaled: Dict[Tuple[Tuple[str, Optional[int]], int], pygame.Surface]
     _font: pygame.font.Font
     _status_position: Tuple[int, int]
-    _clear_rect: Tuple[Tuple[int, int], Tuple[int, int]]
-
-    def __init__(self, size: int) -> None:
+    _status_rect: pygame.Rect
+    _clear_rect: pygame.Rect
+    _board_image: Optional[pygame.Surface]
+    _board_drawn: Optional[Tuple[Block, int]]
+    _board_copy: Optional[Block]
+    _ops: List[Tuple[Tuple[Any, ...], pygame.Rect]]
+    _drawn_ops: Optional[List[Tuple[Tuple[Any, ...], pygame.Rect]]]
+    _dirty: List[pygame.Rect]
+    _unshown: Optional[List[pygame.Rect]]
+
+    def __init__(self, size: int, offscreen: bool = False) -> None:
         """Initialize this Renderer for a board with dimensions <size> x <size>.
+
+        If <offscreen> is True, draw onto an image that is never shown instead
+        of the display, so that no display is needed, only pygame.font.
         """
         self._font = pygame.font.Font(pygame.font.get_default_font(), 14)
         status_height = self._font.size("Player")[1]
@@ -169,12 +220,24 @@ class Renderer:
         height = size + status_height + 2 * Y_FONT_PADDING
         width = size + instructions_width
 
-        self._screen = pygame.display.set_mode((width, height))
+        self._offscreen = offscreen
+        if offscreen:
+            self._screen = pygame.Surface((width, height))
+        else:
+            self._screen = pygame.display.set_mode((width, height))
         self._instructions = _print_instructions(self._screen, self._font,
                                                  height)
 
         self._status_position = (10, size + Y_FONT_PADDING)
-        self._clear_rect = ((0, 0), (size, height))
+        self._status_rect = pygame.Rect(0, size, size, height - size)
+        self._clear_rect = pygame.Rect((0, 0), (size, height))
+        self._board_image = None
+        self._board_drawn = None
+        self._board_copy = None
+        self._ops = []
+        self._drawn_ops = None
+        self._dirty = []
+        self._unshown = None
 
         self._images = {
             ROTATE_CLOCKWISE: _load_image('images/rotate-cw.png'),
@@ -186,11 +249,41 @@ class Renderer:
             PAINT: _load_image('images/paint.png'),
             PASS: _load_image('images/pass.png')
         }
+        self._scaled = {}
+
+    def prepare_images(self, max_depth: int) -> None:
+        """Stretch every action's image to the size of the blocks at each level
+        of a board with <max_depth>, so that no image needs to be stretched
+        while a game is being drawn.
+        """
+        size = self._clear_rect.width
+        for _ in range(max_depth + 1):
+            for action in self._images:
+                self._scaled_image(action, size)
+            # The same rounding as Block._child_size
+            size = round(size / 2.0)
+
+    def _scaled_image(self, action: Tuple[str, Optional[int]],
+                      size: int) -> pygame.Surface:
+        """Return the image for <action> stretched to <size> by <size>, in the
+        screen's pixel format so that copying it onto the screen is fast, if
+        there is a display to find that format from.
+
+        Precondition: <action> is in <_images>.
+        """
+        image = self._scaled.get((action, size))
+        if image is None:
+            image = pygame.transform.scale(self._images[action], (size, size))
+            if not self._offscreen:
+                image = image.convert_alpha(self._screen)
+            self._scaled[(action, size)] = image
+        return image
 
     def clear(self) -> None:
-        """Clear the screen with BACKGROUND_COLOUR.
+        """Start a new frame, which is BACKGROUND_COLOUR until something is
+        drawn in it.
         """
-        self._screen.fill(BACKGROUND_COLOUR, self._clear_rect)
+        self._ops = []
 
     def draw_image(self, action: Tuple[str, Optional[int]],
                    pos: Tuple[int, int], size: int) -> None:
@@ -199,27 +292,84 @@ class Renderer:
 
         If the action is not supported, no image is drawn.
         """
-        if action in self._images:
-            image = self._images[action]
-            image = pygame.transform.scale(image, (size, size))
-            self._screen.blit(image, pos)
+        self._ops.append((('image', action, pos, size),
+                          pygame.Rect(pos, (size, size))))
 
     def draw_board(self, squares: List[Tuple[Tuple[int, int, int],
                                              Tuple[int, int], int]]) -> None:
         """Draw each block in blocks onto the screen.
+
+        The squares are drawn all at once (see raster.py), so the smallest
+        rectangle around them is drawn over, in BACKGROUND_COLOUR where there
+        is no square.
         """
-        for colour, pos, size in squares:
-            rect = (pos[0], pos[1], size, size)
-            pygame.draw.rect(self._screen, colour, rect, 0)
-            pygame.draw.rect(self._screen, OUTLINE_COLOUR, rect,
-                             OUTLINE_THICKNESS)
+        rects = [pygame.Rect(pos, (size, size)) for _, pos, size in squares]
+        rect = rects[0].unionall(rects) if rects else pygame.Rect(0, 0, 0, 0)
+        self._ops.append((('board', tuple(squares)), rect))
+
+    def draw_block(self, board: Block) -> None:
+        """Draw <board> onto the screen, the same way as draw_board.
+
+        The board is drawn off the screen first, and that image is kept and
+        copied onto the screen. When <board> is another board or has changed,
+        only the blocks that are different are drawn again.
+        """
+        version = board.version()
+        if self._board_drawn is None or self._board_drawn[0] is not board or \
+                self._board_drawn[1] != version:
+            self._update_board_image(board)
+            self._board_drawn = (board, version)
+        self._ops.append((('block', board.position, board.size),
+                          pygame.Rect(board.position, (board.size,) * 2)))
+
+    def _update_board_image(self, board: Block) -> None:
+        """Make <_board_image> an image of <board>, drawing again only the
+        blocks that are different from <_board_copy>, and add them to the
+        parts of the screen to draw again.
+        """
+        copy = self._board_copy
+        if self._board_image is None or copy is None or \
+                (copy.position, copy.size, copy.max_depth) != \
+                (board.position, board.size, board.max_depth):
+            self._board_image = pygame.Surface((board.size, board.size))
+            regions = [(board.position, board.size)]
+        else:
+            regions = diff_regions(board, board_diff(copy, board))
+        for position, size in regions:
+            rect = pygame.Rect(position, (size, size))
+            squares = []
+            self._leaves_in(board, board.position, rect, squares)
+            area = rect.move(-board.position[0], -board.position[1])
+            draw_squares(self._board_image, squares,
+                         area.clip(self._board_image.get_rect()))
+            self._dirty.append(rect)
+        if regions:
+            self._board_copy = board.create_copy()
+
+    def _leaves_in(self, block: Block, origin: Tuple[int, int],
+                   region: pygame.Rect,
+                   squares: List[Tuple[Tuple[int, int, int],
+                                       Tuple[int, int], int]]) -> None:
+        """Add every leaf of <block> in <region> of the screen to <squares>,
+        positioned on <_board_image>, whose top left corner is at <origin> on
+        the screen, in the same order as blocky._block_to_squares lists them.
+        """
+        if not region.colliderect(pygame.Rect(block.position,
+                                              (block.size, block.size))):
+            return
+        if block.children:
+            for child in block.children:
+                self._leaves_in(child, origin, region, squares)
+        else:
+            squares.append((block.colour, (block.position[0] - origin[0],
+                                           block.position[1] - origin[1]),
+                            block.size))
 
     def highlight_block(self, pos: Tuple[int, int], size: int) -> None:
         """Draw a highlighted square border at pos with size.
         """
-        rect = (pos[0], pos[1], size, size)
-        pygame.draw.rect(self._screen, HIGHLIGHT_COLOUR, rect,
-                         HIGHLIGHT_THICKNESS)
+        self._ops.append((('highlight', pos, size),
+                          pygame.Rect(pos, (size, size))))
 
     def text_height(self) -> int:
         """Return the height between lines of text in pixels.
@@ -229,15 +379,87 @@ class Renderer:
     def print(self, text: str, x: int, y: int) -> None:
         """Print <text> to the (<x>, <y>) location on the screen.
         """
-        _print_to_image(text, x, y, self._font, self._screen)
+        self._ops.append((('print', text, x, y),
+                          pygame.Rect((x, y), self._font.size(text))))
 
     def draw_status(self, message: str) -> None:
         """Draw the current status of the game.
         """
-        surface = self._font.render(message, 1, TEXT_COLOUR)
-        self._screen.blit(surface, self._status_position)
+        self._ops.append((('status', message), self._status_rect))
+
+    def _draw(self, op: Tuple[Any, ...], rect: pygame.Rect) -> None:
+        """Draw what <op> describes onto the screen, where it covers <rect>.
+        """
+        kind = op[0]
+        if kind == 'image' and op[1] in self._images:
+            _, action, pos, size = op
+            self._screen.blit(self._scaled_image(action, size), pos)
+        elif kind == 'board':
+            draw_squares(self._screen, op[1],
+                         rect.clip(self._screen.get_clip()))
+        elif kind == 'block':
+            self._screen.blit(self._board_image, op[1])
+        elif kind == 'highlight':
+            rect = (op[1][0], op[1][1], op[2], op[2])
+            pygame.draw.rect(self._screen, HIGHLIGHT_COLOUR, rect,
+                             HIGHLIGHT_THICKNESS)
+        elif kind == 'print':
+            _print_to_image(op[1], op[2], op[3], self._font, self._screen)
+        elif kind == 'status':
+            surface = self._font.render(op[1], 1, TEXT_COLOUR)
+            self._screen.blit(surface, self._status_position)
+
+    def _flush(self) -> None:
+        """Draw the parts of the current frame that differ from what is on the
+        screen, and remember them to be sent to the display.
+        """
+        if self._drawn_ops is None:
+            rects = [self._clear_rect]
+        else:
+            # Whatever was drawn in only one of the frames has changed
+            ops = [op for op, _ in self._ops]
+            drawn_ops = [op for op, _ in self._drawn_ops]
+            rects = self._dirty + \
+                [rect for op, rect in self._ops if op not in drawn_ops] + \
+                [rect for op, rect in self._drawn_ops if op not in ops]
+        rects = [rect.clip(self._clear_rect) for rect in rects]
+        rects = [rect for rect in rects if rect.width and rect.height]
+
+        for rect in rects:
+            self._screen.set_clip(rect)
+            self._screen.fill(BACKGROUND_COLOUR, rect)
+            for op, op_rect in self._ops:
+                if op_rect.colliderect(rect):
+                    self._draw(op, op_rect)
+        self._screen.set_clip(None)
+
+        self._drawn_ops = list(self._ops)
+        self._dirty = []
+        if self._unshown is not None:
+            self._unshown.extend(rects)
+
+    def present(self) -> None:
+        """Show the current frame on the display, sending only the parts of it
+        that have changed, or only draw it if this Renderer is offscreen.
+        """
+        self._flush()
+        if self._offscreen:
+            return
+        if self._unshown is None:
+            pygame.display.flip()
+        elif self._unshown:
+            pygame.display.update(self._unshown)
+        self._unshown = []
+
+    def pixels(self) -> np.ndarray:
+        """Return a copy of the current frame as a NumPy array of pixels,
+        indexed [x, y, channel].
+        """
+        self._flush()
+        return pygame.surfarray.array3d(self._screen)
 
     def save_to_file(self, filename: str) -> None:
         """Save the current graphics on the screen to a file named <filename>.
         """
+        self._flush()
         pygame.image.save(self._screen, filename)
@@ -0,0 +1,432 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains a server that hosts many Blocky games at once, without a
+display, for clients connected over TCP or a Unix socket.
+
+Clients and the server send each other lines of text. A client sends:
+
+    new <max_depth> <num_turns> <seed> <seats>
+        Start a game. <seats> lists the players, in order, separated by
+        commas: remote (moves are sent by a client), random, smart:<difficulty>
+        or beam:<width>x<depth>. Each number must be at least 1 and at most
+        the limit for it below.
+    move <game> <action name> <direction> <path>
+        Make the current player's move in <game>, when they are remote.
+    board <game>
+        Ask for the whole board of <game>.
+
+and the server answers with:
+
+    game <game> <size> <max_depth> <board> <goals>
+        A game was started. The board is encoded by encode_board, in
+        hexadecimal, and the goals are <class name>:<colour index>, separated
+        by commas.
+    moved <game> <turn> <player> <action name> <direction> <path> <diff>
+        A move was made. The diff changes the board from before the move to
+        after it (see boarddiff.py), in hexadecimal, or is - for a pass.
+    board <game> <board>
+        The whole board of <game>, encoded like the board in a game line.
+    turn <game> <player>
+        It is the remote <player>'s turn to move in <game>.
+    over <game> <scores>
+        The game is over. The scores are <player>:<goal score>:<penalty>,
+        separated by commas.
+    error <message>
+        The last line sent could not be carried out.
+
+As in a move log (see movelog.py), a direction is - for actions without one,
+and a path is the indices of the children to follow from the board to a block,
+or - for the board itself.
+
+After a new or move line, the server makes every computer player's move until
+it is a remote player's turn or the game is over, sending a moved line for
+each move, including the remote player's, then a turn or over line. Computer
+players choose their moves in a pool of threads, so that one game's search
+does not hold up the others. Each game draws from its own random number
+generator, seeded by the client, so games do not disturb each other.
+
+A game is forgotten when the connection that started it is closed.
+"""
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+import argparse
+import asyncio
+import random
+
+from actions import PASS
+from block import Block, block_at, block_path, encode_board, generate_board
+from boarddiff import move_diff
+from engine import GameData, TurnEngine
+from goal import generate_goals
+from player import Player, ComputerPlayer, RandomPlayer, SmartPlayer, \
+    BeamPlayer
+from settings import BOARD_SIZE, COLOUR_LIST
+
+# The largest settings a client may ask for in a new line, so that one client
+# cannot start a game that takes up the whole server.
+MAX_DEPTH = 6
+MAX_TURNS = 1000
+MAX_DIFFICULTY = 1000
+MAX_BEAM_WIDTH = 64
+MAX_BEAM_DEPTH = 16
+
+
+def _text(values: List[int]) -> str:
+    """Return <values> as digits with nothing between them, or - if there are
+    none, as paths are written in the protocol.
+
+    >>> _text([0, 3, 1])
+    '031'
+    >>> _text([])
+    '-'
+    """
+    return ''.join(str(value) for value in values) or '-'
+
+
+def _number(text: str, name: str, high: int) -> int:
+    """Return the <name> in a line, written as <text>.
+
+    Raise a ValueError if <text> is not a whole number from 1 to <high>.
+
+    >>> _number('3', 'difficulty', 5)
+    3
+    >>> _number('0', 'difficulty', 5)
+    Traceback (most recent call last):
+    ValueError: difficulty must be from 1 to 5
+    """
+    try:
+        value = int(text)
+    except ValueError:
+        raise ValueError(f'{name} must be a whole number') from None
+    if not 1 <= value <= high:
+        raise ValueError(f'{name} must be from 1 to {high}')
+    return value
+
+
+def make_seats(seats: List[str], rng: random.Random) -> Tuple[List[Player],
+                                                              Set[int]]:
+    """Return new players for the <seats> of a game, as in a new line, with
+    random goals and random number generators drawn from <rng>, and the IDs of
+    the remote players.
+
+    Raise a ValueError if a seat is not one of the kinds listed in the module
+    description, its numbers are out of range, or there are more seats than
+    colours.
+    """
+    if not 1 <= len(seats) <= len(COLOUR_LIST):
+        raise ValueError(f'a game needs 1 to {len(COLOUR_LIST)} players')
+    goals = generate_goals(len(seats), rng)
+    players = []
+    remote = set()
+    for i, seat in enumerate(seats):
+        kind, _, setting = seat.partition(':')
+        player_rng = random.Random(rng.getrandbits(64))
+        if kind == 'remote':
+            players.append(Player(i, goals[i]))
+            remote.add(i)
+        elif kind == 'random':
+            players.append(RandomPlayer(i, goals[i], player_rng))
+        elif kind == 'smart':
+            difficulty = _number(setting, 'difficulty', MAX_DIFFICULTY)
+            players.append(SmartPlayer(i, goals[i], difficulty,
+                                       rng=player_rng))
+        elif kind == 'beam':
+            width, x, depth = setting.lower().partition('x')
+            if not x:
+                raise ValueError(f'unknown seat {seat}')
+            players.append(BeamPlayer(
+                i, goals[i], _number(width, 'beam width', MAX_BEAM_WIDTH),
+                _number(depth, 'beam depth', MAX_BEAM_DEPTH)))
+        else:
+            raise ValueError(f'unknown seat {seat}')
+    return players, remote
+
+
+class ServerGame:
+    """A game hosted by a GameServer.
+
+    === Public Attributes ===
+    game_id:
+        The number the game is known by.
+    engine:
+        The turns of the game.
+    remote:
+        The IDs of the players whose moves are sent by clients.
+    lock:
+        Held while a move is being made in the game, so that moves sent at
+        the same time are made one after another.
+    """
+    game_id: int
+    engine: TurnEngine
+    remote: Set[int]
+    lock: asyncio.Lock
+
+    def __init__(self, game_id: int, engine: TurnEngine,
+                 remote: Set[int]) -> None:
+        """Initialize a hosted game with <game_id>, whose turns are in
+        <engine>, and whose players with IDs in <remote> are remote.
+        """
+        self.game_id = game_id
+        self.engine = engine
+        self.remote = remote
+        self.lock = asyncio.Lock()
+
+    def header(self) -> str:
+        """Return the game line that describes the start of this game.
+        """
+        board = self.engine.data.board
+        goals = ','.join(f'{type(p.goal).__name__}:'
+                         f'{COLOUR_LIST.index(p.goal.colour)}'
+                         for p in self.engine.data.players)
+        return f'game {self.game_id} {board.size} {board.max_depth} ' \
+               f'{encode_board(board).hex()} {goals}'
+
+    def do_move(self, move: Tuple[str, Optional[int], Block]) -> Optional[str]:
+        """Make the current player's <move>, and return the moved line that
+        describes it, or None if the move could not be made.
+        """
+        board = self.engine.data.board
+        turn = self.engine.turn
+        player_id = self.engine.current_player().id
+        path = block_path(board, move[2])
+        if not self.engine.do_move(move):
+            return None
+        diff = move_diff(board, (move[0], move[1]), path).hex() or '-'
+        direction = '-' if move[1] is None else str(move[1])
+        return f'moved {self.game_id} {turn} {player_id} {move[0]} ' \
+               f'{direction} {_text(path)} {diff}'
+
+    def status(self) -> str:
+        """Return the turn or over line that says what the game is waiting
+        for.
+        """
+        if self.engine.game_over():
+            scores = ','.join(f'{player_id}:{score}:{penalty}'
+                              for player_id, score, penalty
+                              in self.engine.data.final_scores())
+            return f'over {self.game_id} {scores}'
+        return f'turn {self.game_id} {self.engine.current_player().id}'
+
+
+class GameServer:
+    """A server that hosts many Blocky games for its clients.
+
+    === Public Attributes ===
+    games:
+        The games being hosted, keyed by game number.
+    """
+    games: Dict[int, ServerGame]
+
+    # === Private Attributes ===
+    # _next_id:
+    #   The number the next game started will be known by.
+    # _executor:
+    #   The threads computer players choose their moves in.
+    _next_id: int
+    _executor: ThreadPoolExecutor
+
+    def __init__(self, workers: Optional[int] = None) -> None:
+        """Initialize a server with no games, whose computer players choose
+        their moves in <workers> threads (or the ThreadPoolExecutor default, if
+        <workers> is None).
+        """
+        self.games = {}
+        self._next_id = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def close(self) -> None:
+        """Stop the threads computer players choose their moves in.
+        """
+        self._executor.shutdown(wait=False)
+
+    async def handle(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        """Answer the lines sent by one client until it closes the
+        connection, then forget the games it started.
+        """
+        started = []
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                # A line that is not UTF-8 is answered like any other line
+                # that cannot be understood
+                words = line.decode(errors='replace').split()
+                replies = await self.command(words, started)
+                writer.write(''.join(reply + '\n' for reply in replies)
+                             .encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for game_id in started:
+                self.games.pop(game_id, None)
+            writer.close()
+
+    async def command(self, words: List[str], started: List[int]) -> List[str]:
+        """Carry out the line made of <words>, and return the lines to answer
+        it with. The number of a game started is appended to <started>.
+        """
+        try:
+            if words[:1] == ['new'] and len(words) == 5:
+                return await self._new_game(words[1:], started)
+            elif words[:1] == ['move'] and len(words) == 5:
+                return await self._move(words[1:])
+            elif words[:1] == ['board'] and len(words) == 2:
+                board = self._game(words[1]).engine.data.board
+                return [f'board {words[1]} {encode_board(board).hex()}']
+            raise ValueError(f'cannot understand {" ".join(words)!r}')
+        except ValueError as error:
+            return [f'error {error}']
+
+    def _game(self, game_id: str) -> ServerGame:
+        """Return the game numbered <game_id>.
+
+        Raise a ValueError if there is no such game.
+        """
+        game = self.games.get(int(game_id)) if game_id.isdigit() else None
+        if game is None:
+            raise ValueError(f'no game {game_id}')
+        return game
+
+    async def _new_game(self, args: List[str],
+                        started: List[int]) -> List[str]:
+        """Start the game described by the <args> of a new line, and return the
+        lines that answer it.
+
+        Raise a ValueError if the game's settings are out of range.
+        """
+        max_depth = _number(args[0], 'max_depth', MAX_DEPTH)
+        num_turns = _number(args[1], 'num_turns', MAX_TURNS)
+        try:
+            seed = int(args[2])
+        except ValueError:
+            raise ValueError('seed must be a whole number') from None
+        rng = random.Random(seed)
+        players, remote = make_seats(args[3].split(','), rng)
+        data = GameData(generate_board(max_depth, BOARD_SIZE, rng), players)
+        data.max_turns = num_turns
+
+        game = ServerGame(self._next_id, TurnEngine(data, rng=rng), remote)
+        self._next_id += 1
+        self.games[game.game_id] = game
+        started.append(game.game_id)
+        async with game.lock:
+            return [game.header()] + await self._advance(game)
+
+    async def _move(self, args: List[str]) -> List[str]:
+        """Make the move in the <args> of a move line, and return the lines
+        that answer it.
+        """
+        game = self._game(args[0])
+        async with game.lock:
+            engine = game.engine
+            if engine.game_over() or \
+                    engine.current_player().id not in game.remote:
+                raise ValueError(f'it is not a remote player\'s turn in game '
+                                 f'{game.game_id}')
+            direction = None if args[2] == '-' else int(args[2])
+            path = [] if args[3] == '-' else [int(i) for i in args[3]]
+            try:
+                block = block_at(engine.data.board, path)
+            except IndexError:
+                raise ValueError(f'no block at {args[3]}') from None
+            moved = game.do_move((args[1], direction, block))
+            if moved is None:
+                raise ValueError(f'{args[1]} {args[2]} cannot be done at '
+                                 f'{args[3]}')
+            return [moved] + await self._advance(game)
+
+    async def _advance(self, game: ServerGame) -> List[str]:
+        """Make every computer player's move in <game> until it is a remote
+        player's turn or the game is over, and return the lines that describe
+        them.
+
+        Precondition: <game>'s lock is held.
+        """
+        loop = asyncio.get_running_loop()
+        engine = game.engine
+        lines = []
+        while not engine.game_over() and \
+                engine.current_player().id not in game.remote:
+            player = engine.current_player()
+            assert isinstance(player, ComputerPlayer)
+            player.turns_left = engine.turns_left(engine.current_player_index)
+            player.proceed()
+            move = await loop.run_in_executor(self._executor,
+                                              player.generate_move,
+                                              engine.data.board)
+            moved = None if move is None else game.do_move(move)
+            if moved is None:
+                moved = game.do_move((PASS[0], PASS[1], engine.data.board))
+            lines.append(moved)
+        lines.append(game.status())
+        return lines
+
+
+async def serve(server: GameServer, host: str = '127.0.0.1', port: int = 0,
+                path: Optional[str] = None) -> asyncio.AbstractServer:
+    """Start accepting clients of <server> on the Unix socket named <path>,
+    or on TCP <port> at <host> if <path> is None, and return the listening
+    server. Port 0 picks any free port.
+    """
+    if path is not None:
+        return await asyncio.start_unix_server(server.handle, path)
+    return await asyncio.start_server(server.handle, host, port)
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    """Run a server with the settings in the command-line <args> until it is
+    interrupted.
+    """
+    parser = argparse.ArgumentParser(
+        description='Host many games of Blocky for clients.')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='address to listen on')
+    parser.add_argument('--port', type=int, default=8148,
+                        help='TCP port to listen on')
+    parser.add_argument('--unix', default=None,
+                        help='Unix socket to listen on instead of TCP')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='threads for computer players to search in')
+    options = parser.parse_args(args)
+
+    async def run() -> None:
+        server = GameServer(options.workers)
+        listener = await serve(server, options.host, options.port,
+                               options.unix)
+        try:
+            async with listener:
+                await listener.serve_forever()
+        finally:
+            server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
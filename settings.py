@@ -55,6 +55,9 @@ HIGHLIGHT_THICKNESS = 5
 # The number of seconds a move is animated for.
 ANIMATION_DURATION = 1
 
+# The number of seconds a computer player may spend searching for a move.
+AI_THINKING_TIME = 2
+
 
 def colour_name(colour: Tuple[int, int, int]) -> str:
     """Return the colour name associated with this colour value, or the empty
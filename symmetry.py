@@ -0,0 +1,159 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains functions that identify boards which are the same up to
+rotation and reflection.
+
+Both kinds of goal give the same score on a board after any of the 8 rotations
+and reflections of the whole board, so searches can treat all 8 as one
+position. The canonical key of a board is the smallest of the encode_board
+encodings of its 8 symmetric versions.
+
+Rotating or reflecting a block moves its children to new positions and
+rotates or reflects each of them in the same way. So the 8 encodings of a
+block can be put together from the 8 encodings of each of its children, and
+after a move only the moved block and its ancestors need new encodings.
+"""
+from __future__ import annotations
+from typing import Dict, List, Tuple
+
+from block import Block, encode_board, PARENT_BYTE
+
+
+def _symmetry_sources() -> List[List[int]]:
+    """Return, for each of the 8 symmetries, the index of the child that ends
+    up in each position of its parent.
+
+    Symmetry number 4 * m + r is a left-right reflection if m is 1, followed
+    by r clockwise rotations.
+    """
+    # Children are ordered upper-right, upper-left, lower-left, lower-right
+    reflect = [1, 0, 3, 2]
+    rotate = [1, 2, 3, 0]
+    sources = []
+    for m in range(2):
+        for r in range(4):
+            source = reflect[:] if m else [0, 1, 2, 3]
+            for _ in range(r):
+                source = [source[rotate[k]] for k in range(4)]
+            sources.append(source)
+    return sources
+
+
+# For each of the 8 symmetries, the child that ends up in each position.
+SOURCES = _symmetry_sources()
+
+
+def symmetric_encodings(block: Block) -> List[bytes]:
+    """Return the encode_board encodings of the 8 rotations and reflections of
+    <block>. The first one is the encoding of <block> itself.
+
+    >>> board = Block((0, 0), 750, None, 0, 1)
+    >>> board.smash()
+    True
+    >>> encode_board(board) == symmetric_encodings(board)[0]
+    True
+    """
+    if not block.children:
+        return [encode_board(block)] * 8
+    return compose_encodings([symmetric_encodings(child)
+                              for child in block.children])
+
+
+def compose_encodings(children: List[List[bytes]]) -> List[bytes]:
+    """Return the 8 symmetric encodings of a block whose four children have
+    the symmetric encodings in <children>, in the order of the children.
+    """
+    return [bytes([PARENT_BYTE]) +
+            b''.join(children[source][t] for source in SOURCES[t])
+            for t in range(8)]
+
+
+def canonical_key(board: Block) -> bytes:
+    """Return the canonical key of <board>: the same for any two boards that
+    are rotations or reflections of each other, and different otherwise.
+    """
+    return min(symmetric_encodings(board))
+
+
+class SymmetryIndex:
+    """The symmetric encodings of every block on a board.
+
+    With these, the canonical key of the board with one block replaced is found
+    by encoding only the replacement and recombining the encodings of its
+    ancestors.
+    """
+    # === Private Attributes ===
+    # _encodings:
+    #   The symmetric encodings of each block on the board, keyed by the path
+    #   from the board to that block.
+    _encodings: Dict[Tuple[int, ...], List[bytes]]
+
+    def __init__(self, board: Block) -> None:
+        """Initialize this index with the encodings of every block on <board>.
+
+        <board> must not be mutated while this index is in use.
+        """
+        self._encodings = {}
+        self._index(board, ())
+
+    def _index(self, block: Block, path: Tuple[int, ...]) -> List[bytes]:
+        """Record and return the symmetric encodings of <block>, which is at
+        <path> on the board, and of all its descendants.
+        """
+        if not block.children:
+            encodings = [encode_board(block)] * 8
+        else:
+            encodings = compose_encodings([
+                self._index(child, path + (i,))
+                for i, child in enumerate(block.children)])
+        self._encodings[path] = encodings
+        return encodings
+
+    def canonical_key(self) -> bytes:
+        """Return the canonical key of the board.
+        """
+        return min(self._encodings[()])
+
+    def key_with(self, path: List[int], block: Block) -> bytes:
+        """Return the canonical key that the board would have if the block at
+        <path> were replaced with <block>.
+        """
+        encodings = symmetric_encodings(block)
+        ancestor = tuple(path)
+        while ancestor:
+            index = ancestor[-1]
+            ancestor = ancestor[:-1]
+            encodings = compose_encodings([
+                encodings if i == index else self._encodings[ancestor + (i,)]
+                for i in range(4)])
+        return min(encodings)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'allowed-import-modules': [
+            'doctest', 'python_ta', 'typing', '__future__', 'block'
+        ],
+        'max-attributes': 15
+    })
@@ -0,0 +1,318 @@
+"""CSC148 Assignment 2
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Diane Horton, David Liu, Mario Badr, Sophia Huynh, Misha Schwartz,
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) Diane Horton, David Liu, Mario Badr, Sophia Huynh,
+Misha Schwartz, and Jaisie Sin
+
+=== Module Description ===
+
+This file contains a command-line program that plays many games between
+computer players, spread over several processes, and reports how each kind of
+player did and how fast the games ran.
+
+For example, to play 1000 games on boards of depth 4 between a random player,
+a smart player of difficulty 10 and a beam player of width 4 and depth 3:
+
+    python tournament.py --games 1000 --depth 4 --random 1 --smart 10 \\
+        --beam 4x3
+
+Game i is played with the random seed <seed> + i, so any game can be played
+again on its own.
+
+With --corpus, the board at the end of each game is also written to a corpus
+file, one game per line, in the order the games finish:
+
+    <seed> <size> <max_depth> <board> <label>:<score>:<penalty>,...
+
+where the board is encoded by encode_board, in hexadecimal, and each player's
+label, goal score and penalty are listed in the order they played. See
+mosaic.py for drawing the boards in a corpus file.
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional, TextIO, Tuple
+import argparse
+import multiprocessing
+import random
+import time
+
+from block import Block, decode_board, encode_board, generate_board
+from engine import GameData, play_game
+from player import Player, SmartPlayer, BeamPlayer, create_players
+from settings import BOARD_SIZE
+
+# The players in a game: the number of random players, the difficulty of each
+# smart player, and the (width, depth) of each beam player.
+PlayerMix = Tuple[int, List[int], List[Tuple[int, int]]]
+
+# What happened to each player in one game: their label, goal score, penalty,
+# share of the win, and the seconds they took to choose each move.
+GameResult = List[Tuple[str, int, int, float, List[float]]]
+
+
+def player_label(player: Player) -> str:
+    """Return a label for the kind of player <player> is, including the
+    settings that make it play differently.
+    """
+    if isinstance(player, SmartPlayer):
+        return f'SmartPlayer({player.difficulty})'
+    elif isinstance(player, BeamPlayer):
+        return f'BeamPlayer({player.width}x{player.depth})'
+    return type(player).__name__
+
+
+def play_one(seed: int, max_depth: int, num_turns: int, mix: PlayerMix,
+             time_budget: Optional[float],
+             boards: Optional[List[Block]] = None) -> GameResult:
+    """Play one game of <num_turns> turns on a board of <max_depth>, between
+    the players in <mix>, with the random seed <seed>. If <time_budget> is not
+    None, it is every player's time budget for choosing a move. If <boards> is
+    given, the board at the end of the game is appended to it.
+
+    A player's share of the win is 1 divided by the number of players with the
+    highest final score, or 0 if that is not their score.
+    """
+    rng = random.Random(seed)
+    num_random, smart_players, beam_players = mix
+    board = generate_board(max_depth, BOARD_SIZE, rng)
+    players = create_players(0, num_random, smart_players, beam_players, rng)
+    if time_budget is not None:
+        for player in players:
+            if isinstance(player, (SmartPlayer, BeamPlayer)):
+                player.time_budget = time_budget
+
+    timings = []
+    scores = play_game(GameData(board, players), num_turns, timings, rng=rng)
+    if boards is not None:
+        boards.append(board)
+
+    finals = [score - penalty for _, score, penalty in scores]
+    winners = finals.count(max(finals))
+    result = []
+    for player, (_, score, penalty), final in zip(players, scores, finals):
+        share = 1 / winners if final == max(finals) else 0.0
+        seconds = [t for player_id, t in timings if player_id == player.id]
+        result.append((player_label(player), score, penalty, share, seconds))
+    return result
+
+
+def _play_task(task: Tuple[int, int, int, PlayerMix, Optional[float]]) -> \
+        Tuple[GameResult, str]:
+    """Return play_one(*<task>), and the game's line in a corpus file, for use
+    with a process pool.
+    """
+    boards = []
+    result = play_one(*task, boards=boards)
+    return result, corpus_line(task[0], boards[0], result)
+
+
+def corpus_line(seed: int, board: Block, result: GameResult) -> str:
+    """Return the line of a corpus file for the game played with <seed>,
+    which ended with <board> and <result>.
+    """
+    scores = ','.join(f'{label}:{score}:{penalty}'
+                      for label, score, penalty, _, _ in result)
+    return f'{seed} {board.size} {board.max_depth} ' \
+           f'{encode_board(board).hex()} {scores}\n'
+
+
+def parse_corpus_line(line: str) -> \
+        Tuple[int, Block, List[Tuple[str, int, int]]]:
+    """Return the seed, final board, and each player's label, goal score and
+    penalty of the game in a <line> of a corpus file.
+    """
+    seed, size, max_depth, encoding, scores = line.split()
+    board = decode_board(bytes.fromhex(encoding), (0, 0), int(size), 0,
+                         int(max_depth))
+    players = []
+    for item in scores.split(','):
+        label, score, penalty = item.split(':')
+        players.append((label, int(score), int(penalty)))
+    return int(seed), board, players
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Return the <p>th percentile of <values>, using the nearest rank.
+
+    Precondition: values is sorted and not empty, and 0 <= p <= 100.
+
+    >>> percentile([1.0, 2.0, 3.0, 4.0], 50)
+    2.0
+    >>> percentile([1.0, 2.0, 3.0, 4.0], 100)
+    4.0
+    """
+    rank = max(1, -(-len(values) * p // 100))
+    return values[int(rank) - 1]
+
+
+class TournamentStats:
+    """The totals for each kind of player over the games of a tournament.
+
+    === Public Attributes ===
+    games:
+        The number of games played.
+    seats:
+        The number of times each kind of player played, keyed by label.
+    wins:
+        The total share of wins of each kind of player.
+    scores:
+        The total goal score of each kind of player.
+    penalties:
+        The total penalty of each kind of player.
+    move_times:
+        The seconds each kind of player took to choose each of its moves.
+    """
+    games: int
+    seats: Dict[str, int]
+    wins: Dict[str, float]
+    scores: Dict[str, int]
+    penalties: Dict[str, int]
+    move_times: Dict[str, List[float]]
+
+    def __init__(self) -> None:
+        """Initialize the totals of a tournament with no games.
+        """
+        self.games = 0
+        self.seats = {}
+        self.wins = {}
+        self.scores = {}
+        self.penalties = {}
+        self.move_times = {}
+
+    def add(self, result: GameResult) -> None:
+        """Add the result of one game to the totals.
+        """
+        self.games += 1
+        for label, score, penalty, share, seconds in result:
+            self.seats[label] = self.seats.get(label, 0) + 1
+            self.wins[label] = self.wins.get(label, 0) + share
+            self.scores[label] = self.scores.get(label, 0) + score
+            self.penalties[label] = self.penalties.get(label, 0) + penalty
+            self.move_times.setdefault(label, []).extend(seconds)
+
+    def report(self, elapsed: float) -> str:
+        """Return a table of the totals, for a tournament that took <elapsed>
+        seconds.
+        """
+        lines = [f'{self.games} games in {elapsed:.2f}s '
+                 f'({self.games / elapsed:.1f} games/s)', '',
+                 f'{"player":<20}{"win rate":>10}{"score":>10}{"penalty":>10}'
+                 f'{"p50 ms":>10}{"p90 ms":>10}{"p99 ms":>10}{"max ms":>10}']
+        all_times = []
+        for label in sorted(self.seats):
+            n = self.seats[label]
+            times = sorted(self.move_times[label])
+            all_times.extend(times)
+            lines.append(f'{label:<20}{self.wins[label] / n:>10.3f}'
+                         f'{self.scores[label] / n:>10.2f}'
+                         f'{self.penalties[label] / n:>10.2f}' +
+                         _latencies(times))
+        lines.append(f'{"all moves":<50}' + _latencies(sorted(all_times)))
+        return '\n'.join(lines)
+
+
+def _latencies(times: List[float]) -> str:
+    """Return the 50th, 90th and 99th percentiles and the maximum of the
+    sorted <times>, in milliseconds, as columns of a table.
+    """
+    if not times:
+        return ''
+    return ''.join(f'{percentile(times, p) * 1000:>10.2f}'
+                   for p in [50, 90, 99, 100])
+
+
+def run_tournament(games: int, max_depth: int, num_turns: int,
+                   mix: PlayerMix, seed: int = 0, workers: int = 1,
+                   time_budget: Optional[float] = None,
+                   corpus: Optional[TextIO] = None) -> TournamentStats:
+    """Play <games> games and return the totals, using <workers> processes.
+    If <corpus> is given, each game's line in a corpus file is written to it.
+
+    The arguments are as for play_one, and game i uses the seed <seed> + i.
+    """
+    tasks = [(seed + i, max_depth, num_turns, mix, time_budget)
+             for i in range(games)]
+    stats = TournamentStats()
+
+    def add(result: GameResult, line: str) -> None:
+        stats.add(result)
+        if corpus is not None:
+            corpus.write(line)
+
+    if workers == 1:
+        for task in tasks:
+            add(*_play_task(task))
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            chunk = max(1, games // (workers * 8))
+            for result, line in pool.imap_unordered(_play_task, tasks, chunk):
+                add(result, line)
+    return stats
+
+
+def _beam_setting(text: str) -> Tuple[int, int]:
+    """Return the (width, depth) of a beam player given as WIDTHxDEPTH.
+    """
+    width, depth = text.lower().split('x')
+    return int(width), int(depth)
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    """Run a tournament with the settings in the command-line <args>, and
+    print the results.
+    """
+    parser = argparse.ArgumentParser(
+        description='Play many games of Blocky between computer players.')
+    parser.add_argument('--games', type=int, default=100,
+                        help='number of games to play')
+    parser.add_argument('--depth', type=int, default=3,
+                        help='max_depth of the boards')
+    parser.add_argument('--turns', type=int, default=5,
+                        help='number of turns in each game')
+    parser.add_argument('--random', type=int, default=0,
+                        help='number of random players')
+    parser.add_argument('--smart', type=int, nargs='*', default=[],
+                        help='difficulty of each smart player')
+    parser.add_argument('--beam', type=_beam_setting, nargs='*', default=[],
+                        help='WIDTHxDEPTH of each beam player')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='random seed of the first game')
+    parser.add_argument('--workers', type=int,
+                        default=multiprocessing.cpu_count(),
+                        help='number of processes to play games in')
+    parser.add_argument('--time-budget', type=float, default=None,
+                        help='seconds each AI player may spend on a move')
+    parser.add_argument('--corpus', default=None,
+                        help='file to write the final boards to')
+    options = parser.parse_args(args)
+
+    mix = (options.random, options.smart, options.beam)
+    if sum([options.random, len(options.smart), len(options.beam)]) == 0:
+        parser.error('at least one player is needed')
+
+    corpus = None if options.corpus is None else open(options.corpus, 'w')
+    try:
+        start = time.perf_counter()
+        stats = run_tournament(options.games, options.depth, options.turns,
+                               mix, options.seed, options.workers,
+                               options.time_budget, corpus)
+        print(stats.report(time.perf_counter() - start))
+    finally:
+        if corpus is not None:
+            corpus.close()
+
+
+if __name__ == '__main__':
+    main()